@@ -0,0 +1,288 @@
+"""Offline batch scoring of stored user profiles against the current interest rates.
+
+Streams profiles from CSV or Parquet in chunks, runs the interest engine (and
+optionally the multi-bank optimizer) across a process pool and appends results
+to the output file as each chunk completes, so memory stays flat regardless of
+input size. Rows that can't be scored (blank or malformed profile values) are
+kept with a message in the ``error`` column rather than failing the batch.
+
+Usage:
+    python batch_optimize.py data/user_recommendations.csv -o results.csv
+    python batch_optimize.py partner.parquet -o results.parquet --optimize --workers 8
+"""
+import argparse
+import json
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import pandas as pd
+
+from utils.interest_engine import (
+    BANK_NAMES,
+    calculate_all_banks,
+    optimize_bank_distribution,
+    process_interest_rates,
+    requirements_from_profile,
+)
+
+logger = logging.getLogger(__name__)
+
+PROFILE_COLUMNS = [
+    'savings_amount',
+    'salary_above_3k',
+    'monthly_card_spend',
+    'num_giro_payments',
+    'has_insurance',
+    'has_investments',
+    'increased_balance',
+    'high_balance'
+]
+
+BOOL_COLUMNS = ['salary_above_3k', 'has_insurance', 'has_investments', 'increased_balance', 'high_balance']
+NUMERIC_COLUMNS = ['savings_amount', 'monthly_card_spend', 'num_giro_payments']
+_TRUE_VALUES = ['true', '1', '1.0', 'y', 'yes']
+_FALSE_VALUES = ['false', '0', '0.0', 'n', 'no']
+
+# Per-process state, set up once by the pool initializer
+_banks_data = None
+_run_optimizer = False
+
+
+def _init_worker(rates_path, run_optimizer):
+    global _banks_data, _run_optimizer
+    _banks_data = process_interest_rates(rates_path)
+    _run_optimizer = run_optimizer
+
+
+@lru_cache(maxsize=4096)
+def _optimize_cached(total_amount, requirements_items):
+    """Optimizer results keyed on exact inputs; stored profiles repeat often"""
+    solutions = optimize_bank_distribution(total_amount, _banks_data, dict(requirements_items))
+    best = solutions[0]
+    return best['total_interest'], json.dumps(best['distribution'], sort_keys=True), best['salary_bank']
+
+
+def _bank_column(bank_name):
+    return 'annual_interest_' + bank_name.lower().replace(' ', '_')
+
+
+def _parse_bool(series):
+    """Stored profiles hold booleans as True/False strings or 0/1; anything else (or blank) is NA"""
+    if series.dtype == bool:
+        return series.astype(object)
+    text = series.astype(str).str.strip().str.lower()
+    parsed = pd.Series(pd.NA, index=series.index, dtype=object)
+    parsed[text.isin(_TRUE_VALUES)] = True
+    parsed[text.isin(_FALSE_VALUES)] = False
+    return parsed
+
+
+def validate_profiles(chunk):
+    """Typed profile columns and a per-row error message ('' for rows that can be scored)"""
+    profiles = chunk[PROFILE_COLUMNS].copy()
+    errors = pd.Series('', index=chunk.index, dtype=object)
+    for col in NUMERIC_COLUMNS:
+        profiles[col] = pd.to_numeric(profiles[col], errors='coerce')
+        invalid = profiles[col].isna() | (profiles[col] < 0)
+        errors[invalid & (errors == '')] = f"{col} must be a non-negative number"
+    for col in BOOL_COLUMNS:
+        profiles[col] = _parse_bool(profiles[col])
+        errors[profiles[col].isna() & (errors == '')] = f"{col} must be true/false or 1/0"
+    return profiles, errors
+
+
+def _score_profile(profile):
+    amount = int(profile['savings_amount'])
+    requirements = requirements_from_profile(profile)
+    bank_results = calculate_all_banks(amount, _banks_data, requirements)
+
+    row = {_bank_column(result['bank']): result['annual_interest'] for result in bank_results}
+    row['best_bank'] = bank_results[0]['bank']
+    row['best_bank_annual_interest'] = bank_results[0]['annual_interest']
+
+    if _run_optimizer:
+        total_interest, distribution, salary_bank = _optimize_cached(
+            amount, tuple(sorted(requirements.items()))
+        )
+        row['optimal_annual_interest'] = total_interest
+        row['optimal_distribution'] = distribution
+        row['optimal_salary_bank'] = salary_bank
+    return row
+
+
+def score_chunk(chunk):
+    """Score one chunk of profiles; runs inside a worker process.
+
+    Rows that can't be scored get empty result columns and a message in the
+    ``error`` column instead of failing the chunk. Profile values that don't
+    parse are written out empty, so each column keeps one type across chunks.
+    """
+    missing = [col for col in PROFILE_COLUMNS if col not in chunk.columns]
+    if missing:
+        raise ValueError(f"Missing required profile columns: {', '.join(missing)}")
+
+    profiles, errors = validate_profiles(chunk)
+    rows = []
+    for index, profile in zip(chunk.index, profiles.to_dict('records')):
+        if errors[index]:
+            rows.append({'error': errors[index]})
+            continue
+        try:
+            rows.append(dict(_score_profile(profile), error=''))
+        except Exception as e:
+            rows.append({'error': f"{type(e).__name__}: {e}"})
+
+    failed = int((pd.Series([row['error'] for row in rows]) != '').sum()) if rows else 0
+    if failed:
+        logger.warning(f"{failed} of {len(rows)} profiles in a chunk could not be scored")
+
+    columns = [_bank_column(bank) for bank in BANK_NAMES] + ['best_bank', 'best_bank_annual_interest']
+    if _run_optimizer:
+        columns += ['optimal_annual_interest', 'optimal_distribution', 'optimal_salary_bank']
+    results = pd.DataFrame(rows, columns=columns + ['error'], index=chunk.index)
+    # Fixed result types, so a chunk where every row failed still matches the Parquet schema
+    results = results.astype({col: 'float64' if col.endswith('interest') or col.startswith('annual_interest_')
+                              else 'string' for col in results.columns})
+    chunk = chunk.copy()
+    for col in PROFILE_COLUMNS:
+        # Only columns holding unparseable text are replaced; clean ones keep their input type
+        if not pd.api.types.is_numeric_dtype(chunk[col]):
+            chunk[col] = profiles[col].astype('boolean' if col in BOOL_COLUMNS else 'float64')
+    return pd.concat([chunk, results], axis=1)
+
+
+def _is_parquet(path):
+    return os.path.splitext(path)[1].lower() in ('.parquet', '.pq')
+
+
+def input_columns(path):
+    """Column names of a CSV or Parquet input, read without loading its rows"""
+    if _is_parquet(path):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise RuntimeError("Reading Parquet input requires pyarrow (pip install pyarrow)") from e
+        return list(pq.read_schema(path).names)
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def check_inputs(paths):
+    """Reject inputs missing profile columns or whose columns differ from the first file's.
+
+    Results from every file go to one output with one header (or Parquet
+    schema), so all inputs must share the same columns.
+    """
+    expected = None
+    for path in paths:
+        columns = input_columns(path)
+        missing = [col for col in PROFILE_COLUMNS if col not in columns]
+        if missing:
+            raise ValueError(f"{path} is missing required profile columns: {', '.join(missing)}")
+        if expected is None:
+            expected = columns
+        elif columns != expected:
+            raise ValueError(f"{path} has different columns from {paths[0]}: "
+                             f"{', '.join(columns)} vs {', '.join(expected)}")
+
+
+def iter_profile_chunks(paths, chunksize):
+    """Yield DataFrame chunks from a sequence of CSV or Parquet files"""
+    for path in paths:
+        if _is_parquet(path):
+            try:
+                import pyarrow.parquet as pq
+            except ImportError as e:
+                raise RuntimeError("Reading Parquet input requires pyarrow (pip install pyarrow)") from e
+            for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+                chunk = batch.to_pandas()
+                chunk.insert(0, 'source_file', os.path.basename(path))
+                yield chunk
+        else:
+            for chunk in pd.read_csv(path, chunksize=chunksize):
+                chunk.insert(0, 'source_file', os.path.basename(path))
+                yield chunk
+
+
+class ResultWriter:
+    """Append result chunks to a CSV or Parquet file as they arrive"""
+
+    def __init__(self, path):
+        self.path = path
+        self.rows_written = 0
+        self._parquet_writer = None
+
+    def write(self, frame):
+        if _is_parquet(self.path):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(self.path, table.schema)
+            else:
+                table = table.cast(self._parquet_writer.schema)
+            self._parquet_writer.write_table(table)
+        else:
+            frame.to_csv(self.path, mode='w' if self.rows_written == 0 else 'a',
+                         header=self.rows_written == 0, index=False)
+        self.rows_written += len(frame)
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+
+
+def run_batch(input_paths, output_path, rates_path='interest_rates.csv', chunksize=5000,
+              workers=None, optimize=False):
+    """Score every profile in ``input_paths`` and write results to ``output_path``.
+
+    At most ``2 * workers`` chunks are in flight at once and results are written
+    in input order, so memory use is bounded by the chunk size, not the file size.
+    Every input must have the same columns. Returns the number of rows written.
+    """
+    check_inputs(input_paths)
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = workers * 2
+    writer = ResultWriter(output_path)
+    pending = deque()
+    start = time.time()
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(rates_path, optimize)) as pool:
+            for chunk in iter_profile_chunks(input_paths, chunksize):
+                pending.append(pool.submit(score_chunk, chunk))
+                # Write completed chunks in order before reading further input
+                while len(pending) >= max_in_flight or (pending and pending[0].done()):
+                    writer.write(pending.popleft().result())
+            while pending:
+                writer.write(pending.popleft().result())
+    finally:
+        writer.close()
+
+    elapsed = time.time() - start
+    logger.info(f"Scored {writer.rows_written:,} profiles in {elapsed:.1f}s -> {output_path}")
+    return writer.rows_written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score user profiles against current bank interest rates")
+    parser.add_argument('inputs', nargs='+', help="Profile files (.csv or .parquet) with the stored profile columns")
+    parser.add_argument('-o', '--output', required=True, help="Output file (.csv or .parquet)")
+    parser.add_argument('--rates', default='interest_rates.csv', help="Interest rates CSV")
+    parser.add_argument('--chunksize', type=int, default=5000, help="Profiles per chunk sent to a worker")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--optimize', action='store_true',
+                        help="Also run the multi-bank distribution optimizer for each profile")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    run_batch(args.inputs, args.output, rates_path=args.rates, chunksize=args.chunksize,
+              workers=args.workers, optimize=args.optimize)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 import streamlit as st
-import pandas as pd
+from utils.rates_repository import bank_names, bank_table, rates_updated_label
 
 def interest_rates_page():
     st.title("🏦 Bank Interest Rates")
@@ -14,25 +14,19 @@ def interest_rates_page():
         </div>
     """, unsafe_allow_html=True)
     
-    st.write("Current interest rates and requirements for supported banks. Updated as of 16 Jan 2025.")
-    
-    # Load bank data
-    df = pd.read_csv('interest_rates.csv')
+    updated = rates_updated_label()
+    st.write("Current interest rates and requirements for supported banks."
+             + (f" Updated as of {updated}." if updated else ""))
     
     # Add bank selector
     selected_bank = st.selectbox(
         "Select Bank",
-        options=df['bank'].unique(),
+        options=bank_names(),
         help="Choose a bank to view its interest rates"
     )
     
-    # Show selected bank's data
-    bank_data = df[df['bank'] == selected_bank]
-    
-    # Create a formatted table
-    cols = ['tier_type', 'balance_tier', 'interest_rate', 'remarks']
-    display_df = bank_data[cols].copy()
-    display_df.columns = ['Type', 'Balance Tier', 'Interest Rate', 'Requirements']
+    # Prebuilt table for the selected bank, shared with the calculator's cached rates
+    display_df = bank_table(selected_bank, 'summary')
     
     # Display the table with styling
     st.dataframe(
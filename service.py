@@ -0,0 +1,332 @@
+"""Headless JSON HTTP service for the interest calculator.
+
+Exposes the same engine as Calculator.py without Streamlit:
+
+    GET  /health            - liveness and loaded banks
+    POST /interest          - single-bank interest for one or all banks, optionally
+                              under the rates in force on an ``as_of`` date
+    POST /optimize          - multi-bank deposit distribution (top 3 solutions);
+                              identical concurrent requests share one computation
+    POST /spend-allocation  - card spend allocation across banks for given deposits
+
+Runs on the standard library only. Connections are HTTP/1.1 keep-alive, each
+connection is served on its own thread and CPU-heavy optimizations run in a
+process pool. ``application`` is a plain WSGI callable for use behind any WSGI
+server; the pool size comes from ``--workers`` or, under WSGI, the
+SERVICE_WORKERS environment variable (default: CPU count).
+
+Usage:
+    python service.py --port 8000 --workers 4
+"""
+import argparse
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.interest_engine import (
+    BANK_NAMES,
+    calculate_all_banks,
+    calculate_bank_interest,
+    normalize_requirements,
+    optimize_bank_distribution,
+    optimize_spend_allocation,
+)
+from utils.rates_cache import get_rates, get_rates_cache
+from utils.single_flight import SingleFlight, optimization_key
+
+logger = logging.getLogger(__name__)
+
+RATES_PATH = os.environ.get('INTEREST_RATES_PATH', 'interest_rates.csv')
+MAX_BODY_BYTES = 64 * 1024
+MAX_AMOUNT = 1000000  # Same ceiling as the calculator's slider
+MAX_SPEND = 100000
+POOL_WORKERS = int(os.environ.get('SERVICE_WORKERS', 0)) or None
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# Identical concurrent optimizations share one computation
+_optimize_flight = SingleFlight()
+
+
+class RequestError(Exception):
+    """Client error returned to the caller with an HTTP status"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def get_banks_data():
+    return get_rates(RATES_PATH).banks_data
+
+
+def get_pool(workers=None):
+    """Process pool for optimizations, created on first use in each server process.
+
+    ``workers`` (default POOL_WORKERS) only applies when this call creates the pool.
+    """
+    global _pool
+    # Concurrent first requests must not each start (and leak) a pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=workers or POOL_WORKERS)
+        elif workers is not None:
+            logger.warning(f"Optimizer pool already running; ignoring workers={workers}")
+        return _pool
+
+
+# Workers receive the banks data of the version the request started with, so a
+# rates reload mid-request never mixes versions
+def _run_optimize(amount, requirements, banks_data):
+    return optimize_bank_distribution(amount, banks_data, requirements)
+
+
+def _run_spend_allocation(total_spend, deposit_amounts, requirements, banks_data):
+    allocation, total_interest, breakdown = optimize_spend_allocation(
+        total_spend, banks_data, deposit_amounts, requirements
+    )
+    return {'allocation': allocation, 'total_interest': total_interest, 'breakdown': breakdown}
+
+
+def _amount(payload, key, maximum):
+    value = payload.get(key)
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise RequestError(400, f"{key} must be a number")
+    if value < 0 or value > maximum:
+        raise RequestError(400, f"{key} must be between 0 and {maximum:,}")
+    return value
+
+
+def _requirements(payload):
+    try:
+        return normalize_requirements(payload.get('requirements'))
+    except ValueError as e:
+        raise RequestError(400, str(e))
+
+
+def _as_of_banks_data(payload):
+    """Banks data for an optional ``as_of`` date (YYYY-MM-DD), else the current rates"""
+    as_of = payload.get('as_of')
+    if as_of is None:
+        return get_banks_data()
+    try:
+        when = date.fromisoformat(as_of)
+    except (TypeError, ValueError):
+        raise RequestError(400, "as_of must be a date like 2025-01-16")
+    try:
+        return get_rates(RATES_PATH).history.as_of(when)
+    except LookupError as e:
+        raise RequestError(400, str(e))
+
+
+def handle_interest(payload):
+    amount = _amount(payload, 'amount', MAX_AMOUNT)
+    requirements = _requirements(payload)
+    banks_data = _as_of_banks_data(payload)
+    bank = payload.get('bank')
+    if bank is None:
+        return {'results': calculate_all_banks(amount, banks_data, requirements)}
+    if bank not in banks_data:
+        raise RequestError(400, f"Unknown bank: {bank}")
+    result = calculate_bank_interest(amount, banks_data[bank], requirements)
+    return {
+        'bank': bank,
+        'monthly_interest': result['total_interest'] / 12,
+        'annual_interest': result['total_interest'],
+        'breakdown': result['breakdown']
+    }
+
+
+def handle_optimize(payload):
+    # The optimizer steps through whole-dollar $5,000 increments
+    amount = int(_amount(payload, 'amount', MAX_AMOUNT))
+    requirements = _requirements(payload)
+    rates = get_rates(RATES_PATH)
+    key = optimization_key(amount, requirements, rates.version)
+    solutions = _optimize_flight.do(
+        key, lambda: get_pool().submit(_run_optimize, amount, requirements, rates.banks_data).result()
+    )
+    return {'amount': amount, 'solutions': [s for s in solutions if s['total_interest'] > 0]}
+
+
+def handle_spend_allocation(payload):
+    total_spend = _amount(payload, 'total_spend', MAX_SPEND)
+    requirements = _requirements(payload)
+    deposit_amounts = payload.get('deposit_amounts')
+    if not isinstance(deposit_amounts, dict) or not deposit_amounts:
+        raise RequestError(400, "deposit_amounts must be an object of bank name to amount")
+    for bank in deposit_amounts:
+        if bank not in BANK_NAMES:
+            raise RequestError(400, f"Unknown bank: {bank}")
+        _amount(deposit_amounts, bank, MAX_AMOUNT)
+    banks_data = get_banks_data()
+    return get_pool().submit(_run_spend_allocation, total_spend, deposit_amounts, requirements,
+                             banks_data).result()
+
+
+def handle_health(payload):
+    cache = get_rates_cache(RATES_PATH)
+    rates = cache.current()
+    return {
+        'status': 'ok',
+        'banks': sorted(rates.banks_data),
+        'rates_version': rates.version,
+        'rates_loaded_at': rates.loaded_at,
+        'rates_reload_error': cache.last_error,
+        'optimizations': {
+            'executed': _optimize_flight.executed,
+            'coalesced': _optimize_flight.shared,
+            'in_flight': _optimize_flight.in_flight()
+        }
+    }
+
+
+ROUTES = {
+    ('GET', '/health'): handle_health,
+    ('POST', '/interest'): handle_interest,
+    ('POST', '/optimize'): handle_optimize,
+    ('POST', '/spend-allocation'): handle_spend_allocation,
+}
+
+
+def _json_default(value):
+    # numpy scalars from the rates table
+    if hasattr(value, 'item'):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dispatch(method, path, body):
+    """Route a request and return (status, response bytes)"""
+    try:
+        handler = ROUTES.get((method, path))
+        if handler is None:
+            if any(route_path == path for _, route_path in ROUTES):
+                raise RequestError(405, f"Method {method} not allowed for {path}")
+            raise RequestError(404, f"Not found: {path}")
+        payload = {}
+        if method == 'POST':
+            try:
+                payload = json.loads(body or b'{}')
+            except ValueError:
+                raise RequestError(400, "Request body must be valid JSON")
+            if not isinstance(payload, dict):
+                raise RequestError(400, "Request body must be a JSON object")
+        status, response = 200, handler(payload)
+    except RequestError as e:
+        status, response = e.status, {'error': e.message}
+    except Exception:
+        logger.exception(f"Error handling {method} {path}")
+        status, response = 500, {'error': "Internal server error"}
+    return status, json.dumps(response, default=_json_default).encode('utf-8')
+
+
+_STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+                411: 'Length Required', 413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+def content_length(value, chunked=False):
+    """Validated request body length from a Content-Length header; raises RequestError before any read"""
+    if value is None or value == '':
+        if chunked:
+            raise RequestError(411, "Content-Length is required")
+        return 0
+    try:
+        length = int(value)
+    except ValueError:
+        raise RequestError(400, "Content-Length must be a whole number")
+    if length < 0:
+        raise RequestError(400, "Content-Length must not be negative")
+    if length > MAX_BODY_BYTES:
+        raise RequestError(413, "Request body too large")
+    return length
+
+
+def application(environ, start_response):
+    """WSGI entry point"""
+    try:
+        length = content_length(environ.get('CONTENT_LENGTH'), 'HTTP_TRANSFER_ENCODING' in environ)
+    except RequestError as e:
+        status, body = e.status, json.dumps({'error': e.message}).encode('utf-8')
+    else:
+        body = environ['wsgi.input'].read(length) if length else b''
+        status, body = dispatch(environ['REQUEST_METHOD'], environ.get('PATH_INFO', '/'), body)
+    start_response(f"{status} {_STATUS_TEXT[status]}", [
+        ('Content-Type', 'application/json'),
+        ('Content-Length', str(len(body)))
+    ])
+    return [body]
+
+
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 keeps connections open between requests
+    protocol_version = 'HTTP/1.1'
+
+    def _handle(self, method):
+        try:
+            length = content_length(self.headers.get('Content-Length'), 'Transfer-Encoding' in self.headers)
+        except RequestError as e:
+            status, body = e.status, json.dumps({'error': e.message}).encode('utf-8')
+            # The unread body would be parsed as the next request
+            self.close_connection = True
+        else:
+            raw = self.rfile.read(length) if length else b''
+            status, body = dispatch(method, self.path.split('?', 1)[0], raw)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+class ServiceHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Allow bursts of concurrent connections during load tests
+    request_queue_size = 128
+
+
+def serve(host='127.0.0.1', port=8000, workers=None):
+    """Run the service until interrupted"""
+    pool = get_pool(workers)
+    # Pick up rate changes without restarting the service
+    get_rates_cache(RATES_PATH).start_watching()
+    server = ServiceHTTPServer((host, port), ServiceRequestHandler)
+    logger.info(f"Serving on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        pool.shutdown()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="JSON HTTP service for the bank interest calculator")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Optimizer worker processes (default: SERVICE_WORKERS or CPU count)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    serve(args.host, args.port, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Cold-start import budget check for the app and worker entry points.
+
+Imports each entry point in a fresh interpreter, as a new replica or pool
+worker would, and reports the best wall-clock import time over a few runs
+alongside the slowest imports from ``python -X importtime``. The check fails
+when an entry point exceeds its budget or loads a heavy stack (xgboost,
+shap, scikit-learn, scipy) that should only be imported on first use.
+
+Usage:
+    python startup_check.py
+    python startup_check.py service --budget-ms 300 --top 15
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+HEAVY_MODULES = ('xgboost', 'shap', 'sklearn', 'scipy', 'joblib')
+
+# Entry point -> (import budget in ms, top-level packages it must not import)
+DEFAULT_TARGETS = {
+    'Calculator': (1500, HEAVY_MODULES),
+    'service': (500, HEAVY_MODULES + ('pandas', 'streamlit')),
+    'batch_optimize': (1000, HEAVY_MODULES + ('streamlit',)),
+    'utils.model_registry': (300, HEAVY_MODULES + ('pandas', 'streamlit')),
+}
+
+_PROBE = """
+import json, sys, time
+before = set(sys.modules)
+sys.stderr.write({marker!r} + '\\n')
+sys.stderr.flush()
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+loaded = sorted({{name.split('.')[0] for name in set(sys.modules) - before}})
+sys.stdout.write('\\n' + json.dumps({{'elapsed': elapsed, 'loaded': loaded}}) + '\\n')
+"""
+
+# Separates interpreter start-up imports from the probed import in -X importtime output
+_MARKER = '-- startup_check --'
+
+_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def _run_probe(module, importtime=False):
+    command = [sys.executable]
+    if importtime:
+        command += ['-X', 'importtime']
+    command += ['-c', _PROBE.format(module=module, marker=_MARKER)]
+    completed = subprocess.run(command, cwd=_ROOT, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{completed.stderr.strip()}")
+    return json.loads(completed.stdout.strip().splitlines()[-1]), completed.stderr
+
+
+def slowest_imports(importtime_output, top=10):
+    """(cumulative ms, module) for the slowest packages a module imports directly or indirectly.
+
+    Only the first two nesting levels are reported so one expensive package
+    shows up once rather than with every one of its submodules.
+    """
+    entries = []
+    if _MARKER in importtime_output:
+        importtime_output = importtime_output.split(_MARKER, 1)[1]
+    for line in importtime_output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        if depth <= 1:
+            entries.append((int(cumulative) / 1000, name.strip()))
+    entries.sort(reverse=True)
+    return entries[:top]
+
+
+def check_module(module, budget_ms, forbidden, repeat=3, top=10):
+    """Measure one entry point; returns (report lines, list of problems)"""
+    timings = []
+    for _ in range(repeat):
+        result, _ = _run_probe(module)
+        timings.append(result['elapsed'] * 1000)
+    best = min(timings)
+    _, importtime_output = _run_probe(module, importtime=True)
+
+    problems = []
+    if best > budget_ms:
+        problems.append(f"{module}: import took {best:.0f} ms, budget is {budget_ms} ms")
+    heavy = sorted(set(result['loaded']) & set(forbidden))
+    if heavy:
+        problems.append(f"{module}: imports {', '.join(heavy)} at startup")
+
+    status = 'FAIL' if problems else 'ok'
+    lines = [f"{module}: {best:.0f} ms (budget {budget_ms} ms) {status}"]
+    for cumulative, name in slowest_imports(importtime_output, top):
+        lines.append(f"    {cumulative:8.1f} ms  {name}")
+    return lines, problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('modules', nargs='*', help="Entry points to check (default: all known entry points)")
+    parser.add_argument('--budget-ms', type=float, help="Override the import budget for every module")
+    parser.add_argument('--repeat', type=int, default=3, help="Imports per module; the fastest is used")
+    parser.add_argument('--top', type=int, default=10, help="Slowest imports to list per module")
+    args = parser.parse_args(argv)
+
+    targets = {}
+    for module in args.modules or DEFAULT_TARGETS:
+        budget_ms, forbidden = DEFAULT_TARGETS.get(module, (1000, HEAVY_MODULES))
+        targets[module] = (args.budget_ms or budget_ms, forbidden)
+
+    problems = []
+    for module, (budget_ms, forbidden) in targets.items():
+        lines, module_problems = check_module(module, budget_ms, forbidden, args.repeat, args.top)
+        print('\n'.join(lines))
+        problems.extend(module_problems)
+
+    if problems:
+        print('\nStartup budget exceeded:')
+        for problem in problems:
+            print(f"  - {problem}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
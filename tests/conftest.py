@@ -0,0 +1,34 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The app modules live at the repository root, not in an installed package
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture
+def rates_path():
+    return os.path.join(ROOT, 'interest_rates.csv')
+
+
+@pytest.fixture
+def history_rows():
+    """make(n, first=0, start=...) -> n user history records; savings_amount numbers them from ``first``"""
+    from datetime import datetime, timedelta
+
+    def make(n, first=0, start=datetime(2025, 1, 1, 9, 0), step=timedelta(hours=5)):
+        return [{
+            'savings_amount': float(first + i),
+            'salary_above_3k': i % 2 == 0,
+            'monthly_card_spend': 100.0 * (i % 7),
+            'num_giro_payments': i % 4,
+            'has_insurance': i % 3 == 0,
+            'has_investments': False,
+            'increased_balance': True,
+            'high_balance': False,
+            'recommended_product': i % 3,
+            'timestamp': start + step * i,
+        } for i in range(n)]
+    return make
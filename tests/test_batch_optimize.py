@@ -0,0 +1,103 @@
+import pandas as pd
+import pytest
+
+import batch_optimize
+from batch_optimize import PROFILE_COLUMNS, check_inputs, run_batch
+from utils.interest_engine import calculate_all_banks, process_interest_rates, requirements_from_profile
+
+
+def _profiles(n=40):
+    rows = []
+    for i in range(n):
+        rows.append({
+            'profile_id': i,
+            'savings_amount': 5000 * (i + 1),
+            'salary_above_3k': i % 2 == 0,
+            'monthly_card_spend': 100 * (i % 9),
+            'num_giro_payments': i % 4,
+            'has_insurance': i % 3 == 0,
+            'has_investments': i % 5 == 0,
+            'increased_balance': i % 2 == 1,
+            'high_balance': i >= 30,
+        })
+    frame = pd.DataFrame(rows)
+    # A blank amount, an unparseable flag and a negative spend must each fail only their own row
+    frame = frame.astype({'savings_amount': object, 'has_insurance': object, 'monthly_card_spend': object})
+    for index, (column, value) in BAD_ROWS.items():
+        if index < n:
+            frame.loc[index, column] = value
+    return frame
+
+
+BAD_ROWS = {3: ('savings_amount', ''), 11: ('has_insurance', 'maybe'), 25: ('monthly_card_spend', -5)}
+
+
+def _is_blank(value):
+    # CSV output reads back empty strings, Parquet output nulls
+    return pd.isna(value) or value == ''
+
+
+@pytest.mark.parametrize('suffix', ['.csv', '.parquet'])
+def test_results_keep_input_order_and_report_bad_rows(tmp_path, rates_path, suffix):
+    profiles = _profiles()
+    source = tmp_path / 'profiles.csv'
+    profiles.to_csv(source, index=False)
+    output = tmp_path / f'results{suffix}'
+
+    written = run_batch([str(source)], str(output), rates_path, chunksize=7, workers=2)
+
+    assert written == len(profiles)
+    results = pd.read_parquet(output) if suffix == '.parquet' else pd.read_csv(output, keep_default_na=False)
+    assert list(results['profile_id']) == list(range(len(profiles)))
+
+    banks_data = process_interest_rates(rates_path)
+    for index, row in results.iterrows():
+        if index in BAD_ROWS:
+            assert row['error'].startswith(BAD_ROWS[index][0])
+            assert _is_blank(row['best_bank'])
+            continue
+        assert _is_blank(row['error'])
+        profile = profiles.loc[index, PROFILE_COLUMNS].to_dict()
+        expected = calculate_all_banks(int(profile['savings_amount']), banks_data,
+                                       requirements_from_profile(profile))
+        assert row['best_bank'] == expected[0]['bank']
+        assert float(row['best_bank_annual_interest']) == pytest.approx(expected[0]['annual_interest'])
+
+
+def test_chunk_where_every_row_fails_matches_the_parquet_schema(tmp_path, rates_path):
+    profiles = _profiles(14)
+    profiles['savings_amount'] = ''
+    source = tmp_path / 'profiles.csv'
+    profiles.to_csv(source, index=False)
+    output = tmp_path / 'results.parquet'
+
+    run_batch([str(source)], str(output), rates_path, chunksize=7, workers=1)
+
+    results = pd.read_parquet(output)
+    assert len(results) == 14
+    assert (results['error'] != '').all()
+    assert results['best_bank_annual_interest'].isna().all()
+
+
+def test_inputs_with_different_columns_are_rejected(tmp_path):
+    first = tmp_path / 'a.csv'
+    second = tmp_path / 'b.csv'
+    _profiles(3).to_csv(first, index=False)
+    _profiles(3).drop(columns='profile_id').to_csv(second, index=False)
+
+    with pytest.raises(ValueError, match='different columns'):
+        check_inputs([str(first), str(second)])
+
+
+def test_inputs_missing_profile_columns_are_rejected(tmp_path):
+    source = tmp_path / 'a.csv'
+    _profiles(3).drop(columns='high_balance').to_csv(source, index=False)
+
+    with pytest.raises(ValueError, match='high_balance'):
+        check_inputs([str(source)])
+
+
+def test_parse_bool_accepts_stored_spellings():
+    parsed = batch_optimize._parse_bool(pd.Series(['True', 'false', '1', '0', 'Y', 'no', '', 'x']))
+    assert parsed.tolist()[:6] == [True, False, True, False, True, False]
+    assert parsed.iloc[6:].isna().all()
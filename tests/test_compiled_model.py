@@ -0,0 +1,109 @@
+import os
+import pickle
+
+import numpy as np
+import pytest
+
+from utils.compiled_model import export_linear, export_xgboost, load_compiled, load_xgboost_classifier
+
+xgb = pytest.importorskip('xgboost')
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'models')
+
+
+def _rows(n=500, n_features=6, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, n_features)) * [1, 10, 100, 1000, 0.01, 1]
+    y = (X[:, 0] + X[:, 1] / 10 > 0).astype(int) + (X[:, 2] > 50).astype(int)
+    return X, y
+
+
+def _with_missing(X, seed=1):
+    X = X.copy()
+    X[np.random.default_rng(seed).random(X.shape) < 0.1] = np.nan
+    return X
+
+
+@pytest.mark.parametrize('params', [
+    {'max_depth': 3, 'n_estimators': 30},
+    {'max_depth': 6, 'n_estimators': 20, 'tree_method': 'hist'},
+    {'max_depth': 4, 'n_estimators': 25, 'tree_method': 'exact', 'base_score': 0.3},
+])
+def test_tree_ensemble_matches_xgboost(params):
+    X, y = _rows()
+    model = xgb.XGBClassifier(objective='multi:softprob', learning_rate=0.3, **params)
+    model.fit(_with_missing(X), y)
+    compiled = export_xgboost(model)
+
+    X_test = _with_missing(_rows(seed=7)[0], seed=8)
+    np.testing.assert_allclose(compiled.predict_proba(X_test), model.predict_proba(X_test), atol=1e-6)
+    np.testing.assert_array_equal(compiled.predict(X_test), model.predict(X_test))
+
+
+def test_booster_exports_like_its_classifier():
+    X, y = _rows()
+    booster = xgb.train({'objective': 'multi:softprob', 'num_class': 3, 'max_depth': 3},
+                        xgb.DMatrix(X, y), num_boost_round=15)
+    compiled = export_xgboost(booster)
+
+    np.testing.assert_allclose(compiled.predict_proba(X), booster.predict(xgb.DMatrix(X)), atol=1e-6)
+
+
+def test_save_and_load_round_trip(tmp_path):
+    X, y = _rows()
+    model = xgb.XGBClassifier(objective='multi:softprob', max_depth=3, n_estimators=10).fit(X, y)
+    compiled = export_xgboost(model, [f'x{i}' for i in range(X.shape[1])], ['low', 'mid', 'high'])
+    path = compiled.save(str(tmp_path / 'model.npz'))
+
+    loaded = load_compiled(path)
+    assert loaded.feature_names == compiled.feature_names
+    assert loaded.target_names == ['low', 'mid', 'high']
+    np.testing.assert_array_equal(loaded.predict_proba(X), compiled.predict_proba(X))
+    # A dict row is read in feature order
+    row = dict(zip(loaded.feature_names, X[0]))
+    np.testing.assert_allclose(loaded.predict_proba(row), compiled.predict_proba(X[:1]))
+
+
+def test_binary_objectives_are_rejected():
+    X, y = _rows()
+    model = xgb.XGBClassifier(objective='binary:logistic', n_estimators=5).fit(X, (y > 0).astype(int))
+    with pytest.raises(ValueError, match='multi-class'):
+        export_xgboost(model)
+
+
+def test_linear_model_matches_sklearn():
+    linear_model = pytest.importorskip('sklearn.linear_model')
+    X, y = _rows()
+    X = X / X.std(axis=0)
+    model = linear_model.LogisticRegression(max_iter=1000).fit(X, y)
+    compiled = export_linear(model, [f'x{i}' for i in range(X.shape[1])], ['a', 'b', 'c'])
+
+    np.testing.assert_allclose(compiled.predict_proba(X), model.predict_proba(X), atol=1e-9)
+
+
+def test_shipped_recommender_export_matches_its_artifact():
+    from utils.data_processor import load_training_data, prepare_features
+    from utils.model_manifest import ModelManifest
+
+    manifest = ModelManifest(os.path.join(MODEL_DIR, 'product_recommender.manifest.json'))
+    active = manifest.active()
+    if active is None or not active.compiled:
+        pytest.skip("No compiled recommender version is active")
+    model = load_xgboost_classifier(manifest.artifact_path(active))
+    compiled = load_compiled(manifest.compiled_path(active))
+
+    X, _ = load_training_data(os.path.join(os.path.dirname(MODEL_DIR), 'insurance_training_data.csv'))
+    X = prepare_features(X.copy())
+    np.testing.assert_allclose(compiled.predict_proba(X), model.predict_proba(X[compiled.feature_names]), atol=1e-6)
+
+
+def test_shipped_insurance_export_matches_the_pickle():
+    pytest.importorskip('sklearn')
+    with open(os.path.join(MODEL_DIR, 'insurance_model.pkl'), 'rb') as f:
+        bundle = pickle.load(f)
+    compiled = load_compiled(os.path.join(MODEL_DIR, 'insurance_model.npz'))
+
+    # savings_amount, monthly_card_spend, has_insurance
+    rng = np.random.default_rng(0)
+    X = np.column_stack([rng.uniform(0, 500000, 200), rng.uniform(0, 5000, 200), rng.integers(0, 2, 200)])
+    np.testing.assert_allclose(compiled.predict_proba(X), bundle['model'].predict_proba(X), atol=1e-9)
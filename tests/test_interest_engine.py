@@ -0,0 +1,81 @@
+"""The interest engine must reproduce the original app's results.
+
+tests/data/baseline_results.json holds the output of the original
+calculate_bank_interest, process_interest_rates, optimize_bank_distribution
+and optimize_spend_allocation (from the first commit's Calculator.py, run on
+its interest_rates.csv) for a grid of deposits and requirement profiles.
+"""
+import io
+import json
+import os
+
+import pytest
+
+from utils.interest_engine import (
+    RatesSchemaError,
+    calculate_bank_interest,
+    optimize_bank_distribution,
+    optimize_spend_allocation,
+    process_interest_rates,
+)
+
+with open(os.path.join(os.path.dirname(__file__), 'data', 'baseline_results.json')) as f:
+    BASELINE = json.load(f)
+
+
+@pytest.fixture(scope='module')
+def banks_data():
+    return process_interest_rates(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'interest_rates.csv'))
+
+
+def _case_id(case):
+    return f"{case['profile']}-{case.get('amount', case.get('total_spend'))}"
+
+
+def test_loader_builds_the_same_tiers(banks_data):
+    assert banks_data == BASELINE['banks']
+
+
+@pytest.mark.parametrize('case', BASELINE['interest'], ids=lambda case: f"{_case_id(case)}-{case['bank']}")
+def test_bank_interest_matches_baseline(banks_data, case):
+    requirements = dict(BASELINE['profiles'][case['profile']])
+    result = calculate_bank_interest(case['amount'], banks_data[case['bank']], requirements)
+
+    assert result['total_interest'] == pytest.approx(case['total_interest'], abs=1e-9)
+    assert result['breakdown'] == case['breakdown']
+
+
+@pytest.mark.parametrize('case', BASELINE['optimize'], ids=_case_id)
+def test_optimizer_matches_baseline(banks_data, case):
+    solutions = optimize_bank_distribution(case['amount'], banks_data, dict(BASELINE['profiles'][case['profile']]))
+
+    assert [{key: solution[key] for key in ('distribution', 'total_interest', 'salary_bank')}
+            for solution in solutions] == case['solutions']
+
+
+@pytest.mark.parametrize('case', BASELINE['spend_allocation'], ids=_case_id)
+def test_spend_allocation_matches_baseline(banks_data, case):
+    allocation, total_interest, _ = optimize_spend_allocation(
+        case['total_spend'], banks_data, case['deposits'], dict(BASELINE['profiles'][case['profile']])
+    )
+
+    assert allocation == case['allocation']
+    assert total_interest == pytest.approx(case['total_interest'])
+
+
+def test_schema_errors_list_every_bad_line():
+    csv = (
+        "bank,tier_type,balance_tier,interest_rate,requirement_type,min_spend,min_salary,"
+        "giro_count,salary_credit,cap_amount,remarks\n"
+        "UOB One,base,All,0.05%,base,0,0,0,N,99999999,\n"
+        "UOB One,base,All,five,base,0,0,0,N,99999999,\n"
+        "UOB One,bonus,All,1.00%,base,-1,0,0,X,99999999,\n"
+    )
+    with pytest.raises(RatesSchemaError) as excinfo:
+        process_interest_rates(io.StringIO(csv))
+
+    problems = excinfo.value.problems
+    assert any(problem.startswith('line 3') and 'interest_rate' in problem for problem in problems)
+    assert any(problem.startswith('line 4') and 'tier_type' in problem for problem in problems)
+    assert any(problem.startswith('line 4') and 'min_spend' in problem for problem in problems)
+    assert any(problem.startswith('line 4') and 'salary_credit' in problem for problem in problems)
@@ -0,0 +1,186 @@
+import json
+import multiprocessing
+import os
+import signal
+import threading
+
+import pytest
+
+from utils.model_manifest import ModelManifest
+from utils.model_registry import file_sha256
+
+# Children inherit the test's imports instead of re-importing the repository
+mp = multiprocessing.get_context('fork')
+
+
+def _manifest(model_dir, keep_artifacts=5):
+    return ModelManifest(os.path.join(str(model_dir), 'product_recommender.manifest.json'),
+                         keep_artifacts=keep_artifacts)
+
+
+def _publish(manifest, content, compiled=None, **kwargs):
+    source = os.path.join(manifest.model_dir, f'upload-{os.getpid()}-{threading.get_ident()}.tmp')
+    with open(source, 'w') as f:
+        f.write(content)
+    compiled_path = None
+    if compiled is not None:
+        compiled_path = source + '.npz'
+        with open(compiled_path, 'w') as f:
+            f.write(compiled)
+    return manifest.publish(source, {'content': content}, compiled_path=compiled_path, **kwargs)
+
+
+def _leftovers(model_dir):
+    return [name for name in os.listdir(model_dir) if name.endswith('.tmp')]
+
+
+def test_publish_activate_and_roll_back(tmp_path):
+    manifest = _manifest(tmp_path)
+    assert manifest.active() is None
+
+    first = _publish(manifest, 'one', compiled='one-compiled')
+    second = _publish(manifest, 'two')
+
+    assert [v.version for v in manifest.versions()] == [1, 2]
+    assert manifest.active() == second
+    assert first.compiled == 'product_recommender-v1.npz'
+    assert first.compiled_sha256 == file_sha256(manifest.compiled_path(first))
+    assert second.sha256 == file_sha256(manifest.artifact_path(second))
+    with open(manifest.artifact_path(second)) as f:
+        assert f.read() == 'two'
+
+    manifest.activate(1)
+    assert manifest.active().version == 1
+    assert not _leftovers(tmp_path)
+
+
+def test_unpublished_versions_cannot_be_activated(tmp_path):
+    manifest = _manifest(tmp_path)
+    _publish(manifest, 'one')
+    with pytest.raises(ValueError):
+        manifest.activate(7)
+
+
+def test_pruning_keeps_the_active_and_legacy_artifacts(tmp_path):
+    manifest = _manifest(tmp_path, keep_artifacts=2)
+    # A version published before artifacts were versioned, still opened by name elsewhere
+    with open(tmp_path / 'product_recommender.xgb', 'w') as f:
+        f.write('legacy')
+    with open(manifest.path, 'w') as f:
+        json.dump({'active': 1, 'versions': {'1': {
+            'artifact': 'product_recommender.xgb', 'sha256': file_sha256(str(tmp_path / 'product_recommender.xgb')),
+            'created_at': '2024-01-01T00:00:00', 'metrics': {}, 'note': ''}}}, f)
+
+    for i in range(2, 6):
+        _publish(manifest, f'v{i}', compiled=f'c{i}', activate=i == 2)
+
+    versions = {v.version: v for v in manifest.versions()}
+    assert manifest.active().version == 2
+    assert versions[1].artifact == 'product_recommender.xgb'
+    assert os.path.exists(tmp_path / 'product_recommender.xgb')
+    # v3 is older than the newest two and not active
+    assert versions[3].artifact is None and versions[3].sha256 is None
+    assert versions[3].compiled is None and versions[3].compiled_sha256 is None
+    assert not os.path.exists(tmp_path / 'product_recommender-v3.ubj')
+    assert not os.path.exists(tmp_path / 'product_recommender-v3.npz')
+    for number in (2, 4, 5):
+        assert os.path.exists(manifest.artifact_path(versions[number]))
+        assert os.path.exists(manifest.compiled_path(versions[number]))
+
+
+def test_failed_write_leaves_the_manifest_and_no_temp_files(tmp_path, monkeypatch):
+    manifest = _manifest(tmp_path)
+    _publish(manifest, 'one')
+    with open(manifest.path) as f:
+        before = f.read()
+
+    def fail(*args, **kwargs):
+        raise OSError('disk full')
+    monkeypatch.setattr('utils.model_manifest.json.dump', fail)
+    with pytest.raises(OSError, match='disk full'):
+        manifest.activate(1)
+
+    with open(manifest.path) as f:
+        assert f.read() == before
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.json.tmp')]
+
+
+def _publish_many(model_dir, worker, count, results):
+    manifest = _manifest(model_dir, keep_artifacts=1000)
+    for i in range(count):
+        content = f'{worker}-{i}'
+        results.put((content, _publish(manifest, content).version))
+
+
+def test_concurrent_publishers_never_lose_or_reuse_a_version(tmp_path):
+    workers, count = 4, 8
+    results = mp.Queue()
+    processes = [mp.Process(target=_publish_many, args=(str(tmp_path), w, count, results)) for w in range(workers)]
+    for process in processes:
+        process.start()
+    published = [results.get(timeout=60) for _ in range(workers * count)]
+    for process in processes:
+        process.join(timeout=60)
+        assert process.exitcode == 0
+
+    manifest = _manifest(tmp_path)
+    versions = {v.version: v for v in manifest.versions()}
+    assert sorted(versions) == list(range(1, workers * count + 1))
+    for content, number in published:
+        assert versions[number].metrics == {'content': content}
+        with open(manifest.artifact_path(versions[number])) as f:
+            assert f.read() == content
+    assert not _leftovers(tmp_path)
+
+
+def test_readers_see_a_complete_manifest_during_publishes(tmp_path):
+    manifest = _manifest(tmp_path, keep_artifacts=1000)
+    _publish(manifest, 'seed')
+    stop = threading.Event()
+    problems = []
+
+    def read():
+        reader = _manifest(tmp_path)
+        while not stop.is_set():
+            try:
+                active = reader.active()
+                if active.sha256 != file_sha256(reader.artifact_path(active)):
+                    problems.append(f'version {active.version} does not match its artifact')
+            except Exception as e:
+                problems.append(repr(e))
+
+    readers = [threading.Thread(target=read) for _ in range(3)]
+    for reader in readers:
+        reader.start()
+    publisher = mp.Process(target=_publish_many, args=(str(tmp_path), 'p', 20, mp.Queue()))
+    publisher.start()
+    publisher.join(timeout=60)
+    stop.set()
+    for reader in readers:
+        reader.join()
+
+    assert publisher.exitcode == 0
+    assert problems == []
+    assert manifest.active().version == 21
+
+
+def _hold_lock(model_dir, locked):
+    with _manifest(model_dir)._exclusive():
+        locked.set()
+        signal.pause()
+
+
+def test_a_crashed_publisher_does_not_block_the_next(tmp_path):
+    locked = mp.Event()
+    holder = mp.Process(target=_hold_lock, args=(str(tmp_path), locked))
+    holder.start()
+    assert locked.wait(30)
+    os.kill(holder.pid, signal.SIGKILL)
+    holder.join(timeout=30)
+
+    # The lock dies with its process; publishing must not hang
+    done = mp.Queue()
+    publisher = mp.Process(target=_publish_many, args=(str(tmp_path), 'after', 1, done))
+    publisher.start()
+    assert done.get(timeout=30)[1] == 1
+    publisher.join(timeout=30)
@@ -0,0 +1,70 @@
+from datetime import date
+
+import pytest
+
+from utils.rate_history import UNDATED, RateHistory, add_months
+
+
+def _tier(rate):
+    return {'tier_type': 'base', 'interest_rate': rate}
+
+
+@pytest.fixture
+def history():
+    # Rows out of date order, as a hand-edited rates file may be
+    dates = [date(2025, 3, 1), date(2025, 1, 1), date(2025, 1, 1), date(2025, 3, 1), date(2025, 6, 15)]
+    banks = ['UOB One', 'UOB One', 'OCBC 360', 'OCBC 360', 'UOB One']
+    tiers = [_tier('2.00%'), _tier('1.00%'), _tier('1.50%'), _tier('2.50%'), _tier('3.00%')]
+    return RateHistory(dates, banks, tiers)
+
+
+@pytest.mark.parametrize('when, expected', [
+    (date(2025, 1, 1), date(2025, 1, 1)),
+    (date(2025, 2, 28), date(2025, 1, 1)),
+    (date(2025, 3, 1), date(2025, 3, 1)),
+    (date(2025, 6, 14), date(2025, 3, 1)),
+    (date(2025, 6, 15), date(2025, 6, 15)),
+    (date(2030, 1, 1), date(2025, 6, 15)),
+])
+def test_effective_date_is_the_latest_on_or_before(history, when, expected):
+    assert history.effective_date(when) == expected
+
+
+def test_lookup_before_the_first_rate_set_fails(history):
+    with pytest.raises(LookupError):
+        history.as_of(date(2024, 12, 31))
+
+
+def test_as_of_returns_only_that_rate_set(history):
+    assert history.as_of(date(2025, 2, 1)) == {
+        'OCBC 360': {'bank': 'OCBC 360', 'tiers': [_tier('1.50%')]},
+        'UOB One': {'bank': 'UOB One', 'tiers': [_tier('1.00%')]},
+    }
+    # Each set is complete on its own: the June set lists only the banks it changes
+    assert list(history.as_of(date(2025, 7, 1))) == ['UOB One']
+
+
+def test_rate_sets_are_built_once(history):
+    assert history.as_of(date(2025, 3, 2)) is history.as_of(date(2025, 5, 31))
+
+
+def test_next_change(history):
+    assert history.next_change(date(2025, 1, 1)) == date(2025, 3, 1)
+    assert history.next_change(date(2025, 6, 15)) is None
+
+
+def test_undated_history_is_always_in_force():
+    history = RateHistory([UNDATED, UNDATED], ['UOB One', 'UOB One'], [_tier('1.00%'), _tier('2.00%')])
+    assert len(history) == 1
+    assert history.as_of(date(1990, 1, 1))['UOB One']['tiers'] == [_tier('1.00%'), _tier('2.00%')]
+
+
+def test_rows_round_trip_in_file_order(history):
+    assert [(effective_date, bank) for effective_date, bank, _ in history.rows()] == [
+        (date(2025, 3, 1), 'UOB One'), (date(2025, 1, 1), 'UOB One'), (date(2025, 1, 1), 'OCBC 360'),
+        (date(2025, 3, 1), 'OCBC 360'), (date(2025, 6, 15), 'UOB One'),
+    ]
+
+
+def test_add_months_crosses_years():
+    assert add_months(date(2025, 11, 20), 3) == date(2026, 2, 1)
@@ -0,0 +1,204 @@
+import json
+import multiprocessing
+import os
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from utils import data_processor, retraining
+from utils.retraining import RetrainPolicy, RetrainQueue, RetrainWorker
+
+mp = multiprocessing.get_context('fork')
+
+POLICY = RetrainPolicy(min_new_records=5, debounce_seconds=0.0, max_delay_seconds=0.0)
+
+
+def _queue(tmp_path, **policy):
+    return RetrainQueue(str(tmp_path / 'queue'), POLICY._replace(**policy))
+
+
+def _files(queue, name):
+    return sorted(os.listdir(os.path.join(queue.queue_dir, name)))
+
+
+def _job(queue, name, filename):
+    with open(os.path.join(queue.queue_dir, name, filename)) as f:
+        return json.load(f)
+
+
+def test_requests_below_the_threshold_are_ignored(tmp_path):
+    queue = _queue(tmp_path)
+    assert queue.request(4) is None
+    assert queue.status()['pending'] == 0
+
+
+def test_a_burst_of_requests_coalesces_into_one_job(tmp_path):
+    queue = _queue(tmp_path, debounce_seconds=60.0, max_delay_seconds=120.0)
+    first = queue.request(5)
+    for total in range(6, 15):
+        job = queue.request(total)
+
+    assert job['id'] == first['id']
+    assert job['requests'] == 10
+    assert job['total_records'] == 14
+    assert job['not_before'] <= first['requested_at'] + 120.0
+    assert len(_files(queue, 'pending')) == 1
+    # Still inside its debounce window
+    assert queue.claim() is None
+
+
+@pytest.fixture
+def saving(monkeypatch):
+    """save_user_data with a fake writer counting stored records"""
+    counts = iter(range(1, 1000))
+    monkeypatch.setattr(data_processor, 'get_user_data_writer',
+                        lambda: SimpleNamespace(append=lambda row: next(counts)))
+    features = data_processor.prepare_features({
+        'savings_amount': 50000.0, 'salary_above_3k': True, 'monthly_card_spend': 500.0,
+        'num_giro_payments': 2, 'has_insurance': False, 'has_investments': False,
+        'increased_balance': False, 'high_balance': False,
+    })
+    return lambda: data_processor.save_user_data(features, 1)
+
+
+def test_saving_records_queues_a_retrain(tmp_path, monkeypatch, saving):
+    queue = _queue(tmp_path, debounce_seconds=60.0)
+    monkeypatch.setattr(retraining, '_queue', queue)
+
+    for _ in range(4):
+        saving()
+    assert queue.status()['pending'] == 0
+    assert saving() == 5
+    assert _job(queue, 'pending', _files(queue, 'pending')[0])['total_records'] == 5
+
+
+def test_saving_succeeds_when_the_queue_is_unavailable(monkeypatch, saving):
+    def unavailable(total_records):
+        raise OSError('read-only file system')
+    monkeypatch.setattr(retraining, 'request_retrain', unavailable)
+
+    assert saving() == 1
+
+
+def test_worker_completes_jobs_and_records_the_trained_count(tmp_path):
+    queue = _queue(tmp_path)
+    queue.request(12)
+    trained = []
+
+    def train(job):
+        trained.append(job)
+        return {'records': job['total_records'], 'mode': job['mode'], 'version': 3}
+
+    worker = RetrainWorker(queue, train=train)
+    assert worker.run_once()
+    assert not worker.run_once()
+
+    assert [job['mode'] for job in trained] == ['full']
+    status = queue.status()
+    assert (status['pending'], status['running'], status['done'], status['failed']) == (0, 0, 1, 0)
+    assert (status['trained_records'], status['version']) == (12, 3)
+    # The threshold now counts from the trained records
+    assert queue.request(16) is None
+    assert queue.request(17) is not None
+
+
+def test_failed_jobs_move_to_failed_with_the_error(tmp_path):
+    queue = _queue(tmp_path)
+    queue.request(5)
+
+    def train(job):
+        raise RuntimeError('no data')
+
+    RetrainWorker(queue, train=train).run_once()
+    failed = _files(queue, 'failed')
+    assert len(failed) == 1 and not _files(queue, 'running')
+    assert _job(queue, 'failed', failed[0])['error'] == 'RuntimeError: no data'
+    assert queue.state()['trained_records'] == 0
+
+
+def test_jobs_abandoned_by_a_dead_worker_are_requeued(tmp_path):
+    queue = _queue(tmp_path, stale_after_seconds=0.05)
+    queue.request(5)
+    abandoned = queue.claim()
+    assert _files(queue, 'running') == [f"{abandoned['id']}.json"]
+
+    time.sleep(0.1)
+    finished = []
+    RetrainWorker(queue, train=lambda job: finished.append(job['id']) or {}).run_once()
+
+    assert finished == [abandoned['id']]
+    assert not _files(queue, 'running') and not _files(queue, 'pending')
+    # The original worker finishing late must not leave the job to run again
+    queue.complete(abandoned, {})
+    assert not _files(queue, 'pending')
+
+
+def test_a_worker_killed_mid_job_leaves_it_recoverable(tmp_path):
+    queue = _queue(tmp_path, stale_after_seconds=0.05)
+    queue.request(5)
+    started = mp.Event()
+
+    def hang(job):
+        started.set()
+        time.sleep(60)
+
+    worker = mp.Process(target=RetrainWorker(queue, train=hang).run_once)
+    worker.start()
+    assert started.wait(30)
+    worker.kill()
+    worker.join(timeout=30)
+
+    time.sleep(0.1)
+    assert RetrainWorker(queue, train=lambda job: {'records': 5}).run_once()
+    assert queue.status()['done'] == 1
+
+
+def _request_many(queue_dir, count, results):
+    queue = RetrainQueue(queue_dir, POLICY)
+    for i in range(count):
+        results.put(queue.request(POLICY.min_new_records + i) is not None)
+
+
+def _train_marker(queue_dir):
+    def train(job):
+        # O_EXCL fails if any worker already trained this job
+        fd = os.open(os.path.join(queue_dir, f"trained-{job['id']}"), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        os.close(fd)
+        # Records stay at 0 so every request keeps queueing
+        return {'records': 0}
+    return train
+
+
+def _work(queue_dir, stop):
+    worker = RetrainWorker(RetrainQueue(queue_dir, POLICY), train=_train_marker(queue_dir))
+    # Keep draining until the requesters are done and nothing is left to claim
+    while worker.run_once() or not stop.is_set():
+        time.sleep(0.001)
+
+
+def test_concurrent_requests_and_workers_run_each_job_once(tmp_path):
+    requesters, workers, count = 3, 3, 100
+    queue_dir = str(tmp_path / 'queue')
+    RetrainQueue(queue_dir, POLICY)
+    results, stop = mp.Queue(), mp.Event()
+    requesting = [mp.Process(target=_request_many, args=(queue_dir, count, results)) for _ in range(requesters)]
+    working = [mp.Process(target=_work, args=(queue_dir, stop)) for _ in range(workers)]
+    for process in requesting + working:
+        process.start()
+    queued = sum(results.get(timeout=120) for _ in range(requesters * count))
+    for process in requesting:
+        process.join(timeout=60)
+    stop.set()
+    for process in working:
+        process.join(timeout=60)
+        assert process.exitcode == 0
+
+    queue = RetrainQueue(queue_dir, POLICY)
+    done = [_job(queue, 'done', name) for name in _files(queue, 'done')]
+    assert queue.status()['failed'] == 0
+    assert not _files(queue, 'pending') and not _files(queue, 'running')
+    # Every request went into exactly one finished job, and no job ran twice
+    assert sum(job['requests'] for job in done) == queued == requesters * count
+    assert len([name for name in os.listdir(queue_dir) if name.startswith('trained-')]) == len(done)
+    assert not [name for name in os.listdir(os.path.join(queue_dir, 'pending')) if name.endswith('.tmp')]
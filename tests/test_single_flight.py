@@ -0,0 +1,73 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from utils.single_flight import SingleFlight, optimization_key
+
+
+def _wait_for_followers(flight, count):
+    # The leader holds its computation open until every follower has joined it
+    def compute():
+        while flight.shared < count:
+            time.sleep(0.001)
+        return object()
+    return compute
+
+
+def test_concurrent_callers_share_one_computation():
+    flight = SingleFlight()
+    compute = _wait_for_followers(flight, 7)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: flight.do('key', compute), range(8)))
+
+    assert flight.executed == 1
+    assert flight.shared == 7
+    assert all(result is results[0] for result in results)
+    assert flight.in_flight() == 0
+
+
+def test_followers_receive_the_leaders_exception():
+    flight = SingleFlight()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        while flight.shared < 3:
+            time.sleep(0.001)
+        raise RuntimeError('optimizer failed')
+
+    def call(_):
+        with pytest.raises(RuntimeError, match='optimizer failed'):
+            flight.do('key', compute)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(call, range(4)))
+    assert len(calls) == 1
+    assert flight.in_flight() == 0
+
+
+def test_results_are_not_cached_after_completion():
+    flight = SingleFlight()
+    first = flight.do('key', object)
+    second = flight.do('key', object)
+
+    assert first is not second
+    assert flight.executed == 2
+
+
+def test_different_keys_run_separately():
+    flight = SingleFlight()
+    assert flight.do('a', lambda: 1) == 1
+    assert flight.do('b', lambda: 2) == 2
+    assert flight.shared == 0
+
+
+def test_optimization_key_matches_equivalent_requests():
+    requirements = {'spend_amount': 500, 'has_salary': True}
+    same = {'has_salary': True, 'spend_amount': 500.0}
+
+    assert optimization_key(100000, requirements, 'v1') == optimization_key(100000.0, same, 'v1')
+    assert optimization_key(100000, requirements, 'v1') != optimization_key(100000, requirements, 'v2')
+    assert optimization_key(100000, requirements, 'v1') != optimization_key(
+        100000, dict(requirements, has_salary=False), 'v1')
@@ -0,0 +1,108 @@
+import multiprocessing
+import threading
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from utils.user_db import COLUMNS, UserDatabase
+
+mp = multiprocessing.get_context('fork')
+
+
+@pytest.fixture
+def database(tmp_path):
+    return UserDatabase(str(tmp_path / 'history.db'), fsync=False)
+
+
+def test_append_and_read_in_insertion_order(database, history_rows):
+    assert database.append(history_rows(10)) == 10
+    assert database.append(history_rows(5, first=10)) == 5
+
+    history = database.read()
+    assert database.count() == 15
+    assert list(history.columns) == COLUMNS
+    assert history['savings_amount'].tolist() == [float(i) for i in range(15)]
+    assert history['num_giro_payments'].dtype == 'int32'
+    assert history['has_insurance'].dtype == bool
+    assert history['timestamp'].iloc[1] == pd.Timestamp(2025, 1, 1, 14)
+
+
+def test_since_records_and_time_range(database, history_rows):
+    database.append(history_rows(20))
+
+    recent = database.read(['savings_amount'], since_records=15)
+    assert recent['savings_amount'].tolist() == [15.0, 16.0, 17.0, 18.0, 19.0]
+    # Rows every 5 hours from 2025-01-01 09:00: Jan 2 holds rows 3-7
+    day = database.read(['savings_amount'], start=datetime(2025, 1, 2), end=datetime(2025, 1, 2, 23, 59))
+    assert day['savings_amount'].tolist() == [3.0, 4.0, 5.0, 6.0, 7.0]
+
+
+def test_iter_chunks_pages_through_everything(database, history_rows):
+    database.append(history_rows(23))
+
+    chunks = list(database.iter_chunks(['savings_amount'], chunk_size=10, since_records=2))
+    assert [len(chunk) for chunk in chunks] == [10, 10, 1]
+    assert pd.concat(chunks)['savings_amount'].tolist() == [float(i) for i in range(2, 23)]
+
+
+def test_rows_with_missing_values_are_skipped(database, history_rows):
+    rows = history_rows(3)
+    rows[1]['monthly_card_spend'] = 'n/a'
+
+    assert database.append(rows) == 2
+    assert database.read()['savings_amount'].tolist() == [0.0, 2.0]
+
+
+def test_unknown_columns_are_rejected(database):
+    with pytest.raises(ValueError, match='Unknown'):
+        database.read(['savings_amount', 'password'])
+
+
+def test_legacy_csv_is_imported_once(tmp_path, database, history_rows):
+    legacy = tmp_path / 'user_recommendations.csv'
+    pd.DataFrame(history_rows(4)).to_csv(legacy, index=False)
+
+    assert database.import_legacy(str(legacy), history_dir=str(tmp_path / 'no-parquet')) == 4
+    assert database.import_legacy(str(legacy), history_dir=str(tmp_path / 'no-parquet')) == 0
+    assert database.count() == 4
+
+
+def test_concurrent_thread_writers(database, history_rows):
+    def write(worker):
+        for batch in range(10):
+            database.append(history_rows(5, first=worker * 1000 + batch * 5))
+
+    threads = [threading.Thread(target=write, args=(worker,)) for worker in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert database.count() == 200
+    assert database.read()['savings_amount'].nunique() == 200
+
+
+def _write_from_process(path, rows):
+    database = UserDatabase(path, fsync=False)
+    for batch in range(0, len(rows), 5):
+        database.append(rows[batch:batch + 5])
+
+
+def test_concurrent_process_writers_lose_nothing(tmp_path, history_rows):
+    path = str(tmp_path / 'history.db')
+    # No connection is open in this process across the fork; SQLite connections must not be inherited
+    processes = [mp.Process(target=_write_from_process, args=(path, history_rows(50, first=worker * 1000)))
+                 for worker in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=60)
+        assert process.exitcode == 0
+
+    history = UserDatabase(path).read()
+    assert len(history) == 200
+    # Each writer's rows keep their own order
+    for worker in range(4):
+        mine = history['savings_amount'][history['savings_amount'] // 1000 == worker]
+        assert mine.tolist() == [float(worker * 1000 + i) for i in range(50)]
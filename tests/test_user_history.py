@@ -0,0 +1,106 @@
+import multiprocessing
+import os
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+from utils.user_history import UserHistoryStore
+
+pytest.importorskip('pyarrow')
+
+mp = multiprocessing.get_context('fork')
+
+MINUTE = timedelta(minutes=1)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return UserHistoryStore(str(tmp_path / 'history'), fsync=False)
+
+
+def _day_dirs(store):
+    return sorted(name for name in os.listdir(store.root) if name.startswith('day='))
+
+
+def test_rows_are_partitioned_by_day_and_read_in_append_order(store, history_rows):
+    # 12 rows every 5 hours from 2025-01-01 09:00 span Jan 1 to Jan 3
+    assert store.append(history_rows(12)) == 12
+    assert store.append(history_rows(3, first=12, start=datetime(2025, 1, 3, 23))) == 3
+
+    assert _day_dirs(store) == ['day=2025-01-01', 'day=2025-01-02', 'day=2025-01-03', 'day=2025-01-04']
+    history = store.read()
+    assert store.count() == 15
+    assert history['savings_amount'].tolist() == [float(i) for i in range(15)]
+    assert history['num_giro_payments'].dtype == 'int32'
+
+
+def test_time_range_opens_only_overlapping_partitions(store, history_rows):
+    store.append(history_rows(12))
+
+    assert len(store.files(start=datetime(2025, 1, 2), end=datetime(2025, 1, 2, 23))) == 1
+    day = store.read(['savings_amount'], start=datetime(2025, 1, 2, 1), end=datetime(2025, 1, 2, 16))
+    assert day['savings_amount'].tolist() == [4.0, 5.0, 6.0]
+
+
+def test_since_records_skips_whole_files_and_partial_ones(store, history_rows):
+    # One file per append, as when records are saved with the current time
+    for batch in range(4):
+        store.append(history_rows(5, first=batch * 5, start=datetime(2025, 1, 1, 8 + batch), step=MINUTE))
+
+    assert store.read(['savings_amount'], since_records=7)['savings_amount'].tolist() == [
+        float(i) for i in range(7, 20)]
+    chunks = list(store.iter_chunks(['savings_amount'], chunk_size=6, since_records=3))
+    assert pd.concat(chunks)['savings_amount'].tolist() == [float(i) for i in range(3, 20)]
+    # A chunk closes once it reaches chunk_size, so it overshoots by less than one batch
+    assert all(len(chunk) < 6 + 5 for chunk in chunks)
+
+
+def test_rows_without_a_timestamp_are_skipped(store, history_rows):
+    rows = history_rows(3)
+    rows[1]['timestamp'] = 'not a date'
+
+    assert store.append(rows) == 2
+    assert store.read()['savings_amount'].tolist() == [0.0, 2.0]
+
+
+def test_compaction_merges_parts_without_changing_the_history(store, history_rows):
+    for batch in range(6):
+        store.append(history_rows(4, first=batch * 4, start=datetime(2025, 1, 1, 8 + batch), step=MINUTE))
+    before = store.read()
+    assert len(store.files()) == 6
+
+    assert store.compact(min_files=4, settle_seconds=0) == 6
+    assert len(store.files()) == 1
+    pd.testing.assert_frame_equal(store.read(), before)
+    assert not [name for name in os.listdir(os.path.join(store.root, 'day=2025-01-01')) if name.endswith('.tmp')]
+
+
+def test_legacy_csv_is_imported_once(tmp_path, store, history_rows):
+    legacy = tmp_path / 'user_recommendations.csv'
+    pd.DataFrame(history_rows(4)).to_csv(legacy, index=False)
+
+    assert store.import_csv(str(legacy)) == 4
+    assert store.import_csv(str(legacy)) == 0
+    assert store.count() == 4
+
+
+def _write_from_process(root, rows):
+    store = UserHistoryStore(root, fsync=False)
+    for batch in range(0, len(rows), 5):
+        store.append(rows[batch:batch + 5])
+
+
+def test_concurrent_process_writers_lose_nothing(tmp_path, history_rows):
+    root = str(tmp_path / 'history')
+    processes = [mp.Process(target=_write_from_process, args=(root, history_rows(40, first=worker * 1000)))
+                 for worker in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=60)
+        assert process.exitcode == 0
+
+    history = UserHistoryStore(root).read()
+    assert len(history) == 160
+    assert history['savings_amount'].nunique() == 160
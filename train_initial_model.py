@@ -1,38 +1,46 @@
 from utils.data_processor import load_training_data, prepare_features
 from utils.model_handler import ProductRecommender
+from utils.compact_training import TrainingBudget
+import argparse
+import logging
 import pandas as pd
 import os
 from datetime import datetime
-from xgboost import XGBClassifier
 
-def log_model_version(num_samples, accuracy, version):
-    """Log model version information to a file"""
-    log_dir = os.path.join(os.path.dirname(__file__), 'models')
-    os.makedirs(log_dir, exist_ok=True)
-    log_file = os.path.join(log_dir, 'model_versions.txt')
-    version_file = os.path.join(log_dir, 'model_version.txt')
-    
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    log_entry = f"[{timestamp}] Model retrained with {num_samples} samples. Training accuracy: {accuracy:.2%}\n"
-    version_entry = f"{version}\n"
-    
-    with open(log_file, 'a') as f:
-        f.write(log_entry)
-    with open(version_file, 'w') as f:
-        f.write(version_entry)
-    
-    print(f"✓ Logged model version to: {log_file}")
-    print(f"✓ Saved model version to: {version_file}")
+def train_streamed(live_share=None, chunk_size=50000, external_memory=False):
+    """Train on the seed data and all user history, streamed in chunks with bounded memory"""
+    print("\n=== Starting Streamed Model Training (seed + user data) ===")
+    recommender = ProductRecommender()
+    try:
+        saved, accuracy = recommender.train_streaming(live_share=live_share, chunk_size=chunk_size,
+                                                      external_memory=external_memory)
+    except ValueError as e:
+        print(f"✗ Error during streamed training: {str(e)}")
+        return
+    report = recommender.last_training_report
+    print(f"✓ {report.seed_rows} seed rows (weight {report.weights.seed:.3f}) + "
+          f"{report.live_rows} user rows (weight {report.weights.live:.3f})")
+    print(f"✓ Built the training matrix in {report.build_seconds:.2f}s, trained in {report.train_seconds:.2f}s")
+    if not saved:
+        print("✗ Error: the trained model could not be saved")
+        return
+    print(f"Model training completed and saved! Training accuracy: {accuracy:.2%}")
+
+def train_initial_model(profile='default', budget=None, since=None, since_records=0):
+    """Train the recommender; profile 'compact' enforces ``budget`` (compact_training.TrainingBudget).
 
-def train_initial_model():
+    ``since`` (a datetime) and ``since_records`` restrict training to the
+    user records stored from that time or after the first n records.
+    """
     print("\n=== Starting Model Training ===")
     
     # Load the training data
     print("\n1. Loading training data...")
     try:
         # Try to load user data first
-        from utils.data_processor import load_user_data
-        user_df = load_user_data()
+        from utils.data_processor import FEATURES, load_user_data
+        user_df = load_user_data(columns=FEATURES + ['recommended_product'], start=since,
+                                 since_records=since_records)
         if len(user_df) > 0:
             print(f"Found {len(user_df)} user data records")
             training_df = user_df
@@ -50,29 +58,31 @@ def train_initial_model():
     
     # Initialize and train the model
     print("\n2. Training model...")
-    model = XGBClassifier(
-        objective='multi:softprob',
-        num_class=3,
-        max_depth=3,
-        learning_rate=0.1,
-        n_estimators=100
-    )
-    model.fit(X, y)
-
-    # Save model using xgboost's save_model
-    models_dir = os.path.join(os.path.dirname(__file__), 'models')
-    model.save_model(os.path.join(models_dir, 'product_recommender.xgb'))
-
-    # Create version file
-    with open(os.path.join(models_dir, 'version.txt'), 'w') as f:
-        f.write('1')
-
-    print("Initial model training completed and saved!")
+    if profile == 'compact':
+        recommender = ProductRecommender()
+        try:
+            saved, accuracy = recommender.train_model(X, y, profile='compact', budget=budget)
+        except ValueError as e:
+            print(f"✗ Error during compact training: {str(e)}")
+            return
+        print(recommender.last_training_report)
+        if not saved:
+            print("✗ Compact model exceeded its budget; kept the current model")
+            return
+        print(f"Compact model training completed and saved! Holdout accuracy: {accuracy:.2%}")
+    else:
+        recommender = ProductRecommender()
+        saved, accuracy = recommender.train_model(X, y)
+        if not saved:
+            print("✗ Error: the trained model could not be saved")
+            return
+        # Scored on the rows it was fitted to; use --profile compact for a holdout score
+        print(f"Initial model training completed and saved! In-sample accuracy: {accuracy:.2%}")
     
-    # Verify the model exists
-    if os.path.exists(os.path.join(models_dir, 'product_recommender.xgb')):
-        print(f"✓ Model file exists at: {os.path.join(models_dir, 'product_recommender.xgb')}")
-        print(f"✓ File size: {os.path.getsize(os.path.join(models_dir, 'product_recommender.xgb'))} bytes")
+    # Verify the published model exists
+    if recommender.model_path and os.path.exists(recommender.model_path):
+        print(f"✓ Version {recommender.version} published at: {recommender.model_path}")
+        print(f"✓ File size: {os.path.getsize(recommender.model_path)} bytes")
     else:
         print("✗ Error: Model file not found after training")
         return
@@ -87,12 +97,40 @@ def train_initial_model():
         print("\n4. Testing prediction...")
         test_features = X.iloc[0:1]
         try:
-            prediction, probabilities = new_recommender.predict(test_features)
+            prediction, probabilities, _ = new_recommender.predict(test_features)
             print(f"✓ Test prediction successful: {prediction}")
         except Exception as e:
             print(f"✗ Error during prediction: {str(e)}")
     else:
         print("✗ Error: Could not load the trained model")
 
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the product recommender model")
+    parser.add_argument('--profile', choices=['default', 'compact'], default='default',
+                        help="'compact': hist, early stopping, round pruning, size/latency budgets")
+    parser.add_argument('--max-size-kb', type=float, default=TrainingBudget().max_model_bytes / 1024,
+                        help="Compact profile: largest allowed model size")
+    parser.add_argument('--max-p99-ms', type=float, default=TrainingBudget().max_p99_latency_ms,
+                        help="Compact profile: largest allowed p99 single-row latency")
+    parser.add_argument('--since', type=datetime.fromisoformat, metavar='YYYY-MM-DD[ HH:MM]',
+                        help="Train only on user records stored from this time")
+    parser.add_argument('--since-records', type=int, default=0, metavar='N',
+                        help="Train only on user records stored after the first N")
+    parser.add_argument('--source', choices=['auto', 'combined'], default='auto',
+                        help="'auto': user data if there is any, else the seed data; "
+                             "'combined': both, streamed in chunks with bounded memory")
+    parser.add_argument('--live-share', type=float, default=None,
+                        help="Combined source: share of total sample weight given to user rows (capped while the history is small)")
+    parser.add_argument('--chunk-size', type=int, default=50000, help="Combined source: rows per chunk")
+    parser.add_argument('--external-memory', action='store_true',
+                        help="Combined source: page the training matrix to disk")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    if args.source == 'combined':
+        train_streamed(args.live_share, args.chunk_size, args.external_memory)
+        return
+    budget = TrainingBudget(int(args.max_size_kb * 1024), args.max_p99_ms)
+    train_initial_model(profile=args.profile, budget=budget, since=args.since, since_records=args.since_records)
+
 if __name__ == "__main__":
-    train_initial_model()
+    main()
@@ -0,0 +1,279 @@
+"""Cross-validated hyperparameter search for the product recommender.
+
+Runs stratified k-fold cross-validation for every parameter combination in
+the grid across a process pool. Each worker loads the training sample once
+and builds each fold's train and validation DMatrix the first time it needs
+it (one per fold and max_bin), so combinations reuse them instead of
+re-quantising the data. The report lists mean and spread of validation
+accuracy next to the serialized model size and single-row prediction
+latency (measured afterwards in this process, so the pool doesn't skew it).
+
+The winner is the smallest model whose mean accuracy is within
+``--tolerance`` of the best, among those inside the optional size and
+latency budget (``--max-size-kb``, ``--max-p99-ms``).
+It is retrained on the whole sample and published to the model manifest as
+the next active version (with its compiled export), recording its
+parameters, cross-validated accuracy and other metrics.
+
+Usage:
+    python tune_recommender.py
+    python tune_recommender.py --folds 3 --workers 4 --grid '{"max_depth": [2, 3], "learning_rate": [0.1]}'
+    python tune_recommender.py --dry-run --top 20
+"""
+import argparse
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GRID = {
+    'max_depth': [2, 3, 4, 6],
+    'learning_rate': [0.05, 0.1, 0.3],
+    'n_estimators': [50, 100, 200],
+    'min_child_weight': [1, 5],
+}
+
+
+class SearchResult(NamedTuple):
+    params: dict
+    mean_accuracy: float
+    std_accuracy: float
+    fit_seconds: float
+    model_bytes: int = 0
+    p50_latency_ms: float = 0.0
+    p99_latency_ms: float = 0.0
+
+
+# Per-process state, set up once by the pool initializer
+_X = _y = _w = None
+_folds = None
+_nthread = 1
+_fold_matrices = {}
+
+
+def _init_worker(data_path, n_folds, seed, nthread):
+    global _X, _y, _w, _folds, _nthread
+    from sklearn.model_selection import StratifiedKFold
+
+    with np.load(data_path) as data:
+        _X, _y, _w = data['X'], data['y'], data['w']
+    _folds = list(StratifiedKFold(n_folds, shuffle=True, random_state=seed).split(_X, _y))
+    _nthread = nthread
+
+
+def _fold_matrix(fold, max_bin):
+    """(train, validation) QuantileDMatrix for one fold, built once per worker"""
+    import xgboost as xgb
+
+    key = (fold, max_bin)
+    if key not in _fold_matrices:
+        train_index, valid_index = _folds[fold]
+        dtrain = xgb.QuantileDMatrix(_X[train_index], _y[train_index], weight=_w[train_index],
+                                     max_bin=max_bin, nthread=_nthread)
+        dvalid = xgb.QuantileDMatrix(_X[valid_index], _y[valid_index], ref=dtrain, nthread=_nthread)
+        _fold_matrices[key] = (dtrain, dvalid)
+    return _fold_matrices[key]
+
+
+def _booster_params(params):
+    from utils.training_data import STREAMING_PARAMS
+
+    params = dict(params)
+    rounds = params.pop('n_estimators', 100)
+    params.pop('max_bin', None)
+    return dict(STREAMING_PARAMS, nthread=_nthread, **params), rounds
+
+
+def evaluate_params(params):
+    """Cross-validate one combination; returns (SearchResult without size/latency, fold 0 model bytes)"""
+    import xgboost as xgb
+
+    booster_params, rounds = _booster_params(params)
+    accuracies = []
+    started = time.perf_counter()
+    first_model = None
+    for fold in range(len(_folds)):
+        dtrain, dvalid = _fold_matrix(fold, params.get('max_bin', 256))
+        booster = xgb.train(booster_params, dtrain, num_boost_round=rounds)
+        predicted = booster.predict(dvalid).argmax(axis=1)
+        accuracies.append(float((predicted == _y[_folds[fold][1]]).mean()))
+        if first_model is None:
+            first_model = bytes(booster.save_raw(raw_format='ubj'))
+    result = SearchResult(params, float(np.mean(accuracies)), float(np.std(accuracies)),
+                          time.perf_counter() - started)
+    return result, first_model
+
+
+def expand_grid(grid):
+    """Every combination of a {param: [values]} grid, as dicts"""
+    names = sorted(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def load_sample(live_share=None, max_rows=200000, chunk_size=50000, seed=0):
+    """(X, y, weights) from the seed data and user history, uniformly sampled down to ``max_rows``"""
+    from utils.training_data import TrainingChunks, count_csv_rows, source_weights, SEED_DATA_FILE
+    from utils.data_processor import get_user_store
+
+    store = get_user_store()
+    seed_rows, live_rows = count_csv_rows(SEED_DATA_FILE), store.count()
+    chunks = TrainingChunks(store, source_weights(seed_rows, live_rows, live_share), chunk_size=chunk_size)
+    keep = min(1.0, max_rows / max(seed_rows + live_rows, 1))
+    rng = np.random.default_rng(seed)
+    parts = []
+    for X, y, weight in chunks.frames():
+        mask = rng.random(len(y)) < keep
+        parts.append((X.to_numpy(dtype=np.float32)[mask], np.asarray(y)[mask],
+                      np.full(int(mask.sum()), weight, dtype=np.float32)))
+    return tuple(np.concatenate(column) for column in zip(*parts))
+
+
+def measure_model(model_bytes, row):
+    """(size in bytes, p50 ms, p99 ms) of a serialized booster, served as an XGBClassifier"""
+    import xgboost as xgb
+
+    from utils.compact_training import measure_latency
+
+    model = xgb.XGBClassifier()
+    model.load_model(bytearray(model_bytes))
+    p50, p99 = measure_latency(model, row)
+    return len(model_bytes), p50, p99
+
+
+def run_search(grid, folds=5, workers=None, live_share=None, max_rows=200000, seed=42):
+    """Cross-validate every grid combination in a process pool; returns (results best first, sample)"""
+    import pandas as pd
+
+    from utils.data_processor import FEATURES
+
+    X, y, w = load_sample(live_share, max_rows)
+    if len(np.unique(y)) < 2 or np.bincount(y.astype(int)).min() < folds:
+        raise ValueError(f"Every product class needs at least {folds} rows for {folds}-fold cross-validation")
+    combinations = expand_grid(grid)
+    workers = workers or os.cpu_count() or 1
+    nthread = max(1, (os.cpu_count() or 1) // workers)
+    logger.info(f"Searching {len(combinations)} combinations x {folds} folds on {len(y)} rows "
+                f"with {workers} workers")
+
+    with tempfile.TemporaryDirectory(prefix='recommender-search-') as tmp:
+        data_path = os.path.join(tmp, 'sample.npz')
+        np.savez(data_path, X=X, y=y, w=w)
+        # spawn: forked children can deadlock in xgboost's OpenMP runtime
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_worker, initargs=(data_path, folds, seed, nthread)) as pool:
+            evaluated = list(pool.map(evaluate_params, combinations))
+
+    row = pd.DataFrame(X[:1], columns=FEATURES)
+    results = [result._replace(**dict(zip(('model_bytes', 'p50_latency_ms', 'p99_latency_ms'),
+                                          measure_model(model_bytes, row))))
+               for result, model_bytes in evaluated]
+    results.sort(key=lambda result: (-result.mean_accuracy, result.model_bytes))
+    return results, (X, y, w)
+
+
+def choose_winner(results, tolerance=0.005, budget=None):
+    """Smallest model within ``tolerance`` of the best mean accuracy, among those inside ``budget``"""
+    if budget is not None:
+        results = [result for result in results
+                   if result.model_bytes <= budget.max_model_bytes
+                   and result.p99_latency_ms <= budget.max_p99_latency_ms]
+    if not results:
+        return None
+    best = max(result.mean_accuracy for result in results)
+    close = [result for result in results if result.mean_accuracy >= best - tolerance]
+    return min(close, key=lambda result: (result.model_bytes, result.p99_latency_ms))
+
+
+def format_report(results, winner=None, top=10):
+    lines = [f"{'accuracy':>10}{'± std':>8}{'size KB':>9}{'p50 ms':>8}{'p99 ms':>8}{'fit s':>7}  params"]
+    for result in results[:top]:
+        marker = ' *' if result is winner else ''
+        params = ', '.join(f"{name}={value}" for name, value in sorted(result.params.items()))
+        lines.append(f"{result.mean_accuracy:>10.2%}{result.std_accuracy:>8.2%}{result.model_bytes / 1024:>9.1f}"
+                     f"{result.p50_latency_ms:>8.3f}{result.p99_latency_ms:>8.3f}{result.fit_seconds:>7.2f}"
+                     f"  {params}{marker}")
+    return '\n'.join(lines)
+
+
+def train_and_publish(winner, sample, folds):
+    """Fit the winner on the whole sample and publish it as the next active version; returns the version"""
+    import xgboost as xgb
+
+    from utils.data_processor import FEATURES
+    from utils.model_handler import ProductRecommender
+
+    global _nthread
+    _nthread = os.cpu_count() or 1
+    X, y, w = sample
+    booster_params, rounds = _booster_params(winner.params)
+    booster = xgb.train(booster_params, xgb.DMatrix(X, y, weight=w, feature_names=FEATURES),
+                        num_boost_round=rounds)
+
+    metrics = {
+        'params': winner.params,
+        'cv_folds': folds,
+        'cv_accuracy_std': round(winner.std_accuracy, 6),
+        'model_bytes': winner.model_bytes,
+        'p99_latency_ms': round(winner.p99_latency_ms, 4),
+    }
+    # The manifest is the only record of the version; its accuracy is the cross-validated one
+    recommender = ProductRecommender()
+    saved, _ = recommender.adopt_booster(booster, len(y), winner.mean_accuracy,
+                                         note=f' ({folds}-fold CV, tuned)', **metrics)
+    if not saved:
+        raise RuntimeError("The tuned model could not be saved")
+    return recommender.version
+
+
+def main(argv=None):
+    from utils.compact_training import TrainingBudget
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--grid', type=json.loads, default=DEFAULT_GRID,
+                        help="JSON object of parameter -> list of values (default: a depth/rate/rounds grid)")
+    parser.add_argument('--folds', type=int, default=5, help="Cross-validation folds")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--live-share', type=float, default=None,
+                        help="Share of total sample weight given to user history rows (capped while the history is small)")
+    parser.add_argument('--max-rows', type=int, default=200000, help="Rows sampled for the search")
+    parser.add_argument('--tolerance', type=float, default=0.005,
+                        help="Prefer the smallest model within this accuracy of the best")
+    parser.add_argument('--max-size-kb', type=float, default=None, help="Largest allowed model size")
+    parser.add_argument('--max-p99-ms', type=float, default=None,
+                        help="Largest allowed p99 single-row latency")
+    parser.add_argument('--top', type=int, default=10, help="Combinations to list")
+    parser.add_argument('--dry-run', action='store_true', help="Report only; don't train or publish the winner")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    started = time.time()
+    results, sample = run_search(args.grid, args.folds, args.workers, args.live_share, args.max_rows)
+    budget = None
+    if args.max_size_kb or args.max_p99_ms:
+        budget = TrainingBudget(int(args.max_size_kb * 1024) if args.max_size_kb else sys.maxsize,
+                                args.max_p99_ms or float('inf'))
+    winner = choose_winner(results, args.tolerance, budget)
+    print(format_report(results, winner, args.top))
+    print(f"\n{len(results)} combinations in {time.time() - started:.1f}s")
+    if winner is None:
+        print("No combination is within the size and latency budget")
+        return 1
+    print(f"Winner: {winner.params} ({winner.mean_accuracy:.2%} ± {winner.std_accuracy:.2%})")
+    if not args.dry_run:
+        version = train_and_publish(winner, sample, args.folds)
+        print(f"Published product_recommender version {version}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
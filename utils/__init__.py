@@ -1,3 +1,35 @@
 # Initialize the utils package
-from .data_processor import *
-from .model_handler import *
+#
+# Submodules are imported on first attribute access (PEP 562) rather than
+# star-imported here, so importing one light module such as
+# utils.interest_engine does not pull in pandas, xgboost or streamlit.
+import importlib
+
+_EXPORTS = {
+    'FEATURES': 'data_processor',
+    'PRODUCT_MAPPING': 'data_processor',
+    'load_training_data': 'data_processor',
+    'prepare_features': 'data_processor',
+    'load_user_data': 'data_processor',
+    'save_user_data': 'data_processor',
+    'get_user_store': 'data_processor',
+    'BOOLEAN_FEATURES': 'model_handler',
+    'BatchPrediction': 'model_handler',
+    'ProductRecommender': 'model_handler',
+    'get_explainer': 'model_handler',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{module}', __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
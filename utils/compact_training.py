@@ -0,0 +1,196 @@
+"""Compact training profile for the product recommender.
+
+``train_compact`` fits with the hist tree method and early stopping on a
+stratified holdout, then truncates trailing boosting rounds that don't
+change any prediction. ``evaluate_model`` measures holdout accuracy,
+serialized size and single-row p50/p99 latency, and ``check_budget`` rejects
+a candidate that is too large or too slow. ``compare_report`` renders the
+candidate against the current model. The current model was usually trained
+on data that includes the holdout rows, so its accuracy there is in-sample
+and is labelled as such rather than compared like for like. Only trailing rounds are pruned
+because XGBoost can slice a model by rounds but not drop arbitrary trees.
+"""
+import json
+import logging
+import time
+from typing import NamedTuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+COMPACT_PARAMS = {
+    'objective': 'multi:softprob',
+    'tree_method': 'hist',
+    'max_bin': 64,
+    'max_depth': 3,
+    'learning_rate': 0.3,
+    'n_estimators': 200,
+    'early_stopping_rounds': 10,
+    'eval_metric': 'mlogloss',
+}
+
+
+class TrainingBudget(NamedTuple):
+    """Limits a trained model must meet before it replaces the current one"""
+    max_model_bytes: int = 128 * 1024
+    max_p99_latency_ms: float = 10.0
+
+
+class ModelEvaluation(NamedTuple):
+    accuracy: float
+    model_bytes: int
+    p50_latency_ms: float
+    p99_latency_ms: float
+    n_trees: int
+
+
+class TrainingBudgetError(ValueError):
+    """Raised when a trained model exceeds its size or latency budget"""
+
+    def __init__(self, problems):
+        self.problems = problems
+        super().__init__('; '.join(problems))
+
+
+# Booster attribute holding the parameters a model was trained with. Model
+# files keep attributes but not the training configuration, so without it a
+# reloaded model would be continued with xgboost's defaults.
+TRAINING_PARAMS_ATTR = 'training_params'
+_TREE_PARAMS = ('max_depth', 'eta', 'min_child_weight', 'gamma', 'lambda', 'alpha', 'subsample',
+                'colsample_bytree', 'max_bin', 'grow_policy', 'max_leaves')
+
+
+def _config_value(value):
+    for kind in (int, float):
+        try:
+            return kind(value)
+        except ValueError:
+            continue
+    return value
+
+
+def record_training_params(booster):
+    """Store the booster's training parameters as an attribute, unless it already has them"""
+    if booster.attr(TRAINING_PARAMS_ATTR) is not None:
+        return
+    learner = json.loads(booster.save_config())['learner']
+    tree_params = learner['gradient_booster'].get('tree_train_param', {})
+    params = {
+        'objective': learner['objective']['name'],
+        'num_class': int(learner['learner_model_param']['num_class']),
+        'tree_method': learner['gradient_booster'].get('gbtree_train_param', {}).get('tree_method', 'auto'),
+    }
+    params.update((name, _config_value(tree_params[name])) for name in _TREE_PARAMS if name in tree_params)
+    booster.set_attr(**{TRAINING_PARAMS_ATTR: json.dumps(params, sort_keys=True)})
+
+
+def training_params(booster):
+    """Parameters recorded by record_training_params, or None for older model files"""
+    recorded = booster.attr(TRAINING_PARAMS_ATTR)
+    return json.loads(recorded) if recorded is not None else None
+
+
+def _classifier_from_booster(booster):
+    import xgboost as xgb
+
+    # The round trip through save_raw drops the training configuration
+    record_training_params(booster)
+    model = xgb.XGBClassifier()
+    model.load_model(bytearray(booster.save_raw(raw_format='ubj')))
+    return model
+
+
+def _log_loss(probabilities, y):
+    picked = probabilities[np.arange(len(y)), np.asarray(y, dtype=int)]
+    return float(-np.mean(np.log(np.clip(picked, 1e-15, None))))
+
+
+def split_holdout(X, y, holdout=0.2, seed=42):
+    """Stratified (X_train, X_holdout, y_train, y_holdout)"""
+    from sklearn.model_selection import train_test_split
+
+    return train_test_split(X, y, test_size=holdout, random_state=seed, stratify=y)
+
+
+def train_compact(X_train, y_train, X_holdout, y_holdout, logloss_tolerance=0.01, **params):
+    """Fit a compact XGBClassifier; returns (model, number of boosting rounds kept)"""
+    import xgboost as xgb
+
+    if len(np.unique(y_train)) < 2 or len(np.unique(y_holdout)) < 2:
+        raise ValueError("Compact training needs at least two product classes in both training and holdout data")
+    params = dict(COMPACT_PARAMS, **params)
+    model = xgb.XGBClassifier(**params)
+    model.fit(X_train, y_train, eval_set=[(X_holdout, y_holdout)], verbose=False)
+    best_rounds = model.best_iteration + 1
+
+    # Smallest prefix of rounds that predicts the same class for every row
+    # and keeps holdout log loss within tolerance of the early-stopped model
+    X_all = np.vstack([np.asarray(X_train, dtype=float), np.asarray(X_holdout, dtype=float)])
+    full_classes = model.predict_proba(X_all, iteration_range=(0, best_rounds)).argmax(axis=1)
+    full_loss = _log_loss(model.predict_proba(X_holdout, iteration_range=(0, best_rounds)), y_holdout)
+    rounds = best_rounds
+    for candidate in range(1, best_rounds):
+        if (model.predict_proba(X_all, iteration_range=(0, candidate)).argmax(axis=1) == full_classes).all() \
+                and _log_loss(model.predict_proba(X_holdout, iteration_range=(0, candidate)), y_holdout) \
+                <= full_loss + logloss_tolerance:
+            rounds = candidate
+            break
+
+    logger.info(f"Compact model: early stopping kept {best_rounds} rounds, pruned to {rounds}")
+    return _classifier_from_booster(model.get_booster()[:rounds]), rounds
+
+
+def _serialized_size(model):
+    return len(model.get_booster().save_raw(raw_format='ubj'))
+
+
+def measure_latency(model, row, repeat=300):
+    """(p50, p99) milliseconds for single-row predict_proba"""
+    model.predict_proba(row)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        model.predict_proba(row)
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.percentile(timings, 50)), float(np.percentile(timings, 99))
+
+
+def evaluate_model(model, X_holdout, y_holdout):
+    """Accuracy on the holdout, UBJSON size, single-row latency and tree count"""
+    accuracy = float((model.predict_proba(X_holdout).argmax(axis=1) == np.asarray(y_holdout)).mean())
+    p50, p99 = measure_latency(model, X_holdout.iloc[:1] if hasattr(X_holdout, 'iloc') else X_holdout[:1])
+    return ModelEvaluation(accuracy, _serialized_size(model), p50, p99, len(model.get_booster().get_dump()))
+
+
+def check_budget(evaluation, budget):
+    """Raise TrainingBudgetError listing every budget the evaluated model exceeds"""
+    problems = []
+    if evaluation.model_bytes > budget.max_model_bytes:
+        problems.append(f"model is {evaluation.model_bytes} bytes, budget is {budget.max_model_bytes}")
+    if evaluation.p99_latency_ms > budget.max_p99_latency_ms:
+        problems.append(
+            f"p99 latency is {evaluation.p99_latency_ms:.2f} ms, budget is {budget.max_p99_latency_ms} ms"
+        )
+    if problems:
+        raise TrainingBudgetError(problems)
+
+
+def compare_report(candidate, current=None, current_file_bytes=None):
+    """Text table of the candidate's metrics next to the current model's (file size optional)"""
+    rows = [
+        ('accuracy', lambda e: f"{e.accuracy:.2%}"),
+        ('model size', lambda e: f"{e.model_bytes / 1024:.1f} KB"),
+        ('p50 latency', lambda e: f"{e.p50_latency_ms:.3f} ms"),
+        ('p99 latency', lambda e: f"{e.p99_latency_ms:.3f} ms"),
+        ('trees', lambda e: str(e.n_trees)),
+    ]
+    lines = [f"{'':18}{'current':>14}{'compact':>14}"]
+    for label, fmt in rows:
+        lines.append(f"{label:18}{fmt(current) if current else '-':>14}{fmt(candidate):>14}")
+    if current_file_bytes is not None:
+        lines.append(f"{'file on disk':18}{current_file_bytes / 1024:>11.1f} KB{'-':>14}")
+    if current:
+        lines.append("accuracy is on the compact model's holdout; the current model may have been "
+                     "trained on those rows, so its figure is in-sample")
+    return '\n'.join(lines)
@@ -0,0 +1,310 @@
+"""Models compiled to flat NumPy arrays for low-latency scoring.
+
+``export_xgboost`` flattens a multi:softprob XGBoost ensemble into
+(n_trees, max_nodes) arrays of split features, thresholds, children,
+missing-value directions and leaf values; ``export_linear`` does the same for
+the logistic-regression insurance model (coefficients and intercepts). The
+compiled models are written as .npz files and evaluated with NumPy alone, so
+serving code can score a row in microseconds without importing xgboost or
+scikit-learn. xgboost is only imported when exporting.
+
+Usage:
+    python -m utils.compiled_model
+"""
+import logging
+import os
+import pickle
+import sys
+import tempfile
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+COMPILED_FORMAT = 1
+MODEL_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'models')
+
+
+def _softmax(margins):
+    margins = margins - margins.max(axis=1, keepdims=True)
+    exp = np.exp(margins)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+def _as_rows(features, feature_names):
+    """(N, n_features) float array from a frame, dict, row or array in feature order"""
+    if isinstance(features, dict):
+        features = [[features[name] for name in feature_names]]
+    elif hasattr(features, 'columns'):
+        features = features[list(feature_names)].to_numpy(dtype=np.float64)
+    rows = np.asarray(features, dtype=np.float64)
+    if rows.ndim == 1:
+        rows = rows[np.newaxis, :]
+    if rows.shape[1] != len(feature_names):
+        raise ValueError(f"Expected {len(feature_names)} features, got {rows.shape[1]}")
+    return rows
+
+
+def _write_npz(path, arrays):
+    # Write then rename so readers never see a partial file
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.npz.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, **arrays)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return path
+
+
+class CompiledModel:
+    """Shared interface: predict_proba / predict over rows in ``feature_names`` order"""
+    kind = None
+
+    def __init__(self, feature_names, target_names):
+        self.feature_names = list(feature_names)
+        self.target_names = list(target_names)
+
+    def predict_margin(self, rows):
+        raise NotImplementedError
+
+    def predict_proba(self, features):
+        return _softmax(self.predict_margin(_as_rows(features, self.feature_names)))
+
+    def predict(self, features):
+        return self.predict_proba(features).argmax(axis=1)
+
+    def _arrays(self):
+        raise NotImplementedError
+
+    def save(self, path):
+        arrays = dict(
+            self._arrays(),
+            format=np.array([COMPILED_FORMAT], dtype=np.int64),
+            kind=np.array([self.kind]),
+            feature_names=np.array(self.feature_names),
+            target_names=np.array(self.target_names)
+        )
+        return _write_npz(path, arrays)
+
+
+class TreeEnsemble(CompiledModel):
+    """Multi-class gradient-boosted trees as padded (n_trees, max_nodes) arrays.
+
+    Each round moves every (row, tree) pair one level down with array
+    indexing, so a whole ensemble is evaluated in ``max_depth`` vectorized
+    steps. Leaves point to themselves, so finished trees stay put.
+    """
+    kind = 'tree_ensemble'
+
+    def __init__(self, feature, threshold, left, right, default_left, leaf_value,
+                 tree_class, base_margin, max_depth, feature_names, target_names):
+        super().__init__(feature_names, target_names)
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.default_left = default_left
+        self.leaf_value = leaf_value
+        self.tree_class = tree_class
+        self.base_margin = base_margin
+        self.max_depth = int(max_depth)
+        self._trees = np.arange(len(feature))[np.newaxis, :]
+        # (n_trees, n_classes) one-hot: sums each tree's leaf into its class margin
+        self._class_onehot = np.eye(len(base_margin))[tree_class]
+
+    def predict_margin(self, rows):
+        # XGBoost compares float32 feature values against float32 thresholds
+        rows = rows.astype(np.float32)
+        row_index = np.arange(len(rows))[:, np.newaxis]
+        node = np.zeros((len(rows), len(self.feature)), dtype=np.int32)
+        for _ in range(self.max_depth):
+            values = rows[row_index, self.feature[self._trees, node]]
+            go_left = np.where(np.isnan(values),
+                               self.default_left[self._trees, node],
+                               values < self.threshold[self._trees, node])
+            node = np.where(go_left, self.left[self._trees, node], self.right[self._trees, node])
+        leaves = self.leaf_value[self._trees, node].astype(np.float64)
+        return leaves @ self._class_onehot + self.base_margin
+
+    def _arrays(self):
+        return {
+            'feature': self.feature,
+            'threshold': self.threshold,
+            'left': self.left,
+            'right': self.right,
+            'default_left': self.default_left,
+            'leaf_value': self.leaf_value,
+            'tree_class': self.tree_class,
+            'base_margin': self.base_margin,
+            'max_depth': np.array([self.max_depth], dtype=np.int64)
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls(
+            arrays['feature'], arrays['threshold'], arrays['left'], arrays['right'],
+            arrays['default_left'], arrays['leaf_value'], arrays['tree_class'],
+            arrays['base_margin'], int(arrays['max_depth'][0]),
+            arrays['feature_names'].tolist(), arrays['target_names'].tolist()
+        )
+
+
+class LinearModel(CompiledModel):
+    """Multinomial logistic regression: softmax(X @ coef.T + intercept)"""
+    kind = 'linear'
+
+    def __init__(self, coef, intercept, feature_names, target_names):
+        super().__init__(feature_names, target_names)
+        self.coef = coef
+        self.intercept = intercept
+
+    def predict_margin(self, rows):
+        return rows @ self.coef.T + self.intercept
+
+    def _arrays(self):
+        return {'coef': self.coef, 'intercept': self.intercept}
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls(arrays['coef'], arrays['intercept'],
+                   arrays['feature_names'].tolist(), arrays['target_names'].tolist())
+
+
+_KINDS = {cls.kind: cls for cls in (TreeEnsemble, LinearModel)}
+
+
+def load_compiled(path):
+    """Load a compiled model written by ``CompiledModel.save``"""
+    with np.load(path, allow_pickle=False) as npz:
+        arrays = {name: npz[name] for name in npz.files}
+    if int(arrays['format'][0]) != COMPILED_FORMAT:
+        raise ValueError(f"Unsupported compiled model format in {path}")
+    return _KINDS[str(arrays['kind'][0])].from_arrays(arrays)
+
+
+def export_xgboost(model, feature_names=None, target_names=None):
+    """Compile a multi:softprob XGBClassifier or Booster into a TreeEnsemble"""
+    import json
+
+    booster = model.get_booster() if hasattr(model, 'get_booster') else model
+    config = json.loads(booster.save_raw(raw_format='json'))['learner']
+    objective = config['objective']['name']
+    if objective != 'multi:softprob' and objective != 'multi:softmax':
+        raise ValueError(f"Only multi-class softmax models can be compiled, got {objective}")
+    n_classes = int(config['learner_model_param']['num_class'])
+    trees = config['gradient_booster']['model']['trees']
+    tree_class = np.array(config['gradient_booster']['model']['tree_info'], dtype=np.int64)
+
+    max_nodes = max(len(tree['left_children']) for tree in trees)
+    shape = (len(trees), max_nodes)
+    feature = np.zeros(shape, dtype=np.int32)
+    threshold = np.zeros(shape, dtype=np.float32)
+    left = np.zeros(shape, dtype=np.int32)
+    right = np.zeros(shape, dtype=np.int32)
+    default_left = np.zeros(shape, dtype=bool)
+    leaf_value = np.zeros(shape, dtype=np.float32)
+    max_depth = 0
+    for t, tree in enumerate(trees):
+        if any(split_type != 0 for split_type in tree['split_type']):
+            raise ValueError("Categorical splits are not supported")
+        children = np.array(tree['left_children'])
+        is_leaf = children == -1
+        n = len(children)
+        nodes = np.arange(n)
+        feature[t, :n] = tree['split_indices']
+        threshold[t, :n] = tree['split_conditions']
+        # Leaves loop back to themselves; for leaves split_conditions holds the leaf value
+        left[t, :n] = np.where(is_leaf, nodes, children)
+        right[t, :n] = np.where(is_leaf, nodes, tree['right_children'])
+        default_left[t, :n] = np.array(tree['default_left'], dtype=bool)
+        leaf_value[t, :n] = np.where(is_leaf, tree['split_conditions'], 0.0)
+        # Padding slots beyond n are never reached
+        depth = np.zeros(n, dtype=np.int64)
+        for node in nodes:
+            if not is_leaf[node]:
+                depth[children[node]] = depth[tree['right_children'][node]] = depth[node] + 1
+        max_depth = max(max_depth, int(depth.max()))
+
+    # base_score is one value, or one per class written as '[5E-1,5E-1,5E-1]';
+    # softmax objectives add it to the margin as is
+    base_score = np.array(
+        config['learner_model_param']['base_score'].strip('[]').split(','), dtype=np.float64
+    )
+    base_margin = np.broadcast_to(base_score, (n_classes,)).copy()
+
+    feature_names = feature_names or booster.feature_names or [f'f{i}' for i in range(feature.max() + 1)]
+    target_names = target_names or [str(i) for i in range(n_classes)]
+    return TreeEnsemble(feature, threshold, left, right, default_left, leaf_value,
+                        tree_class, base_margin, max_depth, feature_names, target_names)
+
+
+def export_linear(model, feature_names, target_names):
+    """Compile a multinomial LogisticRegression into a LinearModel"""
+    if getattr(model, 'multi_class', 'multinomial') == 'ovr':
+        raise ValueError("One-vs-rest logistic regression cannot be compiled as softmax")
+    return LinearModel(np.asarray(model.coef_, dtype=np.float64),
+                       np.asarray(model.intercept_, dtype=np.float64),
+                       feature_names, target_names)
+
+
+def load_xgboost_classifier(path):
+    """Load an XGBClassifier saved with save_model or by pickling the classifier.
+
+    Pickled classifiers from older xgboost releases are re-loaded from their
+    booster, since the unpickled sklearn wrapper itself may not predict
+    correctly under the installed version.
+    """
+    import xgboost as xgb
+
+    with open(path, 'rb') as f:
+        content = f.read()
+    if content[:1] == b'\x80':
+        content = pickle.loads(content).get_booster().save_raw(raw_format='ubj')
+    model = xgb.XGBClassifier()
+    model.load_model(bytearray(content))
+    return model
+
+
+def compile_default_models(model_dir=MODEL_DIR):
+    """Export the insurance model, and the active recommender version if it has no compiled export yet.
+
+    Recommender versions are normally compiled as they are published; this
+    covers versions published without one. Returns the written paths.
+    """
+    from .data_processor import FEATURES, PRODUCT_MAPPING
+    from .model_manifest import ModelManifest
+
+    paths = []
+    manifest = ModelManifest(os.path.join(model_dir, 'product_recommender.manifest.json'))
+    active = manifest.active()
+    if active is not None and not active.compiled:
+        recommender = export_xgboost(
+            load_xgboost_classifier(manifest.artifact_path(active)),
+            FEATURES, [PRODUCT_MAPPING[i] for i in sorted(PRODUCT_MAPPING)]
+        )
+        fd, tmp_path = tempfile.mkstemp(dir=model_dir, suffix='.npz')
+        os.close(fd)
+        try:
+            recommender.save(tmp_path)
+            paths.append(manifest.compiled_path(manifest.attach_compiled(active.version, tmp_path)))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    with open(os.path.join(model_dir, 'insurance_model.pkl'), 'rb') as f:
+        bundle = pickle.load(f)
+    insurance = export_linear(bundle['model'], bundle['feature_names'], bundle['target_names'])
+    paths.append(insurance.save(os.path.join(model_dir, 'insurance_model.npz')))
+    for path in paths:
+        logger.info(f"Wrote compiled model {path}")
+    return paths
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    compile_default_models(sys.argv[1] if len(sys.argv) > 1 else MODEL_DIR)
@@ -1,7 +1,11 @@
+import atexit
+import logging
+import threading
 import pandas as pd
 import os
-import numpy as np
-from sklearn.preprocessing import StandardScaler
+
+
+logger = logging.getLogger(__name__)
 
 # Constants
 FEATURES = [
@@ -52,38 +56,161 @@ def prepare_features(data):
     # For prediction, we don't need to scale the features as the model was trained on unscaled data
     return data[FEATURES]
 
-def load_user_data():
-    """Load accumulated user data and recommendations"""
-    data_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
-    data_file = os.path.join(data_dir, 'user_recommendations.csv')
-    
-    # Create directory if it doesn't exist
-    os.makedirs(data_dir, exist_ok=True)
-    
-    # Create or load the file
-    if not os.path.exists(data_file):
-        # Create empty DataFrame with correct columns
-        columns = FEATURES + ['recommended_product', 'timestamp']
-        df = pd.DataFrame(columns=columns)
-        df.to_csv(data_file, index=False)
-        return df
-    
-    return pd.read_csv(data_file)
+USER_DATA_COLUMNS = FEATURES + ['recommended_product', 'timestamp']
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
+# Legacy CSV history, imported once into the user history store
+USER_DATA_FILE = os.path.join(DATA_DIR, 'user_recommendations.csv')
+
+# Where user history is stored: 'sqlite' (utils.user_db, WAL-mode database) or
+# 'parquet' (utils.user_history, day-partitioned files)
+USER_HISTORY_BACKEND = os.environ.get('USER_HISTORY_BACKEND', 'sqlite')
+
+# fsync policies for UserDataWriter: after every flushed batch, or leave it to the OS
+FSYNC_ALWAYS = 'always'
+FSYNC_NEVER = 'never'
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_user_store():
+    """Process-wide user history store for USER_HISTORY_BACKEND, with legacy data imported once"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            if USER_HISTORY_BACKEND == 'sqlite':
+                from .user_db import get_user_database
+
+                store = get_user_database()
+                store.import_legacy(USER_DATA_FILE)
+            elif USER_HISTORY_BACKEND == 'parquet':
+                from .user_history import get_user_history_store
+
+                store = get_user_history_store()
+                store.import_csv(USER_DATA_FILE)
+            else:
+                raise ValueError(f"Unknown USER_HISTORY_BACKEND: {USER_HISTORY_BACKEND}")
+            _store = store
+        return _store
+
+
+class UserDataWriter:
+    """Buffered, append-only writer for the user recommendation history.
+
+    Rows are buffered in memory and written to the user history store as one
+    batch (one transaction, or one new Parquet file), when ``batch_size`` rows
+    are waiting, ``flush_interval`` seconds after the first buffered row, on
+    ``flush()`` and at exit. Stored rows are never re-read or rewritten, so a
+    save costs the same however long the history is, and concurrent writers
+    (sessions or processes) can't overwrite each other's rows. With
+    ``fsync='always'`` every batch is durable before ``flush`` returns;
+    ``'never'`` leaves durability to the OS. The record count is read from
+    the store once and then maintained in memory; it is exact for rows
+    written through this process.
+    """
+
+    def __init__(self, store=None, batch_size=16, flush_interval=1.0, fsync=FSYNC_ALWAYS):
+        if fsync not in (FSYNC_ALWAYS, FSYNC_NEVER):
+            raise ValueError(f"Unknown fsync policy: {fsync}")
+        self.store = store or get_user_store()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._buffer = []
+        self._count = None
+        self._flusher = None
+        self._stop = threading.Event()
+
+    def _open_count(self):
+        """Count stored records once"""
+        return self.store.count()
+
+    @property
+    def count(self):
+        """Records in the store plus rows still buffered"""
+        with self._lock:
+            if self._count is None:
+                self._count = self._open_count()
+            return self._count + len(self._buffer)
+
+    def append(self, row):
+        """Buffer one record (a dict keyed by USER_DATA_COLUMNS); returns the record count"""
+        with self._lock:
+            if self._count is None:
+                self._count = self._open_count()
+            self._buffer.append({column: row[column] for column in USER_DATA_COLUMNS})
+            count = self._count + len(self._buffer)
+            if len(self._buffer) >= self.batch_size:
+                self._flush_locked()
+            elif self._flusher is None and self.flush_interval:
+                self._stop.clear()
+                self._flusher = threading.Thread(target=self._flush_periodically,
+                                                 name='user-data-flusher', daemon=True)
+                self._flusher.start()
+        return count
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._buffer:
+            return
+        self._count += self.store.append(self._buffer, fsync=self.fsync == FSYNC_ALWAYS)
+        self._buffer = []
+
+    def _flush_periodically(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Flushing user data failed")
+
+    def close(self):
+        """Flush buffered rows and stop the background flusher"""
+        flusher = self._flusher
+        if flusher is not None:
+            self._stop.set()
+            flusher.join()
+            self._flusher = None
+        self.flush()
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_user_data_writer():
+    """Process-wide writer for the user history store"""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = UserDataWriter()
+            atexit.register(_writer.close)
+        return _writer
+
+
+def load_user_data(columns=None, start=None, end=None, since_records=0):
+    """Load accumulated user data and recommendations, oldest first.
+
+    Reads only records between ``start`` and ``end`` (datetimes) stored after
+    the first ``since_records``, and only ``columns`` (default:
+    USER_DATA_COLUMNS), with typed columns.
+    """
+    if _writer is not None:
+        # Include rows still buffered by this process
+        _writer.flush()
+
+    return get_user_store().read(columns, start, end, since_records)
 
 def save_user_data(user_data, recommended_product):
-    """Save user data and recommendation"""
+    """Append one user's data and recommendation; returns the number of stored records.
+
+    Queues a debounced background retrain once enough new records have
+    arrived (see retraining.request_retrain); training never runs inline.
+    """
     try:
-        print("Starting save_user_data...")  # Debug
-        
-        # Load existing data
-        df = load_user_data()
-        print(f"Loaded existing data with {len(df)} rows")  # Debug
-        
-        # Print the incoming data for debugging
-        print("User data to save:", user_data)
-        print("Recommended product:", recommended_product)
-        
-        # Create a new row with the user data
         # Access the first row of the DataFrame since prepare_features returns a DataFrame
         new_data = {
             'savings_amount': float(user_data['savings_amount'].iloc[0]),
@@ -97,20 +224,15 @@ def save_user_data(user_data, recommended_product):
             'recommended_product': int(recommended_product),
             'timestamp': pd.Timestamp.now()
         }
-        
-        print("New data row:", new_data)  # Debug
-        
-        # Append new data
-        df = pd.concat([df, pd.DataFrame([new_data])], ignore_index=True)
-        print(f"After concat, dataframe has {len(df)} rows")  # Debug
-        
-        # Save updated data
-        data_file = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'user_recommendations.csv')
-        print(f"Saving to file: {data_file}")  # Debug
-        df.to_csv(data_file, index=False)
-        print("Save completed successfully")  # Debug
-        
-        return len(df)
+        total_records = get_user_data_writer().append(new_data)
+    except Exception as e:
+        logger.error(f"Error in save_user_data: {str(e)}")
+        raise
+
+    try:
+        from .retraining import request_retrain
+        request_retrain(total_records)
     except Exception as e:
-        print(f"Error in save_user_data: {str(e)}")  # Debug
-        raise  # Re-raise the exception after logging
+        # The record is stored; a later save re-requests the retrain
+        logger.warning(f"Could not queue a retrain: {str(e)}")
+    return total_records
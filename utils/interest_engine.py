@@ -0,0 +1,707 @@
+import logging
+from .rate_history import RateHistory, UNDATED, add_months
+
+logger = logging.getLogger(__name__)
+
+# Banks covered by the calculator, in display order
+BANK_NAMES = ['UOB One', 'SC BonusSaver', 'OCBC 360', 'BOC SmartSaver', 'Chocolate']
+
+def calculate_bank_interest(deposit_amount, bank_info, bank_requirements):
+    """Calculate interest based on the bank's tier structure and requirements"""
+    total_interest = 0
+    breakdown = []
+    
+    # In the add_tier function
+    def add_tier(amount, rate, description=""):
+        interest = amount * rate
+        # Debug print
+        # print(f"Adding tier: amount={amount}, rate={rate}, description={description}")
+        breakdown.append({
+            'amount_in_tier': float(amount),
+            'tier_rate': float(rate),
+            'tier_interest': interest,
+            'monthly_interest': interest / 12,
+            'description': str(description).strip() 
+        })
+        return interest
+
+    if bank_info['bank'] == 'SC BonusSaver':
+        # Get requirement thresholds from tiers
+        salary_tier = next(t for t in bank_info['tiers'] if t['tier_type'] == 'salary')
+        spend_tier = next(t for t in bank_info['tiers'] if t['tier_type'] == 'spend')
+        min_salary = float(salary_tier['min_salary'])
+        min_spend = float(spend_tier['min_spend'])
+        
+        # Always add base interest for total balance
+        base_tier = next(t for t in bank_info['tiers'] if t['tier_type'] == 'base')
+        base_rate = float(str(base_tier['interest_rate']).strip('%')) / 100
+        total_interest += add_tier(deposit_amount, base_rate, "Base Interest")
+        
+        # Cap bonus interest at $100,000
+        eligible_amount = min(deposit_amount, 100000)
+        
+        # Add salary bonus if applicable
+        if bank_requirements['has_salary'] and bank_requirements['salary_amount'] >= min_salary:
+            rate = float(str(salary_tier['interest_rate']).strip('%')) / 100
+            total_interest += add_tier(eligible_amount, rate, f"Salary Credit Bonus (>= ${min_salary:,.0f})")
+        
+        # Add spend bonus if applicable
+        if bank_requirements['spend_amount'] >= min_spend:
+            rate = float(str(spend_tier['interest_rate']).strip('%')) / 100
+            total_interest += add_tier(eligible_amount, rate, f"Card Spend Bonus (>= ${min_spend:,.0f})")
+        
+        # Add investment bonus if applicable
+        if bank_requirements['has_investments']:
+            invest_tier = next(t for t in bank_info['tiers'] if t['tier_type'] == 'invest')
+            rate = float(str(invest_tier['interest_rate']).strip('%')) / 100
+            total_interest += add_tier(eligible_amount, rate, "Investment Bonus (6 months)")
+        
+        # Add insurance bonus if applicable
+        if bank_requirements['has_insurance']:
+            insure_tier = next(t for t in bank_info['tiers'] if t['tier_type'] == 'insure')
+            rate = float(str(insure_tier['interest_rate']).strip('%')) / 100
+            total_interest += add_tier(eligible_amount, rate, "Insurance Bonus (6 months)")
+            
+    elif bank_info['bank'] == 'UOB One':
+        # Initialize total interest
+        total_interest = 0
+        
+        # Check if minimum spend requirement is met
+        has_spend = bank_requirements['spend_amount'] >= 500
+        has_salary = bank_requirements['has_salary']
+        has_giro = bank_requirements['giro_count'] >= 3
+        
+        if has_spend:
+            # If minimum spend met, check for highest applicable bonus rate
+            remaining_amount = deposit_amount
+            
+            # Check salary + spend first as it has highest rates
+            if has_salary:
+                tiers = [t for t in bank_info['tiers'] if t['requirement_type'] == 'salary']
+                for tier in tiers:
+                    amount_in_tier = min(remaining_amount, float(tier['cap_amount']))
+                    if amount_in_tier <= 0:
+                        break
+                    rate = float(str(tier['interest_rate']).strip('%')) / 100
+                    interest = amount_in_tier * rate
+                    total_interest += interest
+                    add_tier(amount_in_tier, rate,
+                        f"Salary + Spend ({tier['balance_tier']})")
+                    remaining_amount -= amount_in_tier
+            
+            # Then check GIRO + Spend
+            elif has_giro:
+                tiers = [t for t in bank_info['tiers'] if t['requirement_type'] == 'giro']
+                for tier in tiers:
+                    amount_in_tier = min(remaining_amount, float(tier['cap_amount']))
+                    if amount_in_tier <= 0:
+                        break
+                    rate = float(str(tier['interest_rate']).strip('%')) / 100
+                    interest = amount_in_tier * rate
+                    total_interest += interest
+                    add_tier(amount_in_tier, rate,
+                        f"GIRO + Spend ({tier['balance_tier']})")
+                    remaining_amount -= amount_in_tier
+            
+            # Finally apply spend only rates
+            else:
+                tiers = [t for t in bank_info['tiers'] if t['requirement_type'] == 'spend_only']
+                for tier in tiers:
+                    amount_in_tier = min(remaining_amount, float(tier['cap_amount']))
+                    if amount_in_tier <= 0:
+                        break
+                    rate = float(str(tier['interest_rate']).strip('%')) / 100
+                    interest = amount_in_tier * rate
+                    total_interest += interest
+                    add_tier(amount_in_tier, rate,
+                        f"Spend Only ({tier['balance_tier']})")
+                    remaining_amount -= amount_in_tier
+        
+        else:
+            # If minimum spend not met, only apply base interest
+            base_tier = next(t for t in bank_info['tiers'] if t['tier_type'] == 'base')
+            base_rate = float(str(base_tier['interest_rate']).strip('%')) / 100
+            base_amount = min(deposit_amount, float(base_tier['cap_amount']))
+            base_interest = base_amount * base_rate
+            total_interest += base_interest
+            add_tier(base_amount, base_rate, f"Base Interest ({base_tier['balance_tier']})")
+    
+    elif bank_info['bank'] == 'OCBC 360':
+        # Always add base interest first for total amount
+        base_tier = next(t for t in bank_info['tiers'] if t['tier_type'] == 'base')
+        base_rate = float(str(base_tier['interest_rate']).strip('%')) / 100
+        total_interest = deposit_amount * base_rate
+        add_tier(deposit_amount, base_rate, "Base Interest")
+        
+        # Get tiers for first $75k and next $25k
+        first_75k = min(deposit_amount, 75000)
+        next_25k = min(max(deposit_amount - 75000, 0), 25000)
+        
+        # Base calculations for each amount
+        total_first_75k = 0
+        total_next_25k = 0
+        
+        def process_ocbc_tier(tier_type, requirement_met):
+            nonlocal total_first_75k, total_next_25k
+            if requirement_met:
+                tier_75k = next((t for t in bank_info['tiers'] if t['tier_type'] == tier_type and float(t['cap_amount']) == 75000), None)
+                tier_25k = next((t for t in bank_info['tiers'] if t['tier_type'] == tier_type and float(t['cap_amount']) == 25000), None)
+                
+                if tier_75k:
+                    rate = float(str(tier_75k['interest_rate']).strip('%')) / 100
+                    interest_75k = first_75k * rate
+                    total_first_75k += interest_75k
+                    add_tier(first_75k, rate, f"{tier_75k['remarks']}")
+                
+                if tier_25k:
+                    rate = float(str(tier_25k['interest_rate']).strip('%')) / 100
+                    interest_25k = next_25k * rate
+                    total_next_25k += interest_25k
+                    add_tier(next_25k, rate, f"{tier_25k['remarks']}")
+        
+        # Check each bonus category
+        # Salary bonus
+        salary_tier = next(t for t in bank_info['tiers'] if t['tier_type'] == 'salary')
+        has_salary = bank_requirements['has_salary'] and bank_requirements['salary_amount'] >= float(salary_tier['min_salary'])
+        process_ocbc_tier('salary', has_salary)
+        
+        # Save bonus (increased balance)
+        process_ocbc_tier('save', bank_requirements.get('increased_balance', False))
+        
+        # Spend bonus
+        spend_tier = next(t for t in bank_info['tiers'] if t['tier_type'] == 'spend')
+        has_spend = bank_requirements['spend_amount'] >= float(spend_tier['min_spend'])
+        process_ocbc_tier('spend', has_spend)
+        
+        # Insurance bonus
+        process_ocbc_tier('insure', bank_requirements.get('has_insurance', False))
+        
+        # Investment bonus
+        process_ocbc_tier('invest', bank_requirements.get('has_investments', False))
+        
+        # Grow bonus
+        process_ocbc_tier('grow', bank_requirements.get('grew_wealth', False))
+        
+        total_interest += total_first_75k + total_next_25k
+    
+    elif bank_info['bank'] == 'BOC SmartSaver':
+        # Initialize total interest
+        total_interest = 0
+        remaining_amount = deposit_amount
+
+        # Process base interest tiers
+        base_tiers = [t for t in bank_info['tiers'] if t['tier_type'] == 'base']
+        # Sort tiers by cap_amount to process in ascending order
+        base_tiers = sorted(base_tiers, key=lambda x: float(x['cap_amount']))
+        
+        # Track previous tier cap for tier calculation
+        prev_cap = 0
+        for tier in base_tiers:
+            cap = float(tier['cap_amount'])
+            tier_size = cap - prev_cap
+            amount_in_tier = min(max(0, remaining_amount - prev_cap), tier_size)
+            
+            if amount_in_tier <= 0:
+                break
+                
+            rate = float(str(tier['interest_rate']).strip('%')) / 100
+            interest = amount_in_tier * rate
+            total_interest += interest
+            add_tier(amount_in_tier, rate, f"Base Interest ({tier['balance_tier']})")
+            prev_cap = cap
+        
+        # Add bonus interest based on requirements
+        if deposit_amount >= 1500:  # Minimum balance requirement
+            # Process salary credit bonus if applicable
+            if bank_requirements.get('has_salary', False) and bank_requirements.get('salary_amount', 0) >= 2000:
+                salary_tier = next(t for t in bank_info['tiers'] if t['tier_type'] == 'salary')
+                rate = float(str(salary_tier['interest_rate']).strip('%')) / 100
+                bonus_amount = min(deposit_amount, float(salary_tier['cap_amount']))
+                interest = bonus_amount * rate
+                total_interest += interest
+                add_tier(bonus_amount, rate, "Salary Credit Bonus (≥$2,000)")
+
+            # Process wealth bonus if applicable
+            if bank_requirements.get('has_insurance', False):
+                wealth_tier = next(t for t in bank_info['tiers'] if t['tier_type'] == 'wealth')
+                rate = float(str(wealth_tier['interest_rate']).strip('%')) / 100
+                bonus_amount = min(deposit_amount, float(wealth_tier['cap_amount']))
+                interest = bonus_amount * rate
+                total_interest += interest
+                add_tier(bonus_amount, rate, "Wealth Bonus (Insurance)")
+            
+            # Process spend bonus if applicable
+            spend_amount = bank_requirements.get('spend_amount', 0)
+            if spend_amount >= 500:
+                # Get appropriate spend tier based on amount
+                spend_tiers = [t for t in bank_info['tiers'] if t['tier_type'] == 'spend']
+                spend_tier = None
+                if spend_amount >= 1500:
+                    spend_tier = next(t for t in spend_tiers if t['balance_tier'] == '2')
+                else:
+                    spend_tier = next(t for t in spend_tiers if t['balance_tier'] == '1')
+                
+                rate = float(str(spend_tier['interest_rate']).strip('%')) / 100
+                bonus_amount = min(deposit_amount, float(spend_tier['cap_amount']))
+                interest = bonus_amount * rate
+                total_interest += interest
+                add_tier(bonus_amount, rate, f"Spend Bonus (${spend_amount:,.0f})")
+
+            # Process payment bonus if applicable
+            giro_count = bank_requirements.get('giro_count', 0)
+            if giro_count >= 3:
+                payment_tier = next(t for t in bank_info['tiers'] if t['tier_type'] == 'payment')
+                rate = float(str(payment_tier['interest_rate']).strip('%')) / 100
+                bonus_amount = min(deposit_amount, float(payment_tier['cap_amount']))
+                interest = bonus_amount * rate
+                total_interest += interest
+                add_tier(bonus_amount, rate, f"Payment Bonus ({giro_count} bill payments)")
+    
+    elif bank_info['bank'] == 'Chocolate':
+        # First add base interest for total amount
+        base_tier = next(t for t in bank_info['tiers'] if t['tier_type'] == 'base')
+        base_rate = float(str(base_tier['interest_rate']).strip('%')) / 100
+        total_interest = deposit_amount * base_rate
+        # add_tier(deposit_amount, base_rate, "Base Interest")
+        
+        # Then add bonus interest for tiered amounts
+        first_20k = min(deposit_amount, 20000)
+        next_30k = min(max(deposit_amount - 20000, 0), 30000)
+        
+        # First $20,000 at 3.60%
+        first_20k = min(deposit_amount, 20000)
+        first_tier = next(t for t in bank_info['tiers'] if t['tier_type'] == 'base' and float(t['cap_amount']) == 20000)
+        rate_20k = float(str(first_tier['interest_rate']).strip('%')) / 100
+        interest_20k = first_20k * rate_20k
+        total_interest = interest_20k
+        add_tier(first_20k, rate_20k, "First $20,000")
+        
+        # Next $30,000 at 3.20%
+        if deposit_amount > 20000:
+            next_30k = min(deposit_amount - 20000, 30000)
+            second_tier = next(t for t in bank_info['tiers'] if t['tier_type'] == 'base' and float(t['cap_amount']) == 30000)
+            rate_30k = float(str(second_tier['interest_rate']).strip('%')) / 100
+            interest_30k = next_30k * rate_30k
+            total_interest += interest_30k
+            add_tier(next_30k, rate_30k, "Next $30,000")
+    
+    return {
+        'total_interest': total_interest,
+        'breakdown': breakdown
+    }
+
+# Rates file schema: text columns are kept as strings, amounts as non-negative integers
+RATES_TEXT_COLUMNS = ['bank', 'tier_type', 'balance_tier', 'interest_rate', 'requirement_type', 'salary_credit', 'remarks']
+RATES_INT_COLUMNS = ['min_spend', 'min_salary', 'giro_count', 'cap_amount']
+RATES_COLUMNS = [
+    'bank', 'tier_type', 'balance_tier', 'interest_rate', 'requirement_type',
+    'min_spend', 'min_salary', 'giro_count', 'salary_credit', 'cap_amount', 'remarks'
+]
+TIER_FIELDS = RATES_COLUMNS[1:]
+EFFECTIVE_DATE_COLUMN = 'effective_date'
+KNOWN_TIER_TYPES = {
+    'base', 'bill', 'extra', 'giro', 'grow', 'insure', 'invest', 'payment',
+    'salary', 'save', 'spend', 'spend_only', 'wealth'
+}
+KNOWN_REQUIREMENT_TYPES = KNOWN_TIER_TYPES
+RATE_PATTERN = r'^\d+(\.\d+)?%$'
+
+class RatesSchemaError(ValueError):
+    """Raised when the rates file does not match the expected schema"""
+
+    def __init__(self, problems):
+        self.problems = problems
+        super().__init__("Invalid interest rates file:\n" + "\n".join(problems))
+
+def _validate_rates(df):
+    """Return a list of schema problems, one per offending cell"""
+    import pandas as pd
+    problems = []
+    # CSV line numbers (header is line 1)
+    lines = df.index + 2
+
+    def report(column, mask, message):
+        for line, bank, value in zip(lines[mask], df['bank'][mask], df[column][mask]):
+            problems.append(f"line {line} ({bank}): {column} {value!r} {message}")
+
+    for column in ['bank', 'tier_type', 'balance_tier', 'interest_rate', 'requirement_type', 'salary_credit']:
+        report(column, df[column].isna().to_numpy(), "is missing")
+
+    rates = df['interest_rate']
+    report('interest_rate', (rates.notna() & ~rates.str.match(RATE_PATTERN, na=False)).to_numpy(),
+           "is not a percentage like '3.00%'")
+    report('tier_type', (df['tier_type'].notna() & ~df['tier_type'].isin(KNOWN_TIER_TYPES)).to_numpy(),
+           "is not a known tier type")
+    report('requirement_type',
+           (df['requirement_type'].notna() & ~df['requirement_type'].isin(KNOWN_REQUIREMENT_TYPES)).to_numpy(),
+           "is not a known requirement type")
+    report('salary_credit', (df['salary_credit'].notna() & ~df['salary_credit'].isin(['Y', 'N'])).to_numpy(),
+           "must be Y or N")
+
+    for column in RATES_INT_COLUMNS:
+        values = pd.to_numeric(df[column], errors='coerce')
+        invalid = values.isna() | (values < 0) | (values % 1 != 0)
+        report(column, invalid.to_numpy(), "must be a non-negative whole number")
+
+    if EFFECTIVE_DATE_COLUMN in df.columns:
+        dates = pd.to_datetime(df[EFFECTIVE_DATE_COLUMN], format='%Y-%m-%d', errors='coerce')
+        report(EFFECTIVE_DATE_COLUMN, dates.isna().to_numpy(), "is not a date like '2025-01-16'")
+    return problems
+
+def load_rate_history(file_path='interest_rates.csv'):
+    """Load and validate the interest rates file into a RateHistory.
+
+    ``file_path`` may be a path or a file-like object. The file is parsed in one
+    pass with typed columns, extra columns (such as the trailing unnamed one) are
+    ignored, and any schema problem raises RatesSchemaError listing every
+    offending line. An optional ``effective_date`` column (YYYY-MM-DD) splits
+    the rows into dated rate sets; without it the file is one undated set.
+    """
+    # pandas is only needed here; workers loading a compiled snapshot skip it
+    import pandas as pd
+
+    df = pd.read_csv(
+        file_path,
+        usecols=lambda column: column in RATES_COLUMNS or column == EFFECTIVE_DATE_COLUMN,
+        dtype={column: object for column in RATES_COLUMNS + [EFFECTIVE_DATE_COLUMN]}
+    )
+    missing = [column for column in RATES_COLUMNS if column not in df.columns]
+    if missing:
+        raise RatesSchemaError([f"missing column: {column}" for column in missing])
+    logger.info(f"Loaded CSV with {len(df)} rows")
+
+    problems = _validate_rates(df)
+    if problems:
+        raise RatesSchemaError(problems)
+
+    df[RATES_INT_COLUMNS] = df[RATES_INT_COLUMNS].apply(pd.to_numeric).astype('int64')
+    df['remarks'] = df['remarks'].fillna('')
+    if EFFECTIVE_DATE_COLUMN in df.columns:
+        effective_dates = pd.to_datetime(df[EFFECTIVE_DATE_COLUMN], format='%Y-%m-%d').dt.date.tolist()
+    else:
+        effective_dates = [UNDATED] * len(df)
+
+    history = RateHistory(effective_dates, df['bank'].tolist(), df[TIER_FIELDS].to_dict('records'))
+    logger.info(f"Processed {len(df)} tiers in {len(history)} rate set(s)")
+    return history
+
+def process_interest_rates(file_path='interest_rates.csv', as_of=None):
+    """Load the interest rates file and return the rate set in force on ``as_of`` (default today).
+
+    Returns ``{bank: {'bank': bank, 'tiers': [tier, ...]}}`` with banks in name
+    order and tiers in file order.
+    """
+    return load_rate_history(file_path).as_of(as_of)
+
+def optimize_bank_distribution(total_amount, banks_data, user_requirements, progress=None):
+    """Search $5,000 deposit splits across banks and return the top 3 solutions.
+
+    ``progress`` is an optional callable ``progress(kind, message)`` used to
+    report ``'status'``, ``'progress'`` and ``'best'`` updates, so the search
+    can run under Streamlit, the CLI or a worker process alike.
+    """
+    logger.info(f"Optimizing distribution for ${total_amount:,.2f}")
+    
+    # Initialize variables for top 3 solutions
+    top_solutions = [
+        {'distribution': {}, 'total_interest': 0, 'breakdown': {}, 'salary_bank': None},
+        {'distribution': {}, 'total_interest': 0, 'breakdown': {}, 'salary_bank': None},
+        {'distribution': {}, 'total_interest': 0, 'breakdown': {}, 'salary_bank': None}
+    ]
+
+    # Define maximum bonus interest caps for each bank
+    bonus_caps = {
+        'UOB One': 150000,
+        'SC BonusSaver': 100000,
+        'OCBC 360': 100000,
+        'BOC SmartSaver': 100000,
+        'Chocolate': 50000
+    }
+
+    def report(kind, message):
+        if progress is not None:
+            progress(kind, message)
+    
+    # Initialize counters
+    total_scenarios = 0
+    current_scenario = 0
+    
+    # Calculate total number of scenarios
+    def calculate_total_scenarios(amount, num_banks):
+        # Number of possible $5000 increments for each bank
+        increments_per_bank = (amount // 5000) + 1
+        # Total combinations considering all banks
+        return increments_per_bank ** num_banks
+
+    # Calculate approximate total scenarios
+    if user_requirements['has_salary']:
+        for salary_bank in ['SC BonusSaver', 'OCBC 360', 'BOC SmartSaver']:
+            total_scenarios += calculate_total_scenarios(min(total_amount, bonus_caps[salary_bank]), 4)  # 4 other banks
+    total_scenarios += calculate_total_scenarios(total_amount, 5)  # non-salary scenarios
+    
+    report('progress', f"Total scenarios to check: {total_scenarios:,}")
+
+    def try_combination(amounts_dict, salary_bank):
+        nonlocal current_scenario
+        current_scenario += 1
+        
+        if current_scenario % 100 == 0:  # Update more frequently since we have fewer scenarios
+            report('progress', f"Checking scenario {current_scenario:,} of {total_scenarios:,} ({(current_scenario/total_scenarios*100):.1f}%)")
+        
+        if abs(sum(amounts_dict.values()) - total_amount) > 5000:  # Increased tolerance for $5000 increments
+            return
+            
+        total_interest = 0
+        all_breakdowns = {}
+        
+        for bank, amount in amounts_dict.items():
+            if amount > 0:
+                bank_reqs = user_requirements.copy()
+                if bank == 'UOB One':
+                    bank_reqs['has_salary'] = user_requirements.get('has_salary', False)
+                    bank_reqs['salary_amount'] = user_requirements.get('salary_amount', 0)
+                else:
+                    bank_reqs['has_salary'] = (bank == salary_bank) and user_requirements['has_salary']
+                
+                result = calculate_bank_interest(amount, banks_data[bank], bank_reqs)
+                total_interest += result['total_interest']
+                all_breakdowns[bank] = result['breakdown']
+        
+        for i in range(len(top_solutions)):
+            if total_interest > top_solutions[i]['total_interest']:
+                for j in range(len(top_solutions)-1, i, -1):
+                    top_solutions[j] = top_solutions[j-1].copy()
+                top_solutions[i] = {
+                    'distribution': amounts_dict.copy(),
+                    'total_interest': total_interest,
+                    'breakdown': all_breakdowns,
+                    'salary_bank': salary_bank
+                }
+                report('best', f"New best found: ${total_interest:,.2f} with {amounts_dict}")
+                break
+
+    def try_all_combinations(remaining_amount, remaining_banks, current_distribution, salary_bank):
+        if not remaining_banks:
+            if remaining_amount < 5000:  # If less than $5000 left, consider it a valid combination
+                try_combination(current_distribution, salary_bank)
+            return
+        
+        current_bank = remaining_banks[0]
+        next_banks = remaining_banks[1:]
+        
+        # Try different amounts in $5000 increments
+        max_amount = min(remaining_amount, bonus_caps[current_bank])
+        for amount in range(0, max_amount + 5000, 5000):  # Include 0 to skip this bank
+            if amount <= max_amount:
+                new_distribution = current_distribution.copy()
+                if amount > 0:  # Only add to distribution if amount > 0
+                    new_distribution[current_bank] = amount
+                try_all_combinations(remaining_amount - amount, next_banks, new_distribution, salary_bank)
+
+    # Try all possible combinations
+    # First try with salary credit
+    if user_requirements['has_salary']:
+        for salary_bank in ['SC BonusSaver', 'OCBC 360', 'BOC SmartSaver']:
+            report('status', f"Trying combinations with salary credit to {salary_bank}...")
+            non_salary_banks = [bank for bank in BANK_NAMES if bank != salary_bank]
+            # Try salary bank first
+            for amount in range(0, min(total_amount + 5000, bonus_caps[salary_bank] + 5000), 5000):
+                if amount <= total_amount:
+                    initial_distribution = {salary_bank: amount} if amount > 0 else {}
+                    try_all_combinations(total_amount - amount, non_salary_banks, initial_distribution, salary_bank)
+    
+    # Then try without salary credit
+    report('status', "Trying combinations without salary credit...")
+    try_all_combinations(total_amount, BANK_NAMES, {}, None)
+
+    report('status', "Optimization complete!")
+    
+    return top_solutions
+
+def optimize_spend_allocation(total_spend, banks_data, deposit_amounts, base_requirements):
+    """
+    Optimize credit card spend allocation across banks
+    Returns the best spend allocation and corresponding interest
+    """
+    # Minimum spend requirements for each bank
+    min_spends = {
+        'UOB One': 500,
+        'SC BonusSaver': 1000,
+        'OCBC 360': 500,
+        'BOC SmartSaver': 500
+    }
+    
+    best_allocation = {}
+    best_total_interest = 0
+    best_breakdown = {}
+    
+    def try_allocation(remaining_spend, remaining_banks, current_allocation):
+        nonlocal best_allocation, best_total_interest, best_breakdown
+        
+        # Base case: no more spend to allocate or no more banks
+        if not remaining_banks or remaining_spend < min(min_spends.values()):
+            # Calculate total interest with current allocation
+            total_interest = 0
+            interest_breakdown = {}
+            
+            for bank, spend in current_allocation.items():
+                bank_reqs = base_requirements.copy()
+                bank_reqs['spend_amount'] = spend
+                
+                # Special handling for UOB One
+                if bank == 'UOB One':
+                    bank_reqs['has_salary'] = base_requirements.get('has_salary', False)
+                    bank_reqs['salary_amount'] = base_requirements.get('salary_amount', 0)
+                
+                result = calculate_bank_interest(
+                    deposit_amounts.get(bank, 0), 
+                    banks_data[bank], 
+                    bank_reqs
+                )
+                total_interest += result['total_interest']
+                interest_breakdown[bank] = result
+            
+            if total_interest > best_total_interest:
+                best_allocation = current_allocation.copy()
+                best_total_interest = total_interest
+                best_breakdown = interest_breakdown
+            return
+        
+        # Try allocating spend to next bank
+        current_bank = remaining_banks[0]
+        min_spend = min_spends[current_bank]
+        
+        # Try skipping this bank
+        try_allocation(
+            remaining_spend,
+            remaining_banks[1:],
+            current_allocation
+        )
+        
+        # Try allocating minimum spend to this bank
+        if remaining_spend >= min_spend:
+            new_allocation = current_allocation.copy()
+            new_allocation[current_bank] = min_spend
+            try_allocation(
+                remaining_spend - min_spend,
+                remaining_banks[1:],
+                new_allocation
+            )
+            
+            # For BOC SmartSaver, try higher tier if possible
+            if current_bank == 'BOC SmartSaver' and remaining_spend >= 1500:
+                new_allocation[current_bank] = 1500
+                try_allocation(
+                    remaining_spend - 1500,
+                    remaining_banks[1:],
+                    new_allocation
+                )
+    
+    # Start optimization with all banks
+    eligible_banks = [bank for bank in min_spends.keys() 
+                     if bank in deposit_amounts and deposit_amounts[bank] > 0]
+    try_allocation(total_spend, eligible_banks, {})
+    
+    return best_allocation, best_total_interest, best_breakdown
+
+def requirements_from_profile(profile):
+    """Build calculator requirements from a stored user profile (FEATURES columns)"""
+    has_salary = bool(profile['salary_above_3k'])
+    return {
+        # Profiles only record whether salary is above $3K, as in the app
+        'has_salary': has_salary,
+        'salary_amount': 3001 if has_salary else 0,
+        'spend_amount': float(profile['monthly_card_spend']),
+        'giro_count': int(profile['num_giro_payments']),
+        'has_insurance': bool(profile['has_insurance']),
+        'has_investments': bool(profile['has_investments']),
+        'increased_balance': bool(profile['increased_balance']),
+        'grew_wealth': bool(profile['high_balance'])
+    }
+
+def calculate_all_banks(deposit_amount, banks_data, base_requirements):
+    """Calculate single-bank interest for every bank, sorted highest first"""
+    bank_results = []
+    for bank_name in BANK_NAMES:
+        results = calculate_bank_interest(deposit_amount, banks_data[bank_name], base_requirements.copy())
+        bank_results.append({
+            'bank': bank_name,
+            'monthly_interest': results['total_interest'] / 12,
+            'annual_interest': results['total_interest'],
+            'breakdown': results['breakdown']
+        })
+    bank_results.sort(key=lambda x: x['annual_interest'], reverse=True)
+    return bank_results
+
+# Requirement fields accepted by the engine, with the defaults used by the app
+REQUIREMENT_DEFAULTS = {
+    'has_salary': False,
+    'salary_amount': 0,
+    'spend_amount': 0,
+    'giro_count': 0,
+    'has_insurance': False,
+    'has_investments': False,
+    'increased_balance': False,
+    'grew_wealth': False
+}
+
+def normalize_requirements(raw):
+    """Validate a requirements mapping from an external caller and fill in defaults.
+
+    Raises ValueError naming the offending field. Salary handling mirrors the
+    app: a salary toggle without an amount assumes $3,001, and salary only counts
+    when it is at least $2,000.
+    """
+    if raw is None:
+        raw = {}
+    if not isinstance(raw, dict):
+        raise ValueError("requirements must be an object")
+    unknown = sorted(set(raw) - set(REQUIREMENT_DEFAULTS))
+    if unknown:
+        raise ValueError(f"Unknown requirement fields: {', '.join(unknown)}")
+
+    requirements = dict(REQUIREMENT_DEFAULTS)
+    for key, value in raw.items():
+        if isinstance(REQUIREMENT_DEFAULTS[key], bool):
+            if not isinstance(value, bool):
+                raise ValueError(f"{key} must be true or false")
+        elif isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+            raise ValueError(f"{key} must be a non-negative number")
+        requirements[key] = value
+
+    if requirements['has_salary'] and 'salary_amount' not in raw:
+        requirements['salary_amount'] = 3001
+    requirements['has_salary'] = bool(requirements['has_salary'] and requirements['salary_amount'] >= 2000)
+    requirements['giro_count'] = int(requirements['giro_count'])
+    return requirements
+
+def project_interest(distribution, user_requirements, history, start, months, salary_bank=None):
+    """Project monthly interest for a fixed allocation over ``months`` months from ``start``.
+
+    Each month is priced with the rate set in force on its first day, so the
+    projection switches rate versions mid-simulation when the history has a
+    change in range. Salary credit applies to ``salary_bank`` (and UOB One),
+    as in optimize_bank_distribution.
+    """
+    periods = []
+    for month in range(months):
+        month_start = add_months(start, month)
+        banks_data = history.as_of(month_start)
+        by_bank = {}
+        for bank, amount in distribution.items():
+            if amount <= 0:
+                continue
+            bank_reqs = user_requirements.copy()
+            if bank != 'UOB One':
+                bank_reqs['has_salary'] = (bank == salary_bank) and user_requirements['has_salary']
+            by_bank[bank] = calculate_bank_interest(amount, banks_data[bank], bank_reqs)['total_interest'] / 12
+        periods.append({
+            'month': month_start,
+            'effective_date': history.effective_date(month_start),
+            'monthly_interest': sum(by_bank.values()),
+            'by_bank': by_bank
+        })
+    return {
+        'periods': periods,
+        'total_interest': sum(period['monthly_interest'] for period in periods)
+    }
@@ -1,221 +1,433 @@
+import logging
 import os
-import joblib
-from datetime import datetime
-import xgboost as xgb
-import shap
+import threading
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import accuracy_score
+from .compiled_model import load_compiled, load_xgboost_classifier
 from .data_processor import PRODUCT_MAPPING, FEATURES, prepare_features
-import streamlit as st
-import traceback
+from .model_manifest import get_manifest
+from .model_registry import file_sha256
+from typing import NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+BOOLEAN_FEATURES = ['has_insurance', 'has_investments', 'increased_balance', 'high_balance', 'salary_above_3k']
+
+
+class BatchPrediction(NamedTuple):
+    """Model output for N rows; row i of every array belongs to input row i"""
+    predictions: np.ndarray
+    probabilities: np.ndarray
+    shap_values: Optional[np.ndarray]
+    features: pd.DataFrame
+
+
+def _explanations(row, shap_row):
+    """Explanation entries for one row, most important feature first"""
+    order = np.argsort(-np.abs(shap_row), kind='stable')
+    explanations = []
+    for idx in order:
+        importance = float(np.abs(shap_row[idx]))
+        if importance <= 0:
+            continue
+        feature = row.index[idx]
+        value = row.iloc[idx]
+        if feature in BOOLEAN_FEATURES:
+            value = bool(int(value))
+        elif feature in ['savings_amount', 'monthly_card_spend']:
+            value = f"${float(value):,.2f}"
+        elif feature == 'num_giro_payments':
+            value = int(value)
+
+        explanations.append({
+            'feature': feature,
+            'value': value,
+            'importance': importance
+        })
+    return explanations
+
+
+# SHAP explainers for the two most recent model versions, shared by every recommender
+_MAX_EXPLAINERS = 2
+_explainers = {}
+_explainers_lock = threading.Lock()
+
+
+def get_explainer(model, model_key):
+    """TreeExplainer for a model version (keyed by the model file's SHA-256), built once per process"""
+    explainer = _explainers.get(model_key)
+    if explainer is None:
+        with _explainers_lock:
+            explainer = _explainers.get(model_key)
+            if explainer is None:
+                import shap
+
+                explainer = _explainers[model_key] = shap.TreeExplainer(model)
+                while len(_explainers) > _MAX_EXPLAINERS:
+                    del _explainers[next(iter(_explainers))]
+    return explainer
+
+
+def _read_verified(loader, path, sha256):
+    """``loader(path)`` after checking the file against its manifest checksum"""
+    if file_sha256(path) != sha256:
+        raise ValueError(f"{path} does not match the checksum in the manifest")
+    return loader(path)
+
 
 class ProductRecommender:
+    """Trains, publishes and serves the product recommender.
+
+    Serving scores with the compiled export of the active version (NumPy
+    only); the xgboost classifier is loaded on first use of ``model``, which
+    training and SHAP explanations need.
+    """
+
     def __init__(self):
-        self.model = None
-        self.explainer = None
+        self._model = None
+        # Artifact to load ``model`` from on first use, set by load_model
+        self._model_source = None
+        self.compiled = None
+        self.model_key = None
+        self._explainer = None
+        self.load_error = None
+        self.last_training_report = None
         self.scaler = None
         self.model_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'models')
         os.makedirs(self.model_dir, exist_ok=True)
-        self.model_path = os.path.join(self.model_dir, 'product_recommender.xgb')
         self.scaler_path = os.path.join(self.model_dir, 'scaler.joblib')
-        self.version_path = os.path.join(self.model_dir, 'version.txt')
-        self.log_path = os.path.join(self.model_dir, 'model_versions.log')
-        self.version = self._get_current_version()
-        self.data_count = 0
-        
-    def _get_current_version(self):
-        try:
-            if os.path.exists(self.version_path):
-                with open(self.version_path, 'r') as f:
-                    return int(f.read().strip())
-            return 0
-        except Exception:
-            return 0
+        # Version, artifact path and checksum all come from the one manifest
+        self.manifest = get_manifest()
+        self._set_active(self.manifest.active())
+
+    def _set_active(self, active):
+        self.active_version = active
+        self.version = active.version if active else 0
+        self.model_path = self.manifest.artifact_path(active) if active else None
+
+    @property
+    def model(self):
+        """The xgboost classifier; for a loaded version, read from its artifact on first use"""
+        if self._model is None and self._model_source is not None:
+            self._model = _read_verified(load_xgboost_classifier, *self._model_source)
+            self._model_source = None
+        return self._model
+
+    @model.setter
+    def model(self, model):
+        # A newly trained model is scored with xgboost until it is published and compiled
+        self._model = model
+        self._model_source = None
+        self.compiled = None
     
-    def train_model(self, X, y):
-        """Train the model and create SHAP explainer"""
-        print("Starting model training...")
-        
-        # Initialize XGBoost classifier
-        self.model = xgb.XGBClassifier(
-            objective='multi:softprob',
-            num_class=len(PRODUCT_MAPPING),
-            max_depth=3,
-            learning_rate=0.1,
-            n_estimators=100
-        )
-        
-        # Fit the model
-        self.model.fit(X, y)
-        print("Model training completed")
-        
-        # Create SHAP explainer
-        self.explainer = shap.TreeExplainer(self.model)
-        
-        # Calculate training accuracy
-        y_pred = self.model.predict(X)
-        accuracy = accuracy_score(y, y_pred)
-        print(f"Training accuracy: {accuracy:.4f}")
-        
+    def train_model(self, X, y, profile='default', budget=None):
+        """Train and save the model.
+
+        ``profile='compact'`` trains with the compact profile (hist, early
+        stopping, round pruning; see compact_training) and only replaces the
+        saved model when the result is within ``budget``. The comparison with
+        the current model is kept in ``last_training_report``. The recorded
+        accuracy is on the holdout for the compact profile and in-sample
+        (on the training rows) for the default one.
+        """
+        num_samples = len(X)
+        if profile == 'compact':
+            trained = self._train_compact(X, y, budget)
+            if trained is None:
+                return False, 0.0
+            # The rest of X is the holdout used for early stopping and evaluation
+            self.model, accuracy, num_samples = trained
+            self.model_key = None
+            self._explainer = None
+            note = ' (holdout)'
+        else:
+            import xgboost as xgb
+            from sklearn.metrics import accuracy_score
+
+            logger.info("Starting model training...")
+
+            # Initialize XGBoost classifier
+            self.model = xgb.XGBClassifier(
+                objective='multi:softprob',
+                num_class=len(PRODUCT_MAPPING),
+                max_depth=3,
+                learning_rate=0.1,
+                n_estimators=100
+            )
+
+            # Fit the model
+            self.model.fit(X, y)
+            self.model_key = None
+            self._explainer = None
+            logger.info("Model training completed")
+
+            # Calculate training accuracy
+            y_pred = self.model.predict(X)
+            accuracy = accuracy_score(y, y_pred)
+            logger.info(f"Training accuracy: {accuracy:.4f}")
+            note = ' (in-sample)'
+
+        return self._persist(num_samples, accuracy, note=note)
+
+    def _persist(self, num_samples, accuracy, note='', **metrics):
+        """Publish the trained model as the next active version; returns (saved, accuracy)"""
         try:
-            # Save model and explainer
-            print(f"Saving model to: {self.model_path}")
-            model_data = {
-                'model': self.model,
-                'explainer': self.explainer
-            }
-            self.model.save_model(self.model_path)
-            
-            # Update version
-            self.version += 1
-            with open(self.version_path, 'w') as f:
-                f.write(str(self.version))
-            
-            # Log version
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            log_entry = f"[{timestamp}] Version {self.version}: {len(X)} samples, accuracy: {accuracy:.2%}\n"
-            with open(self.log_path, 'a') as f:
-                f.write(log_entry)
-            
+            self._publish(dict(metrics, samples=int(num_samples), accuracy=round(float(accuracy), 6)),
+                          note.strip(' ()'))
+            logger.info(f"Saved model version {self.version}: {num_samples} samples{note}, accuracy: {accuracy:.2%}")
             return True, accuracy
         except Exception as e:
-            print(f"Error saving model: {str(e)}")
+            logger.exception(f"Error saving model: {str(e)}")
             return False, 0.0
-    
+
+    def train_incremental(self, X_new, y_new, rounds=10):
+        """Continue boosting the loaded model on new rows only, then save it as the next version.
+
+        Adds ``rounds`` boosting rounds fitted to ``X_new`` starting from the
+        current trees (xgboost ``xgb_model`` continuation) with the current
+        version's own training parameters, so the cost tracks
+        the number of new rows rather than the whole history. The model grows
+        by ``rounds * n_classes`` trees per call; schedule full rebuilds to
+        reset it. Returns (saved, accuracy on the new rows).
+        """
+        from .training_data import train_incremental
+
+        if self.model is None and not self.load_model():
+            raise ValueError(f"No model to continue from: {self.load_error}")
+        base_rounds = self.model.get_booster().num_boosted_rounds()
+        model = train_incremental(self.model, X_new, y_new, rounds)
+        self.model = model
+        self.model_key = None
+        self._explainer = None
+        accuracy = float((model.predict_proba(X_new).argmax(axis=1) == np.asarray(y_new)).mean())
+        logger.info(f"Incremental training: {base_rounds} + {rounds} rounds on {len(X_new)} new rows")
+        return self._persist(len(X_new), accuracy, note=' (incremental)')
+
+    def train_streaming(self, live_share=None, **kwargs):
+        """Train on the seed data and the user history streamed in chunks, then save it.
+
+        Memory stays bounded by the chunk size however long the history is
+        (see training_data.train_streaming for the arguments). ``live_share``
+        is the share of total sample weight given to user history rows.
+        Returns (saved, training accuracy); the details are in
+        ``last_training_report``.
+        """
+        from .training_data import train_streaming
+
+        model, report = train_streaming(live_share=live_share, **kwargs)
+        self.model = model
+        self.model_key = None
+        self._explainer = None
+        self.last_training_report = report
+        return self._persist(report.seed_rows + report.live_rows, report.accuracy,
+                             note=f' ({report.seed_rows} seed + {report.live_rows} live, streamed)')
+
+    def adopt_booster(self, booster, num_samples, accuracy, note='', **metrics):
+        """Install a booster trained elsewhere and publish it as the next active version.
+
+        ``accuracy`` and ``metrics`` are recorded in the manifest as given, so
+        callers pass whichever evaluation they ran (e.g. cross-validated).
+        Returns (saved, accuracy).
+        """
+        from .compact_training import _classifier_from_booster
+
+        self.model = _classifier_from_booster(booster)
+        self.model_key = None
+        self._explainer = None
+        return self._persist(num_samples, accuracy, note=note, **metrics)
+
+    def _train_compact(self, X, y, budget=None):
+        """(compact model, holdout accuracy, training rows), or None if it misses the budget"""
+        from .compact_training import (
+            TrainingBudget, TrainingBudgetError, check_budget, compare_report,
+            evaluate_model, split_holdout, train_compact
+        )
+
+        budget = budget or TrainingBudget()
+        X_train, X_holdout, y_train, y_holdout = split_holdout(X, y)
+        model, _ = train_compact(X_train, y_train, X_holdout, y_holdout, num_class=len(PRODUCT_MAPPING))
+        candidate = evaluate_model(model, X_holdout, y_holdout)
+
+        current = current_file_bytes = None
+        if self.model_path and os.path.exists(self.model_path):
+            try:
+                current = evaluate_model(load_xgboost_classifier(self.model_path), X_holdout, y_holdout)
+                current_file_bytes = os.path.getsize(self.model_path)
+            except Exception:
+                logger.warning(f"Could not evaluate the current model at {self.model_path}")
+        self.last_training_report = compare_report(candidate, current, current_file_bytes)
+        logger.info(f"Compact training report:\n{self.last_training_report}")
+
+        try:
+            check_budget(candidate, budget)
+        except TrainingBudgetError as e:
+            logger.error(f"Compact model rejected, keeping the current model: {e}")
+            return None
+        return model, candidate.accuracy, len(X_train)
+
     def load_model(self):
-        """Load the trained model"""
+        """Load the manifest's active version for scoring; returns False (reason in ``load_error``) if it can't be loaded.
+
+        Loads the compiled export when the version has one, so serving never
+        imports xgboost; versions published without one are scored by xgboost.
+        """
+        self.load_error = None
+        self._set_active(self.manifest.active())
+        if self.active_version is None:
+            self.load_error = f"No model version is active in {self.manifest.path}"
+            logger.error(self.load_error)
+            return False
+        if not os.path.exists(self.model_path):
+            self.load_error = f"Model file not found at: {self.model_path}"
+            logger.error(self.load_error)
+            return False
+
         try:
-            st.write("Debug - Current directory:", os.getcwd())
-            st.write("Debug - Model directory:", self.model_dir)
-            st.write("Debug - Model path:", self.model_path)
-            
-            if not os.path.exists(self.model_path):
-                st.error(f"Model file not found at: {self.model_path}")
-                return False
-                
-            st.write("Debug - Attempting to load model file...")
-            
-            # Load using XGBoost directly
-            self.model = xgb.XGBClassifier()
-            self.model.load_model(self.model_path)
-            
-            # Create new SHAP explainer
-            self.explainer = shap.TreeExplainer(self.model)
-            
-            st.write("Debug - Model loaded successfully")
-            return True
-            
+            compiled_path = self.manifest.compiled_path(self.active_version)
+            if compiled_path:
+                compiled = _read_verified(load_compiled, compiled_path, self.active_version.compiled_sha256)
+                self.model = None
+                self.compiled = compiled
+                self._model_source = (self.model_path, self.active_version.sha256)
+            else:
+                logger.warning(f"Version {self.version} has no compiled model; scoring with xgboost")
+                self.model = _read_verified(load_xgboost_classifier, self.model_path, self.active_version.sha256)
+            self.model_key = self.active_version.sha256
+            # The SHAP explainer is built on first use and shared per model version
+            self._explainer = None
         except Exception as e:
-            st.error(f"Error loading model: {str(e)}")
-            st.write("Debug - Model load error details:", traceback.format_exc())
+            self.load_error = f"Error loading model: {str(e)}"
+            logger.exception(self.load_error)
             return False
-    
-    def predict(self, features):
-        """Get product recommendation with SHAP explanations"""
+
+        logger.info(f"Loaded model version {self.version} from {self.model_path}")
+        return True
+
+    @property
+    def explainer(self):
+        """SHAP explainer for the loaded model version, built on first use"""
+        if self._explainer is None:
+            if self.model is None:
+                raise ValueError("Model not loaded. Call load_model() first.")
+            # An unsaved model has no file hash; key it by identity instead
+            self._explainer = get_explainer(self.model, self.model_key or f"unsaved-{id(self.model)}")
+        return self._explainer
+
+    def _scorer(self):
+        """The compiled model when there is one, else the xgboost classifier"""
+        if self.compiled is not None:
+            return self.compiled
         if self.model is None:
             raise ValueError("Model not loaded. Call load_model() first.")
-        
-        # Ensure features are in correct format
-        if isinstance(features, dict):
-            features = pd.DataFrame([features])
-        elif isinstance(features, pd.Series):
+        return self.model
+
+    def _prepare(self, features):
+        if isinstance(features, (dict, pd.Series)):
             features = pd.DataFrame([features])
-            
-        # Prepare features using data_processor
-        features = prepare_features(features)
-        
-        # Debug: Print input features
-        print("\nInput features:")
-        print(features)
-        
-        # Make prediction
-        probabilities = self.model.predict_proba(features)
-        prediction = int(self.model.predict(features)[0])  # Convert to Python int
-        
-        # Debug: Print prediction info
-        print("\nPrediction:", prediction)
-        print("Probabilities:", probabilities[0])
-        
-        # Calculate SHAP values
-        shap_values = self.explainer.shap_values(features)
-        
-        # Debug information
-        print("\nSHAP values type:", type(shap_values))
-        print("Shape of SHAP values:", shap_values.shape)
-        
-        # Get actual feature names from the model
-        model_features = self.model.get_booster().feature_names
-        print("Model features:", model_features)
-        
-        # Create explanation dictionary
-        feature_importance = {}
-        for idx, feature in enumerate(model_features):
-            try:
-                # Get SHAP value for the predicted class
-                shap_value = shap_values[0, idx, prediction]  # Access the correct class's SHAP value
-                print(f"SHAP value for feature {feature}:", shap_value)
-                importance = float(np.abs(shap_value))
-                feature_importance[feature] = importance
-            except Exception as e:
-                print(f"Error processing feature {feature} at index {idx}: {str(e)}")
-        
-        # Sort features by importance
-        sorted_features = sorted(
-            feature_importance.items(),
-            key=lambda x: abs(x[1]),
-            reverse=True
-        )
-        
-        explanations = []
-        for feature, importance in sorted_features:
-            if importance > 0:
-                value = features[feature].iloc[0]
-                if feature in ['has_insurance', 'has_investments', 'increased_balance', 'high_balance', 'salary_above_3k']:
-                    value = bool(int(value))
-                elif feature in ['savings_amount', 'monthly_card_spend']:
-                    value = f"${float(value):,.2f}"
-                elif feature == 'num_giro_payments':
-                    value = int(value)
-                
-                explanations.append({
-                    'feature': feature,
-                    'value': value,
-                    'importance': float(importance)
-                })
-        
-        return prediction, [float(p) for p in probabilities[0]], explanations
-    
-    def should_retrain(self):
-        """Check if retraining is needed"""
-        self.data_count += 1
-        if self.data_count >= 50:
-            self.data_count = 0
-            return True
-        return False
-        
+        elif not isinstance(features, pd.DataFrame):
+            features = pd.DataFrame(np.asarray(features), columns=FEATURES)
+        else:
+            # prepare_features converts columns in place; leave the caller's frame alone
+            features = features.copy()
+        return prepare_features(features)
+
+    def predict_batch(self, features, explain=False):
+        """Score N rows at once with a single predict_proba call.
+
+        ``features`` is a DataFrame with the FEATURES columns or an (N, 8)
+        array in FEATURES order. Returns a BatchPrediction of arrays; with
+        ``explain=True`` it also carries each row's SHAP values for its
+        predicted class, shape (N, len(FEATURES)).
+        """
+        features = self._prepare(features)
+
+        probabilities = self._scorer().predict_proba(features)
+        predictions = probabilities.argmax(axis=1)
+
+        shap_values = None
+        if explain:
+            shap_values = self.explain_batch(features, predictions)
+        return BatchPrediction(predictions, probabilities, shap_values, features)
+
+    def explain_batch(self, features, predictions=None, chunk_size=10000):
+        """SHAP values of each row's predicted class, shape (N, n_features).
+
+        Rows are explained ``chunk_size`` at a time so offline jobs over the
+        stored user data keep the (rows, features, classes) SHAP output small.
+        """
+        features = self._prepare(features)
+        if predictions is None:
+            predictions = self._scorer().predict_proba(features).argmax(axis=1)
+        predictions = np.asarray(predictions)
+        chunks = []
+        for start in range(0, len(features), chunk_size):
+            values = self.explainer.shap_values(features.iloc[start:start + chunk_size])
+            if isinstance(values, list):
+                # Older SHAP releases return one (N, n_features) array per class
+                values = np.stack(values, axis=-1)
+            rows = np.arange(len(values))
+            chunks.append(values[rows, :, predictions[start:start + chunk_size]])
+        return np.concatenate(chunks) if chunks else np.empty((0, len(FEATURES)))
+
+    def explain(self, features, prediction):
+        """Explanation entries for one row's recommendation, most important feature first"""
+        features = self._prepare(features)
+        shap_row = self.explain_batch(features.iloc[:1], [prediction])[0]
+        return _explanations(features.iloc[0], shap_row)
+
+    def predict(self, features, explain=True):
+        """Get product recommendation, with SHAP explanations unless ``explain`` is False.
+
+        With ``explain=False`` the explanations are None; call ``explain()``
+        later, e.g. when the user opens the details, to compute them.
+        """
+        result = self.predict_batch(features, explain=explain)
+        prediction = int(result.predictions[0])
+        explanations = None
+        if explain:
+            explanations = _explanations(result.features.iloc[0], result.shap_values[0])
+        return prediction, [float(p) for p in result.probabilities[0]], explanations
+
+    def should_retrain(self, total_records):
+        """Check if ``total_records`` stored records warrant a retrain under the durable retrain policy"""
+        from .retraining import get_retrain_queue
+
+        return get_retrain_queue().should_retrain(total_records)
+
+    def _publish(self, metrics=None, note=''):
+        """Write the model and its compiled export to temp files and publish both as the active version"""
+        import tempfile
+
+        from .compact_training import record_training_params
+        from .compiled_model import export_xgboost
+
+        model = self.model
+        compiled = export_xgboost(model, FEATURES, [PRODUCT_MAPPING[i] for i in sorted(PRODUCT_MAPPING)])
+        tmp_paths = []
+        try:
+            for suffix in ('.ubj', '.npz'):
+                fd, tmp_path = tempfile.mkstemp(dir=self.model_dir, suffix=suffix)
+                os.close(fd)
+                tmp_paths.append(tmp_path)
+            # Kept in the file so incremental retrains continue with the same parameters
+            record_training_params(model.get_booster())
+            model.save_model(tmp_paths[0])
+            compiled.save(tmp_paths[1])
+            published = self.manifest.publish(tmp_paths[0], metrics, note, compiled_path=tmp_paths[1])
+        except BaseException:
+            for tmp_path in tmp_paths:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+            raise
+        self._set_active(published)
+        self.compiled = compiled
+        self.model_key = published.sha256
+        self._explainer = None
+
     def _save_model(self):
-        """Save model and update version tracking"""
-        # Create directories if they don't exist
-        os.makedirs(os.path.dirname(self.model_path), exist_ok=True)
-        
-        # Save model and scaler
-        model_data = {
-            'model': self.model,
-            'explainer': self.explainer
-        }
-        self.model.save_model(self.model_path)
+        """Publish the model as the next version and save the scaler"""
+        self._publish()
         if self.scaler:
+            import joblib
+
             joblib.dump(self.scaler, self.scaler_path)
-            
-        # Update version number
-        self.version += 1
-        with open(self.version_path, 'w') as f:
-            f.write(str(self.version))
-        
-        # Append to log file
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        log_entry = f"[{timestamp}] Version {self.version}\n"
-        with open(self.log_path, 'a') as f:
-            f.write(log_entry)
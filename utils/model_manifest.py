@@ -0,0 +1,251 @@
+"""Versioned model manifest: one JSON file that says which artifact is live.
+
+Every published version gets its own immutable artifact file
+(``product_recommender-v<N>.ubj``), usually with its NumPy-compiled export
+(``product_recommender-v<N>.npz``, see compiled_model) that serving scores
+with, and an entry in the manifest with their paths, SHA-256s, metrics and
+note; ``active`` points at the version being served. The manifest is only ever replaced whole (write to a temp file,
+then rename), after the artifact it points to is in place, so a reader
+sees either the old or the new version, never a version number paired with
+another version's file. Publishers in different processes serialise on a
+lock file. Serving processes watch the manifest (see model_pool) and swap
+models when it changes.
+
+Rolling back is ``activate(version)``; artifacts older than the newest
+``keep_artifacts`` (other than the active one) are deleted, but their
+entries stay as history. ``attach_compiled`` adds a compiled export to a
+version published without one.
+
+Usage:
+    python -m utils.model_manifest [--activate VERSION]
+"""
+import argparse
+import json
+import logging
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from .model_registry import MODEL_DIR, file_sha256
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = os.path.join(MODEL_DIR, 'product_recommender.manifest.json')
+ARTIFACT_PREFIX = 'product_recommender'
+
+
+class ModelVersion(NamedTuple):
+    version: int
+    artifact: Optional[str]
+    sha256: Optional[str]
+    created_at: str
+    metrics: dict
+    note: str = ''
+    compiled: Optional[str] = None
+    compiled_sha256: Optional[str] = None
+
+
+class ModelManifest:
+    """Version history and active pointer for one model (see the module docstring)"""
+
+    def __init__(self, path=MANIFEST_FILE, artifact_prefix=ARTIFACT_PREFIX, keep_artifacts=5):
+        self.path = path
+        self.model_dir = os.path.dirname(os.path.abspath(path))
+        self.artifact_prefix = artifact_prefix
+        self.keep_artifacts = keep_artifacts
+        self._lock = threading.Lock()
+
+    def read(self):
+        """The manifest as a dict; an empty one if nothing has been published"""
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'active': None, 'versions': {}}
+
+    def stat_key(self):
+        """Changes whenever the manifest is replaced; None if there is no manifest"""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    @staticmethod
+    def _version(number, entry):
+        return ModelVersion(int(number), entry.get('artifact'), entry['sha256'], entry['created_at'],
+                            entry.get('metrics', {}), entry.get('note', ''),
+                            entry.get('compiled'), entry.get('compiled_sha256'))
+
+    def active(self, manifest=None):
+        """The active ModelVersion, or None"""
+        manifest = manifest or self.read()
+        if manifest['active'] is None:
+            return None
+        return self._version(manifest['active'], manifest['versions'][str(manifest['active'])])
+
+    def versions(self):
+        """Every published ModelVersion, oldest first"""
+        manifest = self.read()
+        return [self._version(number, entry)
+                for number, entry in sorted(manifest['versions'].items(), key=lambda item: int(item[0]))]
+
+    def artifact_path(self, model_version):
+        return os.path.join(self.model_dir, model_version.artifact)
+
+    def compiled_path(self, model_version):
+        """Path of the version's compiled export, or None if it has none"""
+        if not model_version.compiled:
+            return None
+        return os.path.join(self.model_dir, model_version.compiled)
+
+    @contextmanager
+    def _exclusive(self):
+        """Serialise manifest updates across threads and, where fcntl exists, processes"""
+        with self._lock:
+            os.makedirs(self.model_dir, exist_ok=True)
+            with open(self.path + '.lock', 'a') as lock_file:
+                try:
+                    import fcntl
+                except ImportError:
+                    fcntl = None
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _write(self, manifest):
+        fd, tmp_path = tempfile.mkstemp(dir=self.model_dir, suffix='.json.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(manifest, f, indent=2, sort_keys=True)
+                f.write('\n')
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def _place(self, source_path, filename):
+        """Rename a written file into the models directory; returns its SHA-256"""
+        os.chmod(source_path, 0o644)
+        os.replace(source_path, os.path.join(self.model_dir, filename))
+        return file_sha256(os.path.join(self.model_dir, filename))
+
+    def publish(self, source_path, metrics=None, note='', activate=True, suffix='.ubj', compiled_path=None):
+        """Move a written model file (and its compiled export) into place as the next version.
+
+        Activates it by default. ``source_path`` and ``compiled_path`` must be
+        in the models directory so the moves are renames. Returns the new
+        ModelVersion.
+        """
+        with self._exclusive():
+            manifest = self.read()
+            number = max((int(v) for v in manifest['versions']), default=0) + 1
+            artifact = f"{self.artifact_prefix}-v{number}{suffix}"
+            entry = manifest['versions'][str(number)] = {
+                'artifact': artifact,
+                'sha256': self._place(source_path, artifact),
+                'created_at': datetime.now().isoformat(timespec='seconds'),
+                'metrics': metrics or {},
+                'note': note,
+            }
+            if compiled_path:
+                entry['compiled'] = f"{self.artifact_prefix}-v{number}.npz"
+                entry['compiled_sha256'] = self._place(compiled_path, entry['compiled'])
+            if activate:
+                manifest['active'] = number
+            self._prune(manifest)
+            self._write(manifest)
+        logger.info(f"Published {artifact}" + (" (active)" if activate else ""))
+        return self._version(number, manifest['versions'][str(number)])
+
+    def activate(self, version):
+        """Point the manifest at an earlier (or later) published version"""
+        with self._exclusive():
+            manifest = self.read()
+            entry = manifest['versions'].get(str(version))
+            if entry is None or not entry.get('artifact'):
+                raise ValueError(f"Version {version} has no artifact to activate")
+            manifest['active'] = int(version)
+            self._write(manifest)
+        logger.info(f"Activated version {version}")
+        return self._version(version, entry)
+
+    def attach_compiled(self, version, compiled_path):
+        """Record a compiled export (written in the models directory) for an already published version"""
+        with self._exclusive():
+            manifest = self.read()
+            entry = manifest['versions'].get(str(version))
+            if entry is None or not entry.get('artifact'):
+                raise ValueError(f"Version {version} has no artifact to attach a compiled model to")
+            entry['compiled'] = f"{self.artifact_prefix}-v{version}.npz"
+            entry['compiled_sha256'] = self._place(compiled_path, entry['compiled'])
+            self._write(manifest)
+        logger.info(f"Attached {entry['compiled']} to version {version}")
+        return self._version(version, entry)
+
+    def _is_versioned(self, number, artifact):
+        # Files named before versioned artifacts (e.g. product_recommender.xgb)
+        # may still be opened by name, so pruning never touches them
+        return bool(artifact) and artifact.startswith(f"{self.artifact_prefix}-v{number}.")
+
+    def _prune(self, manifest):
+        with_artifacts = sorted((int(number) for number, entry in manifest['versions'].items()
+                                 if self._is_versioned(number, entry.get('artifact'))), reverse=True)
+        for number in with_artifacts[self.keep_artifacts:]:
+            if number == manifest['active']:
+                continue
+            entry = manifest['versions'][str(number)]
+            for key in ('artifact', 'compiled'):
+                if not entry.get(key):
+                    continue
+                try:
+                    os.unlink(os.path.join(self.model_dir, entry[key]))
+                except FileNotFoundError:
+                    pass
+                entry[key] = None
+                entry[f'{key}_sha256' if key == 'compiled' else 'sha256'] = None
+
+_manifest = None
+_manifest_lock = threading.Lock()
+
+
+def get_manifest():
+    """Process-wide manifest for the product recommender"""
+    global _manifest
+    with _manifest_lock:
+        if _manifest is None:
+            _manifest = ModelManifest()
+        return _manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show or change the product recommender's active version")
+    parser.add_argument('--activate', type=int, metavar='VERSION', help="Serve this published version")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    manifest = get_manifest()
+    if args.activate is not None:
+        manifest.activate(args.activate)
+    active = manifest.active()
+    for model_version in manifest.versions():
+        marker = '*' if active and model_version.version == active.version else ' '
+        metrics = ', '.join(f"{name}={value}" for name, value in sorted(model_version.metrics.items()))
+        print(f"{marker} v{model_version.version:<4} {model_version.created_at:20} "
+              f"{model_version.artifact or '(pruned)':34} {metrics} {model_version.note}".rstrip())
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
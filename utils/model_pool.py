@@ -0,0 +1,184 @@
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+COLD = 'cold'
+WARMING = 'warming'
+READY = 'ready'
+FAILED = 'failed'
+
+
+class WarmModel:
+    """A model loaded once per process in a background thread and shared by every session.
+
+    ``start()`` begins loading without blocking; ``state`` moves from 'cold'
+    through 'warming' to 'ready' (or 'failed', with the reason in ``error``).
+    ``get()`` returns the loaded model, or None while it is still warming, so
+    callers can show a "warming up" message instead of waiting on the load.
+    A failed model is retried by ``start()`` once ``retry_interval`` seconds
+    have passed.
+
+    With ``watch_path``, a ready model stats the file at most every
+    ``check_interval`` seconds from ``get()``. When the file changes, for
+    example when a retrain publishes a new version to the model manifest, the
+    new version is loaded in another thread while the old one keeps serving,
+    then swapped in with one reference assignment between requests. A failed
+    reload keeps the old model.
+    """
+
+    def __init__(self, name, loader, retry_interval=60.0, watch_path=None, check_interval=2.0):
+        self.name = name
+        self.state = COLD
+        self.error = None
+        self.load_seconds = None
+        self.retry_interval = retry_interval
+        self._failed_at = None
+        self._loader = loader
+        self._model = None
+        self.watch_path = watch_path
+        self.check_interval = check_interval
+        self.reload_error = None
+        self._loaded_stat = None
+        self._failed_stat = None
+        self._last_check = 0.0
+        self._reloading = False
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    @property
+    def ready(self):
+        return self.state == READY
+
+    def start(self):
+        """Begin loading in a daemon thread; safe to call on every rerun"""
+        with self._lock:
+            if self.state in (WARMING, READY):
+                return self
+            if self.state == FAILED and time.monotonic() - self._failed_at < self.retry_interval:
+                return self
+            self.state = WARMING
+            self.error = None
+            self._done.clear()
+            threading.Thread(target=self._warm, name=f'warm-{self.name}', daemon=True).start()
+        return self
+
+    def _file_stat(self):
+        try:
+            stat = os.stat(self.watch_path)
+        except OSError:
+            return None
+        # Write-then-rename replaces the inode, so a swap is seen even within one mtime tick
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _warm(self):
+        started = time.perf_counter()
+        loaded_stat = self._file_stat() if self.watch_path else None
+        try:
+            model = self._loader()
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            self._failed_at = time.monotonic()
+            self.state = FAILED
+            logger.exception(f"Warming model '{self.name}' failed")
+        else:
+            self._model = model
+            self._loaded_stat = loaded_stat
+            self.load_seconds = time.perf_counter() - started
+            self.state = READY
+            logger.info(f"Model '{self.name}' ready in {self.load_seconds:.2f}s")
+        finally:
+            self._done.set()
+
+    def get(self, timeout=0):
+        """The loaded model, waiting up to ``timeout`` seconds (None waits forever); None if not ready"""
+        if self.state == COLD:
+            self.start()
+        if self.state == WARMING and timeout != 0:
+            self._done.wait(timeout)
+        if self.state != READY:
+            return None
+        if self.watch_path and time.monotonic() - self._last_check >= self.check_interval:
+            self._check_for_update()
+        return self._model
+
+    def _check_for_update(self):
+        with self._lock:
+            self._last_check = time.monotonic()
+            stat = self._file_stat()
+            if self._reloading or stat is None or stat in (self._loaded_stat, self._failed_stat):
+                return
+            self._reloading = True
+        threading.Thread(target=self._reload, args=(stat,), name=f'reload-{self.name}', daemon=True).start()
+
+    def _reload(self, stat):
+        started = time.perf_counter()
+        try:
+            model = self._loader()
+        except Exception as e:
+            self.reload_error = f"{type(e).__name__}: {e}"
+            self._failed_stat = stat
+            logger.exception(f"Reloading model '{self.name}' failed; keeping the loaded version")
+        else:
+            # Single reference assignment: callers get the old or the new model, never a mix
+            self._model = model
+            self._loaded_stat = stat
+            self.reload_error = None
+            self._failed_stat = None
+            logger.info(f"Model '{self.name}' reloaded in {time.perf_counter() - started:.2f}s")
+        finally:
+            self._reloading = False
+
+
+def _load_product_recommender():
+    from .model_handler import ProductRecommender
+
+    recommender = ProductRecommender()
+    # Scores with the compiled model; xgboost and SHAP load on the first explanation
+    if not recommender.load_model():
+        raise RuntimeError(recommender.load_error)
+    return recommender
+
+
+def _load_insurance_model():
+    from .model_registry import load_insurance_model
+
+    return load_insurance_model()
+
+
+# Models the app warms at startup, by name
+LOADERS = {
+    'insurance_model': _load_insurance_model,
+    'product_recommender': _load_product_recommender,
+}
+
+# Files whose replacement (e.g. a new active version in the manifest) triggers a background reload
+WATCH_PATHS = {
+    'product_recommender': os.path.join(os.path.dirname(os.path.dirname(__file__)), 'models',
+                                        'product_recommender.manifest.json'),
+}
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+def get_warm_model(name):
+    """Process-wide WarmModel for one of LOADERS (not started)"""
+    with _models_lock:
+        model = _models.get(name)
+        if model is None:
+            model = _models[name] = WarmModel(name, LOADERS[name], watch_path=WATCH_PATHS.get(name))
+        return model
+
+
+def start_warmup(names=None):
+    """Start warming the named models (default: all of LOADERS) in the background"""
+    return {name: get_warm_model(name).start() for name in names or LOADERS}
+
+
+def warmup_status():
+    """{name: state} for every model that has been requested in this process"""
+    with _models_lock:
+        return {name: model.state for name, model in _models.items()}
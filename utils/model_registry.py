@@ -0,0 +1,140 @@
+import hashlib
+import json
+import logging
+import os
+import pickle
+import tempfile
+import threading
+
+import numpy as np
+
+from .compiled_model import load_compiled
+
+logger = logging.getLogger(__name__)
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'models')
+REGISTRY_FILE = 'registry.json'
+
+
+class ModelChecksumError(Exception):
+    """Raised when a model artifact does not match its registered checksum"""
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _load_pickle(path):
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+class ModelRegistry:
+    """Local, versioned model artifacts listed in models/registry.json.
+
+    Each entry records the artifact path (relative to the models directory), a
+    version label and the artifact's SHA-256. ``load`` verifies the checksum
+    and deserializes an artifact once per process; later calls return the
+    same in-memory object without touching disk until it is evicted.
+    """
+
+    def __init__(self, model_dir=MODEL_DIR):
+        self.model_dir = model_dir
+        self.registry_path = os.path.join(model_dir, REGISTRY_FILE)
+        self._lock = threading.Lock()
+        self._loaded = {}
+
+    def entries(self):
+        if not os.path.exists(self.registry_path):
+            return {}
+        with open(self.registry_path, 'r') as f:
+            return json.load(f)
+
+    def entry(self, name):
+        entries = self.entries()
+        if name not in entries:
+            raise KeyError(f"Model '{name}' is not registered in {self.registry_path}")
+        return entries[name]
+
+    def artifact_path(self, name):
+        return os.path.join(self.model_dir, self.entry(name)['path'])
+
+    def load(self, name, loader=_load_pickle):
+        """Return the verified, deserialized artifact for ``name`` (cached per process)"""
+        cached = self._loaded.get(name)
+        if cached is not None:
+            return cached
+        with self._lock:
+            cached = self._loaded.get(name)
+            if cached is not None:
+                return cached
+            entry = self.entry(name)
+            path = os.path.join(self.model_dir, entry['path'])
+            checksum = file_sha256(path)
+            if checksum != entry['sha256']:
+                raise ModelChecksumError(
+                    f"Checksum mismatch for '{name}' ({path}): expected {entry['sha256']}, got {checksum}"
+                )
+            artifact = loader(path)
+            self._loaded[name] = artifact
+            logger.info(f"Loaded model '{name}' version {entry['version']} from {path}")
+            return artifact
+
+    def evict(self, name):
+        """Drop the in-memory copy so the next load re-reads the registered artifact"""
+        with self._lock:
+            self._loaded.pop(name, None)
+
+    def register(self, name, path, version, **metadata):
+        """Record an artifact (path relative to the models directory) and its checksum"""
+        with self._lock:
+            entries = self.entries()
+            entries[name] = dict(
+                metadata,
+                path=path,
+                version=str(version),
+                sha256=file_sha256(os.path.join(self.model_dir, path))
+            )
+            # Write then rename so readers never see a partial registry
+            fd, tmp_path = tempfile.mkstemp(dir=self.model_dir, suffix='.json.tmp')
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(entries, f, indent=2, sort_keys=True)
+                    f.write('\n')
+                # mkstemp creates the file owner-only; the registry is a shared, readable file
+                os.chmod(tmp_path, 0o644)
+                os.replace(tmp_path, self.registry_path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
+            self._loaded.pop(name, None)
+            return entries[name]
+
+
+_registry = None
+
+
+def get_registry():
+    """Process-wide registry for the repository's models directory"""
+    global _registry
+    if _registry is None:
+        _registry = ModelRegistry()
+    return _registry
+
+
+def load_insurance_model():
+    """The compiled insurance recommendation model (see compiled_model.LinearModel)"""
+    return get_registry().load('insurance_model_compiled', loader=load_compiled)
+
+
+def predict_insurance(savings_amount, monthly_spend, has_insurance):
+    """Recommend an insurance product; returns (product name, class index, probabilities)"""
+    model = load_insurance_model()
+    probabilities = model.predict_proba([float(savings_amount), float(monthly_spend), float(has_insurance)])[0]
+    prediction = int(np.argmax(probabilities))
+    return model.target_names[prediction], prediction, probabilities
@@ -0,0 +1,30 @@
+"""Streamlit presentation for the shared recommendation models.
+
+The model code (model_handler, model_pool, model_registry) reports through
+logging and return values only; this module is the one place that turns a
+model's state into page elements.
+"""
+import streamlit as st
+
+from .model_pool import FAILED, get_warm_model
+
+
+def warm_model_or_notice(name, unavailable_message="Unable to load the recommendation model", timeout=0.5):
+    """The shared warm model ``name``, or None after showing why it isn't available yet.
+
+    Waits at most ``timeout`` seconds for a model that is still loading, then
+    shows a 'warming up' notice rather than holding the page.
+    """
+    warm_model = get_warm_model(name)
+    model = warm_model.get(timeout)
+    if model is None:
+        if warm_model.state == FAILED:
+            st.error(unavailable_message)
+        else:
+            st.info("⏳ The recommendation model is warming up, please try again in a moment.")
+    return model
+
+
+def get_recommender(timeout=0.5):
+    """The warm ProductRecommender for this page, or None (with a notice shown)"""
+    return warm_model_or_notice('product_recommender', timeout=timeout)
@@ -0,0 +1,79 @@
+import threading
+from bisect import bisect_right
+from datetime import date
+
+# Rates files without an effective_date column hold a single, always-effective rate set
+UNDATED = date.min
+
+
+class RateHistory:
+    """Effective-dated rate sets from the rates file.
+
+    Every rate set is the complete catalog in force from its effective date
+    until the next one. Dates are kept sorted so a point-in-time lookup is a
+    binary search, and each rate set's banks data is built on first use and
+    cached, so switching versions mid-simulation costs nothing after the first
+    month that uses them.
+    """
+
+    def __init__(self, effective_dates, banks, tiers):
+        # Parallel per-row sequences, as loaded from the rates file
+        self._banks = banks
+        self._tiers = tiers
+        self._rows = {}
+        for position, effective_date in enumerate(effective_dates):
+            self._rows.setdefault(effective_date, []).append(position)
+        self.dates = sorted(self._rows)
+        self._compiled = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.dates)
+
+    def effective_date(self, when=None):
+        """Effective date of the rate set in force on ``when`` (default today)"""
+        when = when or date.today()
+        i = bisect_right(self.dates, when) - 1
+        if i < 0:
+            raise LookupError(f"No interest rates in effect on {when.isoformat()}")
+        return self.dates[i]
+
+    def next_change(self, when=None):
+        """First effective date after ``when``, or None if no later rate set exists"""
+        when = when or date.today()
+        i = bisect_right(self.dates, when)
+        return self.dates[i] if i < len(self.dates) else None
+
+    def as_of(self, when=None):
+        """Banks data in force on ``when`` (default today); treat as read-only"""
+        effective_date = self.effective_date(when)
+        banks_data = self._compiled.get(effective_date)
+        if banks_data is None:
+            with self._lock:
+                banks_data = self._compiled.get(effective_date)
+                if banks_data is None:
+                    banks_data = self._compiled[effective_date] = self._compile(effective_date)
+        return banks_data
+
+    def _compile(self, effective_date):
+        by_bank = {}
+        for position in self._rows[effective_date]:
+            by_bank.setdefault(self._banks[position], []).append(self._tiers[position])
+        return {
+            bank_name: {'bank': bank_name, 'tiers': by_bank[bank_name]}
+            for bank_name in sorted(by_bank)
+        }
+
+    def rows(self):
+        """Per-row (effective_date, bank, tier) triples in file order"""
+        dates = [None] * len(self._tiers)
+        for effective_date, positions in self._rows.items():
+            for position in positions:
+                dates[position] = effective_date
+        return list(zip(dates, self._banks, self._tiers))
+
+
+def add_months(start, months):
+    """First day of the month ``months`` after ``start``'s month"""
+    month_index = start.year * 12 + start.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
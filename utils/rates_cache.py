@@ -0,0 +1,213 @@
+import hashlib
+import io
+import logging
+import os
+import threading
+import time
+from datetime import date
+from typing import NamedTuple, Optional
+
+from .interest_engine import load_rate_history
+from .rate_history import RateHistory, UNDATED
+from .rates_snapshot import load_snapshot, snapshot_path_for
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RATES_PATH = 'interest_rates.csv'
+
+
+class RatesVersion(NamedTuple):
+    """The rate set currently in force from one parsed rates file.
+
+    ``version`` is the SHA-256 of the file contents, suffixed with the
+    effective date when the file is effective-dated, so it changes both when
+    the file changes and when a dated rate set takes effect.
+    """
+    version: str
+    banks_data: dict
+    path: str
+    mtime: float
+    size: int
+    loaded_at: float
+    content_hash: str
+    history: RateHistory
+    effective_date: date
+    next_change: Optional[date]
+
+
+class RatesCache:
+    """Process-wide parsed interest rates, shared by every session and thread.
+
+    ``current()`` returns the cached rates without touching disk while the last
+    check is younger than ``check_interval`` seconds. After that it stats the
+    file; only a changed mtime or size causes a read, and the file is only
+    re-parsed when its content hash differs from the cached version. A
+    compiled snapshot next to the CSV (see rates_snapshot) is used instead of
+    parsing when it matches the CSV's hash.
+
+    A file that fails validation never replaces a good version: the error is
+    logged, kept in ``last_error`` and the previous rates keep serving. With
+    ``start_watching()`` a background thread does all checking and swaps new
+    versions in atomically, so ``current()`` never touches disk. Callers should
+    take one RatesVersion per request and use it throughout, so in-flight work
+    keeps the version it started with; anything derived from the rates should
+    be keyed by ``version`` or registered with ``add_listener``.
+
+    The returned ``banks_data`` is shared across sessions and must not be mutated.
+    """
+
+    def __init__(self, file_path=DEFAULT_RATES_PATH, check_interval=1.0):
+        self.file_path = os.path.abspath(file_path)
+        self.check_interval = check_interval
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._current = None
+        self._last_check = 0.0
+        self._failed_stat = None
+        self._loading_stat = None
+        self._listeners = []
+        self._watcher = None
+        self._stop = threading.Event()
+
+    def current(self):
+        rates = self._current
+        if rates is not None and rates.next_change is not None and date.today() >= rates.next_change:
+            # A dated rate set has taken effect since this version was built
+            with self._lock:
+                rates = self._current
+                if rates.next_change is not None and date.today() >= rates.next_change:
+                    rates = self._activate(rates.history, rates.content_hash, rates)
+        if rates is not None and (self._watcher is not None
+                                  or time.monotonic() - self._last_check < self.check_interval):
+            return rates
+        with self._lock:
+            return self._refresh()
+
+    def _refresh(self):
+        try:
+            return self._load()
+        except Exception as e:
+            if self._current is None:
+                raise
+            # Don't retry the same broken file on every check
+            self._failed_stat = self._loading_stat
+            self.last_error = f"{type(e).__name__}: {e}"
+            logger.error(f"Keeping rates version {self._current.version[:12]}; reload failed: {self.last_error}")
+            return self._current
+
+    @staticmethod
+    def _stat_key(stat):
+        return (stat.st_mtime, stat.st_size)
+
+    def _load(self):
+        stat = os.stat(self.file_path)
+        rates = self._current
+        self._last_check = time.monotonic()
+        if rates is not None and self._stat_key(stat) in ((rates.mtime, rates.size), self._failed_stat):
+            return rates
+
+        self._loading_stat = self._stat_key(stat)
+        with open(self.file_path, 'rb') as f:
+            content = f.read()
+        content_hash = hashlib.sha256(content).hexdigest()
+        if rates is not None and rates.content_hash == content_hash:
+            # Touched but unchanged: keep the parsed data
+            self._current = rates._replace(mtime=stat.st_mtime, size=stat.st_size)
+            return self._current
+
+        snapshot = load_snapshot(snapshot_path_for(self.file_path), expected_hash=content_hash)
+        if snapshot is not None:
+            logger.info(f"Loaded interest rates snapshot (version {content_hash[:12]})")
+            history = snapshot[1]
+        else:
+            logger.info(f"Loading interest rates from {self.file_path} (version {content_hash[:12]})")
+            history = load_rate_history(io.BytesIO(content))
+        return self._activate(history, content_hash, rates, stat)
+
+    def _activate(self, history, content_hash, rates, stat=None):
+        """Swap in the rate set in force today from ``history``"""
+        today = date.today()
+        effective_date = history.effective_date(today)
+        version = content_hash
+        if effective_date != UNDATED:
+            version = f"{content_hash}@{effective_date.isoformat()}"
+        new_rates = RatesVersion(
+            version=version,
+            banks_data=history.as_of(today),
+            path=self.file_path,
+            mtime=stat.st_mtime if stat is not None else rates.mtime,
+            size=stat.st_size if stat is not None else rates.size,
+            loaded_at=time.time(),
+            content_hash=content_hash,
+            history=history,
+            effective_date=effective_date,
+            next_change=history.next_change(today)
+        )
+        # Single reference assignment: readers see the old or the new version, never a mix
+        self._current = new_rates
+        self.last_error = None
+        self._failed_stat = None
+        if rates is None:
+            return new_rates
+        for listener in list(self._listeners):
+            try:
+                listener(rates, new_rates)
+            except Exception:
+                logger.exception("Rates listener failed")
+        return new_rates
+
+    def invalidate(self):
+        """Force the next call to re-check the file"""
+        self._last_check = 0.0
+
+    def add_listener(self, callback):
+        """Call ``callback(old_rates, new_rates)`` after each version swap"""
+        self._listeners.append(callback)
+
+    def start_watching(self, poll_interval=2.0):
+        """Reload in a background thread whenever the file changes; safe to call repeatedly"""
+        with self._lock:
+            if self._watcher is not None:
+                return
+            self._refresh()
+            self._stop.clear()
+            self._watcher = threading.Thread(
+                target=self._watch, args=(poll_interval,), name='rates-watcher', daemon=True
+            )
+            self._watcher.start()
+
+    def stop_watching(self):
+        watcher = self._watcher
+        if watcher is not None:
+            self._stop.set()
+            watcher.join()
+            self._watcher = None
+
+    def _watch(self, poll_interval):
+        while not self._stop.wait(poll_interval):
+            with self._lock:
+                self._refresh()
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_rates_cache(file_path=DEFAULT_RATES_PATH):
+    """Return the process-wide cache for a rates file"""
+    key = os.path.abspath(file_path)
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = _caches[key] = RatesCache(key)
+        return cache
+
+
+def get_rates(file_path=DEFAULT_RATES_PATH):
+    """Current RatesVersion for a rates file"""
+    return get_rates_cache(file_path).current()
+
+
+def get_banks_data(file_path=DEFAULT_RATES_PATH):
+    """Current parsed banks data for a rates file (read-only)"""
+    return get_rates(file_path).banks_data
@@ -0,0 +1,79 @@
+import threading
+
+from .rate_history import UNDATED
+from .rates_cache import DEFAULT_RATES_PATH, get_rates
+
+# Display views of a bank's tiers: source columns -> column headings
+DISPLAY_VIEWS = {
+    # Interest Rates page
+    'summary': {
+        'tier_type': 'Type',
+        'balance_tier': 'Balance Tier',
+        'interest_rate': 'Interest Rate',
+        'remarks': 'Requirements'
+    },
+    # Calculator's rates section
+    'detail': {
+        'tier_type': 'Tier Type',
+        'balance_tier': 'Balance Tier',
+        'interest_rate': 'Interest Rate (%)',
+        'requirement_type': 'Requirement',
+        'remarks': 'Remarks'
+    }
+}
+
+# Tables for the two most recent rates versions (current and the one being replaced)
+_MAX_VERSIONS = 2
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+def _build_tables(banks_data):
+    import pandas as pd
+
+    tables = {}
+    for bank_name, bank_info in banks_data.items():
+        bank_df = pd.DataFrame(bank_info['tiers'])
+        tables[bank_name] = {
+            view: bank_df[list(columns)].rename(columns=columns)
+            for view, columns in DISPLAY_VIEWS.items()
+        }
+    return tables
+
+
+def get_display_tables(rates=None):
+    """Prebuilt ``{bank: {view: DataFrame}}`` for a rates version (default: current).
+
+    Tables are built once per rates version from the same cached rates the
+    calculator uses and shared by every session, so page renders do no
+    parsing. The frames are shared: display them, don't modify them.
+    """
+    rates = rates or get_rates(DEFAULT_RATES_PATH)
+    tables = _tables.get(rates.version)
+    if tables is None:
+        with _tables_lock:
+            tables = _tables.get(rates.version)
+            if tables is None:
+                tables = _build_tables(rates.banks_data)
+                _tables[rates.version] = tables
+                while len(_tables) > _MAX_VERSIONS:
+                    del _tables[next(iter(_tables))]
+    return tables
+
+
+def bank_names(rates=None):
+    """Banks in the rates version, in name order"""
+    return list(get_display_tables(rates))
+
+
+def bank_table(bank, view='detail', rates=None):
+    """Display table for one bank and view"""
+    return get_display_tables(rates)[bank][view]
+
+
+def rates_updated_label(rates=None):
+    """Human-readable effective date of the rates version, e.g. '16 Jan 2025'"""
+    rates = rates or get_rates(DEFAULT_RATES_PATH)
+    if rates.effective_date == UNDATED:
+        return None
+    return f"{rates.effective_date.day} {rates.effective_date:%b %Y}"
@@ -0,0 +1,105 @@
+"""Compiled binary snapshot of the interest rates file.
+
+``compile_snapshot`` validates interest_rates.csv and writes the tier table as
+flat NumPy arrays (one per column plus bank and effective date) and the
+SHA-256 of the source CSV into a single .npz file. Workers load it with one
+read and no pandas parsing; ``load_snapshot`` returns None when the snapshot is
+missing, from another format version or stale against the CSV, and callers
+fall back to parsing the CSV.
+
+Usage:
+    python -m utils.rates_snapshot [interest_rates.csv]
+"""
+import hashlib
+import io
+import logging
+import os
+import sys
+import tempfile
+import zipfile
+from datetime import date
+
+import numpy as np
+
+from .interest_engine import TIER_FIELDS, RATES_INT_COLUMNS, load_rate_history
+from .rate_history import RateHistory
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT = 2
+
+
+def snapshot_path_for(csv_path):
+    """interest_rates.csv -> interest_rates.snapshot.npz"""
+    return os.path.splitext(csv_path)[0] + '.snapshot.npz'
+
+
+def compile_snapshot(csv_path, snapshot_path=None):
+    """Validate ``csv_path`` and write its compiled snapshot atomically; returns the snapshot path"""
+    snapshot_path = snapshot_path or snapshot_path_for(csv_path)
+    with open(csv_path, 'rb') as f:
+        content = f.read()
+    rows = load_rate_history(io.BytesIO(content)).rows()
+
+    # Rows sorted by (effective date, bank) so every rate set's banks are contiguous
+    rows.sort(key=lambda row: (row[0], row[1]))
+    tiers = [tier for _, _, tier in rows]
+    arrays = {
+        'format': np.array([SNAPSHOT_FORMAT], dtype=np.int64),
+        'source_hash': np.array([hashlib.sha256(content).hexdigest()]),
+        'effective_date': np.array([effective_date.isoformat() for effective_date, _, _ in rows], dtype=str),
+        'bank': np.array([bank for _, bank, _ in rows], dtype=str),
+    }
+    for field in TIER_FIELDS:
+        dtype = np.int64 if field in RATES_INT_COLUMNS else str
+        arrays['tier_' + field] = np.array([t[field] for t in tiers], dtype=dtype)
+
+    # Write then rename so readers never see a partial file
+    directory = os.path.dirname(os.path.abspath(snapshot_path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.npz.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, **arrays)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, snapshot_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    logger.info(f"Compiled {len(tiers)} tiers into {snapshot_path}")
+    return snapshot_path
+
+
+def load_snapshot(snapshot_path, expected_hash=None):
+    """Load a snapshot as ``(source_hash, RateHistory)``.
+
+    Returns None if the file is missing, unreadable, from a different format
+    version, or (when ``expected_hash`` is given) compiled from different CSV
+    content.
+    """
+    try:
+        with open(snapshot_path, 'rb') as f:
+            content = f.read()
+        with np.load(io.BytesIO(content), allow_pickle=False) as npz:
+            arrays = {name: npz[name] for name in npz.files}
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+        return None
+
+    if 'format' not in arrays or int(arrays['format'][0]) != SNAPSHOT_FORMAT:
+        logger.info(f"Ignoring snapshot {snapshot_path}: unsupported format")
+        return None
+    source_hash = str(arrays['source_hash'][0])
+    if expected_hash is not None and source_hash != expected_hash:
+        logger.info(f"Ignoring stale snapshot {snapshot_path}")
+        return None
+
+    columns = [arrays['tier_' + field].tolist() for field in TIER_FIELDS]
+    tiers = [dict(zip(TIER_FIELDS, values)) for values in zip(*columns)]
+    effective_dates = [date.fromisoformat(value) for value in arrays['effective_date'].tolist()]
+    return source_hash, RateHistory(effective_dates, arrays['bank'].tolist(), tiers)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    compile_snapshot(sys.argv[1] if len(sys.argv) > 1 else 'interest_rates.csv')
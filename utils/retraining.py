@@ -0,0 +1,440 @@
+"""Background retraining of the product recommender.
+
+Saving a recommendation never trains inline. ``data_processor.save_user_data``
+calls ``request_retrain`` after every stored record, which puts a job in
+a durable spool-directory queue when the threshold policy says enough new
+records have arrived since the last trained version. A RetrainWorker, either a
+thread in the app or a separate process (``python -m utils.retraining``),
+claims jobs by renaming them, so two workers never run the same job. Every
+change to the queue is made under one lock file (flock) shared by all
+processes, so a request can't rewrite a job that is being claimed. The worker
+waits out the debounce window, trains, and publishes the model as the next
+version in the model manifest (utils.model_manifest). Serving processes see
+the manifest change in the background (see model_pool) and swap the new
+version in with a single reference assignment, so no request ever blocks on
+training or loading.
+
+Queue layout (under data/retrain_queue):
+    pending/<job>.json   waiting; claimed by renaming into running/
+    running/<job>.json   being trained; moved back to pending/ if its worker died
+    .lock                held while a process changes the queue
+    done/<job>.json      finished, with the training result
+    failed/<job>.json    failed, with the error
+    state.json           records covered by the last trained model
+
+Retrains are incremental by default: boosting continues from the saved model
+on only the rows stored since the last version, with a full refit every
+``full_rebuild_every`` retrains or ``full_rebuild_interval_seconds``. Full
+refits stream the seed data and the user history in chunks
+(utils.training_data), so their memory use doesn't grow with the history.
+
+Usage:
+    python -m utils.retraining [--once] [--poll-interval 5]
+    python -m utils.retraining --benchmark
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+QUEUE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'retrain_queue')
+_SUBDIRS = ('pending', 'running', 'done', 'failed')
+
+
+class RetrainPolicy(NamedTuple):
+    """When stored records justify a retrain, and how long bursts are coalesced"""
+    # New records since the last trained model before a retrain is queued
+    min_new_records: int = 50
+    # Quiet period after the latest request before the job may run
+    debounce_seconds: float = 60.0
+    # Upper bound on debouncing, measured from the first request of a job
+    max_delay_seconds: float = 600.0
+    # Running jobs older than this are assumed abandoned by a dead worker
+    stale_after_seconds: float = 3600.0
+    # Retrains continue boosting from the current model on new rows only, except
+    # every full_rebuild_every-th retrain and once full_rebuild_interval_seconds
+    # have passed since the last full rebuild, which refit from scratch
+    incremental: bool = True
+    incremental_rounds: int = 10
+    full_rebuild_every: int = 10
+    full_rebuild_interval_seconds: float = 7 * 24 * 3600.0
+    # Full rebuilds stream the seed data and the user history in chunks of
+    # chunk_size rows, with user rows given live_share of the sample weight, but
+    # no user row weighing more than max_live_weight seed rows
+    live_share: float = 0.5
+    max_live_weight: float = 4.0
+    chunk_size: int = 50000
+
+
+def _write_json(path, data):
+    # Write then rename so readers never see a partial file
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.json.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def _read_json(path):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+class RetrainQueue:
+    """Durable retrain job queue in a spool directory, shared by every process on the host"""
+
+    def __init__(self, queue_dir=QUEUE_DIR, policy=None):
+        self.queue_dir = queue_dir
+        self.policy = policy or RetrainPolicy()
+        self.state_path = os.path.join(queue_dir, 'state.json')
+        self._lock = threading.Lock()
+        for name in _SUBDIRS:
+            os.makedirs(os.path.join(queue_dir, name), exist_ok=True)
+
+    def _dir(self, name):
+        return os.path.join(self.queue_dir, name)
+
+    @contextmanager
+    def _exclusive(self):
+        """Serialise queue changes across threads and, where fcntl exists, across processes"""
+        with self._lock:
+            with open(os.path.join(self.queue_dir, '.lock'), 'a') as lock_file:
+                try:
+                    import fcntl
+                except ImportError:
+                    fcntl = None
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _jobs(self, name):
+        directory = self._dir(name)
+        jobs = []
+        for filename in sorted(os.listdir(directory)):
+            if filename.endswith('.json'):
+                try:
+                    jobs.append(_read_json(os.path.join(directory, filename)))
+                except (OSError, ValueError):
+                    # Claimed or completed by another worker while listing
+                    continue
+        return jobs
+
+    def state(self):
+        if not os.path.exists(self.state_path):
+            return {'trained_records': 0}
+        return _read_json(self.state_path)
+
+    def next_mode(self):
+        """'full' or 'incremental' for the next retrain under the rebuild schedule"""
+        state = self.state()
+        if not self.policy.incremental or 'last_full_at' not in state:
+            return 'full'
+        if state.get('incremental_since_full', 0) + 1 >= self.policy.full_rebuild_every:
+            return 'full'
+        if time.time() - state['last_full_at'] >= self.policy.full_rebuild_interval_seconds:
+            return 'full'
+        return 'incremental'
+
+    def should_retrain(self, total_records):
+        """True when ``total_records`` is at least min_new_records past the last trained model"""
+        return total_records - self.state()['trained_records'] >= self.policy.min_new_records
+
+    def request(self, total_records, reason='threshold'):
+        """Queue (or re-debounce) a retrain if the threshold is met; returns the pending job or None"""
+        if not self.should_retrain(total_records):
+            return None
+        now = time.time()
+        # Under the queue lock no worker can claim the pending job between reading and rewriting it
+        with self._exclusive():
+            pending = self._jobs('pending')
+            if pending:
+                # Coalesce into the waiting job and restart its debounce window, bounded by max_delay
+                job = pending[0]
+                job['total_records'] = max(job['total_records'], total_records)
+                job['not_before'] = min(now + self.policy.debounce_seconds,
+                                        job['requested_at'] + self.policy.max_delay_seconds)
+                job['requests'] += 1
+            else:
+                job = {
+                    'id': f"{int(now * 1000):015d}-{uuid.uuid4().hex[:8]}",
+                    'reason': reason,
+                    'total_records': total_records,
+                    'requested_at': now,
+                    'not_before': now + self.policy.debounce_seconds,
+                    'requests': 1,
+                }
+            _write_json(os.path.join(self._dir('pending'), f"{job['id']}.json"), job)
+        logger.info(f"Retrain job {job['id']} queued for {total_records} records")
+        return job
+
+    def claim(self):
+        """Move the oldest due pending job to running/ and return it, or None"""
+        now = time.time()
+        with self._exclusive():
+            for job in self._jobs('pending'):
+                if job['not_before'] > now:
+                    continue
+                target = os.path.join(self._dir('running'), f"{job['id']}.json")
+                os.rename(os.path.join(self._dir('pending'), f"{job['id']}.json"), target)
+                job['claimed_at'] = now
+                job['mode'] = self.next_mode()
+                job['since_records'] = self.state()['trained_records']
+                _write_json(target, job)
+                return job
+        return None
+
+    def _finish(self, job):
+        # A slow job may have been re-queued as abandoned meanwhile; don't train it again
+        for name in ('running', 'pending'):
+            try:
+                os.unlink(os.path.join(self._dir(name), f"{job['id']}.json"))
+                return
+            except FileNotFoundError:
+                continue
+
+    def complete(self, job, result):
+        job = dict(job, finished_at=time.time(), result=result)
+        with self._exclusive():
+            _write_json(os.path.join(self._dir('done'), f"{job['id']}.json"), job)
+            state = dict(
+                self.state(),
+                trained_records=result.get('records', job['total_records']),
+                version=result.get('version'),
+                trained_at=job['finished_at']
+            )
+            if result.get('mode', 'full') == 'full':
+                state['last_full_at'] = job['finished_at']
+                state['incremental_since_full'] = 0
+            else:
+                state['incremental_since_full'] = state.get('incremental_since_full', 0) + 1
+            _write_json(self.state_path, state)
+            self._finish(job)
+
+    def fail(self, job, error):
+        job = dict(job, finished_at=time.time(), error=error)
+        with self._exclusive():
+            _write_json(os.path.join(self._dir('failed'), f"{job['id']}.json"), job)
+            self._finish(job)
+
+    def recover(self):
+        """Return jobs abandoned in running/ by a dead worker to pending/"""
+        now = time.time()
+        with self._exclusive():
+            for job in self._jobs('running'):
+                if now - job.get('claimed_at', 0) > self.policy.stale_after_seconds:
+                    os.replace(os.path.join(self._dir('running'), f"{job['id']}.json"),
+                               os.path.join(self._dir('pending'), f"{job['id']}.json"))
+                    logger.warning(f"Re-queued abandoned retrain job {job['id']}")
+
+    def status(self):
+        """Job counts per queue directory, plus the last trained state"""
+        counts = {name: len(self._jobs(name)) for name in _SUBDIRS}
+        return dict(counts, **self.state())
+
+
+def train_product_recommender(job, rounds=None):
+    """Default job runner: full refit streamed over the seed data and the user history,
+    or for incremental jobs, continued boosting on the rows stored since the last version"""
+    from .data_processor import FEATURES, load_user_data, prepare_features
+    from .model_handler import ProductRecommender
+
+    columns = FEATURES + ['recommended_product']
+    policy = get_retrain_queue().policy
+    recommender = ProductRecommender()
+    mode = job.get('mode', 'full')
+    if mode == 'incremental':
+        # The user history is append-only, so records past the trained count are new
+        since_records = job.get('since_records', 0)
+        new_df = load_user_data(columns=columns, since_records=since_records)
+        records = since_records + len(new_df)
+        if len(new_df) == 0 or not recommender.load_model():
+            mode = 'full'
+    if mode == 'incremental':
+        rounds = rounds or policy.incremental_rounds
+        saved, accuracy = recommender.train_incremental(
+            prepare_features(new_df), new_df['recommended_product'], rounds=rounds
+        )
+    else:
+        saved, accuracy = recommender.train_streaming(live_share=policy.live_share, chunk_size=policy.chunk_size,
+                                                      max_live_weight=policy.max_live_weight)
+        records = recommender.last_training_report.live_rows
+    if not saved:
+        raise RuntimeError("Training finished but the model could not be saved")
+    return {'version': recommender.version, 'accuracy': float(accuracy),
+            'records': records, 'mode': mode}
+
+
+def benchmark_retraining(history_sizes=(1000, 10000, 50000), new_rows=100, rounds=10, seed=0):
+    """Time the full and incremental retrain paths as history grows.
+
+    Each history is resampled (with small noise) from the seed training data
+    into a scratch SQLite store. The full refit is ``train_streaming`` over the
+    seed data and that store, as a full retrain job runs it; the incremental
+    step is ``train_incremental`` on the resulting model with ``new_rows``
+    fresh rows. Returns rows of (history rows, full refit seconds,
+    incremental seconds).
+    """
+    import numpy as np
+    import pandas as pd
+
+    from .data_processor import load_training_data
+    from .training_data import train_incremental, train_streaming
+    from .user_db import UserDatabase
+
+    X_seed, y_seed = load_training_data()
+    rng = np.random.default_rng(seed)
+    policy = get_retrain_queue().policy
+
+    def sample(n):
+        index = rng.integers(0, len(X_seed), n)
+        X = X_seed.iloc[index].reset_index(drop=True).astype(float)
+        X['savings_amount'] *= rng.normal(1.0, 0.05, n)
+        X['monthly_card_spend'] *= rng.normal(1.0, 0.05, n)
+        return X, y_seed.iloc[index].reset_index(drop=True)
+
+    rows = []
+    for size in history_sizes:
+        X_history, y_history = sample(size)
+        X_new, y_new = sample(new_rows)
+        with tempfile.TemporaryDirectory(prefix='retrain-benchmark-') as scratch:
+            store = UserDatabase(os.path.join(scratch, 'history.db'), fsync=False)
+            store.append(X_history.assign(recommended_product=y_history, timestamp=pd.Timestamp.now()))
+
+            started = time.perf_counter()
+            model, _ = train_streaming(store=store, live_share=policy.live_share, chunk_size=policy.chunk_size,
+                                       max_live_weight=policy.max_live_weight)
+            full_seconds = time.perf_counter() - started
+
+            started = time.perf_counter()
+            train_incremental(model, X_new, y_new, rounds)
+            incremental_seconds = time.perf_counter() - started
+        rows.append((size, full_seconds, incremental_seconds))
+    return rows
+
+
+class RetrainWorker:
+    """Runs queued retrain jobs one at a time, in a daemon thread or in the foreground"""
+
+    def __init__(self, queue=None, train=train_product_recommender, poll_interval=5.0):
+        self.queue = queue or get_retrain_queue()
+        self.train = train
+        self.poll_interval = poll_interval
+        self._thread = None
+        self._stop = threading.Event()
+
+    def run_once(self):
+        """Run one due job if there is one; returns True if a job ran"""
+        self.queue.recover()
+        job = self.queue.claim()
+        if job is None:
+            return False
+        logger.info(f"Running retrain job {job['id']} ({job['total_records']} records)")
+        started = time.perf_counter()
+        try:
+            result = self.train(job)
+        except Exception as e:
+            logger.exception(f"Retrain job {job['id']} failed")
+            self.queue.fail(job, f"{type(e).__name__}: {e}")
+        else:
+            result = dict(result, seconds=time.perf_counter() - started)
+            self.queue.complete(job, result)
+            logger.info(f"Retrain job {job['id']} finished: {result}")
+        return True
+
+    def run_forever(self):
+        while not self._stop.is_set():
+            try:
+                if self.run_once():
+                    continue
+            except Exception:
+                logger.exception("Retrain worker error")
+            self._stop.wait(self.poll_interval)
+
+    def start(self):
+        """Run in a daemon thread; safe to call repeatedly"""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run_forever, name='retrain-worker', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        thread = self._thread
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+            self._thread = None
+
+
+_queue = None
+_worker = None
+_singletons_lock = threading.RLock()
+
+
+def get_retrain_queue():
+    """Process-wide queue for data/retrain_queue"""
+    global _queue
+    with _singletons_lock:
+        if _queue is None:
+            _queue = RetrainQueue()
+        return _queue
+
+
+def request_retrain(total_records):
+    """Queue a debounced retrain when the threshold policy is met; never trains inline"""
+    return get_retrain_queue().request(total_records)
+
+
+def start_retrain_worker():
+    """Start the process-wide background worker (idempotent)"""
+    global _worker
+    with _singletons_lock:
+        if _worker is None:
+            _worker = RetrainWorker(get_retrain_queue())
+        return _worker.start()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run queued product recommender retrain jobs")
+    parser.add_argument('--once', action='store_true', help="Run at most one due job and exit")
+    parser.add_argument('--poll-interval', type=float, default=5.0, help="Seconds between queue checks")
+    parser.add_argument('--benchmark', action='store_true',
+                        help="Compare full and incremental retrain cost as history grows, then exit")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    if args.benchmark:
+        print(f"{'history rows':>12}{'full refit':>14}{'incremental':>14}")
+        for size, full_seconds, incremental_seconds in benchmark_retraining():
+            print(f"{size:>12}{full_seconds:>12.3f} s{incremental_seconds:>12.3f} s")
+        return 0
+
+    worker = RetrainWorker(get_retrain_queue(), poll_interval=args.poll_interval)
+    if args.once:
+        return 0 if worker.run_once() else 1
+    worker.run_forever()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
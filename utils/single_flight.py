@@ -0,0 +1,64 @@
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into one in-flight computation.
+
+    The first caller for a key runs the function; callers arriving while it is
+    running wait on the same future and receive the same result object (or
+    exception). Nothing is cached once the call completes, so later requests
+    always see fresh results. Shared results must be treated as read-only.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.executed = 0
+        self.shared = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+                self.executed += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+
+def optimization_key(total_amount, requirements, rates_version):
+    """Canonical key for an optimization: identical inputs under one rates version match.
+
+    ``requirements`` should already be normalized (see
+    interest_engine.normalize_requirements) so defaults and salary rules agree.
+    """
+    canonical = []
+    for name, value in sorted(requirements.items()):
+        if isinstance(value, bool):
+            canonical.append((name, value))
+        else:
+            # 500 and 500.0 are the same request
+            canonical.append((name, float(value)))
+    return (rates_version, float(total_amount), tuple(canonical))
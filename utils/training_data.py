@@ -0,0 +1,206 @@
+"""Out-of-core training data for the product recommender.
+
+``TrainingChunks`` is an xgboost DataIter over the seed training CSV and the
+user history store, both read ``chunk_size`` rows at a time, so no more than
+one chunk of raw rows is ever held in pandas. ``build_training_matrix`` feeds
+it to a QuantileDMatrix, which keeps only the quantised matrix (about one
+byte per value), or with ``external_memory`` to an ExtMemQuantileDMatrix
+whose pages are cached on disk. ``source_weights`` gives live rows a fixed
+share of the total sample weight, so a small live history isn't drowned out
+by seed data and the seed data still anchors a young one. The share is
+capped so no live row weighs more than ``max_live_weight`` seed rows; until
+the history is large enough, live rows get proportionally less.
+
+``train_incremental`` continues boosting an existing model on new rows with
+the parameters that model was trained with.
+
+Imports xgboost at module level; import this module lazily.
+
+Usage:
+    python train_initial_model.py --source combined [--live-share 0.7] [--external-memory]
+"""
+import logging
+import os
+import tempfile
+import time
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from .data_processor import FEATURES, PRODUCT_MAPPING, get_user_store, prepare_features
+
+logger = logging.getLogger(__name__)
+
+SEED_DATA_FILE = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'insurance_training_data.csv')
+LABEL = 'recommended_product'
+
+# Same model as ProductRecommender.train_model's default profile
+STREAMING_PARAMS = {
+    'objective': 'multi:softprob',
+    'num_class': len(PRODUCT_MAPPING),
+    'tree_method': 'hist',
+    'max_depth': 3,
+    'learning_rate': 0.1,
+}
+STREAMING_ROUNDS = 100
+# Most a single live row may weigh relative to a seed row
+MAX_LIVE_WEIGHT = 4.0
+
+
+class SourceWeights(NamedTuple):
+    """Sample weight of each seed row and each live (user history) row"""
+    seed: float = 1.0
+    live: float = 1.0
+
+
+class StreamingReport(NamedTuple):
+    seed_rows: int
+    live_rows: int
+    weights: SourceWeights
+    accuracy: float
+    build_seconds: float
+    train_seconds: float
+
+
+def count_csv_rows(path):
+    """Data rows in a CSV file with a header, counted without parsing"""
+    lines = 0
+    last = b'\n'
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            lines += block.count(b'\n')
+            last = block[-1:]
+    return max(lines - (last == b'\n'), 0)
+
+
+def source_weights(seed_rows, live_rows, live_share=None, max_live_weight=MAX_LIVE_WEIGHT):
+    """Per-row weights giving live rows ``live_share`` of the total weight (None: every row weighs 1).
+
+    The share is reduced when reaching it would make a live row weigh more
+    than ``max_live_weight`` seed rows, so a handful of user records can't
+    outweigh the seed distribution. Weights are scaled so they sum to the
+    total row count, keeping min_child_weight and similar parameters meaning
+    what they do unweighted.
+    """
+    if live_share is None or not seed_rows or not live_rows:
+        return SourceWeights()
+    if not 0 < live_share < 1:
+        raise ValueError(f"live_share must be between 0 and 1, got {live_share}")
+    capped_share = max_live_weight * live_rows / (max_live_weight * live_rows + seed_rows)
+    if capped_share < live_share:
+        logger.info(f"Live share reduced from {live_share:.3f} to {capped_share:.3f} "
+                    f"for {live_rows} live rows (max weight {max_live_weight:g} seed rows each)")
+        live_share = capped_share
+    total = seed_rows + live_rows
+    return SourceWeights((1 - live_share) * total / seed_rows, live_share * total / live_rows)
+
+
+class TrainingChunks(xgb.DataIter):
+    """Seed CSV then user history, ``chunk_size`` rows per batch, with per-source weights"""
+
+    def __init__(self, store=None, weights=SourceWeights(), seed_path=SEED_DATA_FILE, include_seed=True,
+                 chunk_size=50000, cache_prefix=None):
+        self.store = store if store is not None else get_user_store()
+        self.weights = weights
+        self.seed_path = seed_path
+        self.include_seed = include_seed
+        self.chunk_size = chunk_size
+        self._chunks = None
+        super().__init__(cache_prefix=cache_prefix)
+
+    def frames(self):
+        """Yield (features, labels, weight) for every chunk, seed data first"""
+        if self.include_seed and self.seed_path:
+            for chunk in pd.read_csv(self.seed_path, usecols=FEATURES + [LABEL], chunksize=self.chunk_size):
+                yield prepare_features(chunk), chunk[LABEL].to_numpy(), self.weights.seed
+        for chunk in self.store.iter_chunks(FEATURES + [LABEL], self.chunk_size):
+            yield prepare_features(chunk), chunk[LABEL].to_numpy(), self.weights.live
+
+    def next(self, input_data):
+        if self._chunks is None:
+            self._chunks = self.frames()
+        try:
+            X, y, weight = next(self._chunks)
+        except StopIteration:
+            return False
+        input_data(data=X, label=y, weight=np.full(len(y), weight, dtype=np.float32))
+        return True
+
+    def reset(self):
+        self._chunks = None
+
+
+def build_training_matrix(chunks, external_memory=False, max_bin=256):
+    """QuantileDMatrix over ``chunks``, or with ``external_memory`` one paged to ``chunks.cache_prefix``"""
+    if external_memory:
+        if not getattr(xgb, 'ExtMemQuantileDMatrix', None):
+            # Older xgboost: an iterator-backed DMatrix with a cache prefix is paged to disk
+            return xgb.DMatrix(chunks)
+        return xgb.ExtMemQuantileDMatrix(chunks, max_bin=max_bin)
+    return xgb.QuantileDMatrix(chunks, max_bin=max_bin)
+
+
+def chunked_accuracy(booster, chunks):
+    """Unweighted accuracy of ``booster`` over every chunk, one chunk in memory at a time"""
+    correct = total = 0
+    for X, y, _ in chunks.frames():
+        correct += int((booster.inplace_predict(X).argmax(axis=1) == y).sum())
+        total += len(y)
+    return correct / total if total else 0.0
+
+
+def train_incremental(model, X_new, y_new, rounds=10):
+    """Add ``rounds`` boosting rounds fitted to the new rows to ``model``; returns the new XGBClassifier.
+
+    Uses the parameters recorded on the model (compact and tuned versions
+    differ from the default profile), or STREAMING_PARAMS for model files
+    saved before they were recorded.
+    """
+    from .compact_training import _classifier_from_booster, training_params
+
+    base = model.get_booster()
+    params = training_params(base)
+    if params is None:
+        logger.warning("Model has no recorded training parameters; continuing with the default profile's")
+        params = STREAMING_PARAMS
+    # The booster API rather than XGBClassifier.fit, which rejects batches
+    # that happen not to contain every product class
+    booster = xgb.train(params, xgb.DMatrix(X_new, label=y_new), num_boost_round=rounds, xgb_model=base)
+    return _classifier_from_booster(booster)
+
+
+def train_streaming(store=None, live_share=None, include_seed=True, chunk_size=50000,
+                    external_memory=False, num_boost_round=STREAMING_ROUNDS, params=None,
+                    seed_path=SEED_DATA_FILE, max_live_weight=MAX_LIVE_WEIGHT):
+    """Train on seed and user data streamed in chunks; returns (XGBClassifier, StreamingReport)"""
+    from .compact_training import _classifier_from_booster
+
+    store = store if store is not None else get_user_store()
+    seed_rows = count_csv_rows(seed_path) if include_seed and seed_path else 0
+    live_rows = store.count()
+    if not seed_rows and not live_rows:
+        raise ValueError("No training data: the seed file is excluded and the user history is empty")
+    weights = source_weights(seed_rows, live_rows, live_share, max_live_weight)
+
+    with tempfile.TemporaryDirectory(prefix='recommender-pages-') as cache_dir:
+        chunks = TrainingChunks(store, weights, seed_path, include_seed, chunk_size,
+                                cache_prefix=os.path.join(cache_dir, 'train') if external_memory else None)
+        started = time.perf_counter()
+        matrix = build_training_matrix(chunks, external_memory)
+        build_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        booster = xgb.train(dict(STREAMING_PARAMS, **(params or {})), matrix, num_boost_round=num_boost_round)
+        train_seconds = time.perf_counter() - started
+        del matrix
+
+    accuracy = chunked_accuracy(booster, chunks)
+    logger.info(
+        f"Streamed training on {seed_rows} seed + {live_rows} live rows "
+        f"(weights {weights.seed:.3f}/{weights.live:.3f}): build {build_seconds:.2f}s, "
+        f"train {train_seconds:.2f}s, accuracy {accuracy:.4f}"
+    )
+    report = StreamingReport(seed_rows, live_rows, weights, accuracy, build_seconds, train_seconds)
+    return _classifier_from_booster(booster), report
@@ -0,0 +1,259 @@
+"""SQLite store for the user recommendation history, in WAL mode.
+
+WAL lets any number of readers run while one writer commits, so sessions
+saving recommendations never block training or analytics reads, and writers
+from other processes queue on SQLite's lock (up to ``busy_timeout``) instead
+of overwriting each other. Writes go through a small pool of connections,
+each batch in one ``BEGIN IMMEDIATE`` transaction; reads use one connection
+per thread. Records have dense, increasing ids, so ``read(since_records=n)``
+is an indexed slice of everything stored after the first n records, and
+timestamp ranges use the timestamp index.
+
+``import_legacy()`` copies the Parquet history (utils.user_history) or, if
+there is none, the legacy CSV into an empty database, in the same
+transaction that records it was done.
+
+Usage:
+    python -m utils.user_db [--checkpoint]
+"""
+import argparse
+import logging
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+from .user_history import HISTORY_DIR, SCHEMA_FIELDS, UserHistoryStore, typed_history_frame
+
+logger = logging.getLogger(__name__)
+
+USER_DB_FILE = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'user_history.db')
+
+_SQL_TYPES = {'float64': 'REAL', 'bool_': 'INTEGER', 'int32': 'INTEGER', 'int8': 'INTEGER', 'timestamp': 'TEXT'}
+COLUMNS = [name for name, _ in SCHEMA_FIELDS]
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS user_recommendations (
+    id INTEGER PRIMARY KEY,
+    {', '.join(f'{name} {_SQL_TYPES[kind]} NOT NULL' for name, kind in SCHEMA_FIELDS)}
+);
+CREATE INDEX IF NOT EXISTS user_recommendations_timestamp ON user_recommendations (timestamp);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+# Sortable text form of stored timestamps
+_TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+
+
+def _timestamp_text(value):
+    return value.strftime(_TIMESTAMP_FORMAT)
+
+
+class UserDatabase:
+    """User history in a WAL-mode SQLite database (see the module docstring)"""
+
+    def __init__(self, path=USER_DB_FILE, pool_size=4, busy_timeout=30.0, fsync=True):
+        self.path = path
+        self.pool_size = pool_size
+        self.busy_timeout = busy_timeout
+        self.fsync = fsync
+        self._pool = queue.LifoQueue()
+        self._created = 0
+        self._pool_lock = threading.Lock()
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._write_connection() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None,
+                               check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(f'PRAGMA synchronous={"FULL" if self.fsync else "NORMAL"}')
+        return conn
+
+    @contextmanager
+    def _write_connection(self):
+        """Borrow a pooled write connection; blocks once ``pool_size`` are in use"""
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            with self._pool_lock:
+                create = self._created < self.pool_size
+                if create:
+                    self._created += 1
+            conn = self._connect() if create else self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    @contextmanager
+    def _transaction(self, fsync=None):
+        with self._write_connection() as conn:
+            if fsync is not None and fsync != self.fsync:
+                conn.execute(f'PRAGMA synchronous={"FULL" if fsync else "NORMAL"}')
+            # IMMEDIATE takes the write lock up front, so busy writers wait rather than fail mid-transaction
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield conn
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            else:
+                conn.execute('COMMIT')
+            finally:
+                if fsync is not None and fsync != self.fsync:
+                    conn.execute(f'PRAGMA synchronous={"FULL" if self.fsync else "NORMAL"}')
+
+    def _read_connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    @staticmethod
+    def _insert(conn, frame):
+        frame = typed_history_frame(frame).dropna()
+        values = [
+            (float(row[0]), bool(row[1]), float(row[2]), int(row[3]), bool(row[4]), bool(row[5]),
+             bool(row[6]), bool(row[7]), int(row[8]), _timestamp_text(row[9]))
+            for row in frame[COLUMNS].itertuples(index=False)
+        ]
+        conn.executemany(
+            f"INSERT INTO user_recommendations ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+            values
+        )
+        return len(values)
+
+    def append(self, rows, fsync=None):
+        """Insert records (dicts or a DataFrame with the history columns) in one transaction; returns rows written"""
+        import pandas as pd
+
+        frame = rows if isinstance(rows, pd.DataFrame) else pd.DataFrame(list(rows))
+        if len(frame) == 0:
+            return 0
+        with self._transaction(fsync) as conn:
+            written = self._insert(conn, frame)
+        if written < len(frame):
+            logger.warning(f"Skipped {len(frame) - written} user history rows with missing or invalid values")
+        return written
+
+    def count(self):
+        return self._read_connection().execute('SELECT count(*) FROM user_recommendations').fetchone()[0]
+
+    def read(self, columns=None, start=None, end=None, since_records=0):
+        """History as a typed DataFrame in insertion order.
+
+        ``since_records`` returns only records stored after the first n (an id
+        range scan); ``start``/``end`` (datetimes, inclusive) use the timestamp
+        index. Only ``columns`` (default: all) are selected.
+        """
+        import pandas as pd
+
+        columns = list(columns or COLUMNS)
+        unknown = set(columns) - set(COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown user history columns: {sorted(unknown)}")
+        conditions, params = ['id > ?'], [since_records]
+        if start is not None:
+            conditions.append('timestamp >= ?')
+            params.append(_timestamp_text(start))
+        if end is not None:
+            conditions.append('timestamp <= ?')
+            params.append(_timestamp_text(end))
+        cursor = self._read_connection().execute(
+            f"SELECT {', '.join(columns)} FROM user_recommendations WHERE {' AND '.join(conditions)} ORDER BY id",
+            params
+        )
+        return typed_history_frame(pd.DataFrame(cursor.fetchall(), columns=columns))
+
+    def iter_chunks(self, columns=None, chunk_size=50000, since_records=0):
+        """Yield the history as typed DataFrames of up to ``chunk_size`` rows, in insertion order.
+
+        Pages by id (keyset pagination), so each chunk is one indexed range
+        scan and memory is bounded by the chunk size.
+        """
+        import pandas as pd
+
+        columns = list(columns or COLUMNS)
+        unknown = set(columns) - set(COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown user history columns: {sorted(unknown)}")
+        last_id = since_records
+        conn = self._read_connection()
+        while True:
+            rows = conn.execute(
+                f"SELECT id, {', '.join(columns)} FROM user_recommendations WHERE id > ? ORDER BY id LIMIT ?",
+                (last_id, chunk_size)
+            ).fetchall()
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            # Column-wise construction; about a third faster than from row tuples
+            values = list(zip(*rows))[1:]
+            yield typed_history_frame(pd.DataFrame({name: np.asarray(column) for name, column in zip(columns, values)}))
+
+    def compact(self):
+        """Checkpoint the WAL into the database and truncate it; returns pages checkpointed"""
+        with self._write_connection() as conn:
+            _, _, checkpointed = conn.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchone()
+            conn.execute('PRAGMA optimize')
+        return checkpointed
+
+    def import_legacy(self, csv_path, history_dir=HISTORY_DIR):
+        """Copy the Parquet history, or else the CSV at ``csv_path``, once; returns rows imported"""
+        import pandas as pd
+
+        with self._transaction() as conn:
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'imported_legacy'").fetchone():
+                return 0
+            parquet = UserHistoryStore(history_dir)
+            if parquet.files():
+                source, frame = history_dir, parquet.read()
+            elif os.path.exists(csv_path):
+                source, frame = csv_path, pd.read_csv(csv_path, dtype=str)
+            else:
+                source, frame = None, None
+            imported = self._insert(conn, frame) if frame is not None and len(frame) else 0
+            conn.execute("INSERT INTO meta (key, value) VALUES ('imported_legacy', ?)", (str(source),))
+        if imported:
+            logger.info(f"Imported {imported} user history rows from {source} into {self.path}")
+        return imported
+
+
+_database = None
+_database_lock = threading.Lock()
+
+
+def get_user_database():
+    """Process-wide database at data/user_history.db"""
+    global _database
+    with _database_lock:
+        if _database is None:
+            _database = UserDatabase()
+        return _database
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain the SQLite user recommendation history")
+    parser.add_argument('--checkpoint', action='store_true', help="Checkpoint and truncate the write-ahead log")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    from .data_processor import get_user_store
+
+    database = get_user_store()
+    if not isinstance(database, UserDatabase):
+        parser.error("USER_HISTORY_BACKEND is not 'sqlite'")
+    if args.checkpoint:
+        print(f"Checkpointed {database.compact()} pages")
+    print(f"{database.count()} rows in {database.path}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,413 @@
+"""Day-partitioned Parquet store for the user recommendation history.
+
+Rows are written with a fixed Arrow schema (booleans as bool, the product as
+int8, timestamps as timestamps) to ``day=YYYY-MM-DD/part-<ns>-<id>.parquet``
+files, one file per flushed batch. Each file is written to a hidden temp name
+and renamed into place, so readers never see a partial file. ``compact()``
+merges a day's settled small files into one ``part-<first ns>-<last ns>.parquet``;
+the range in its name shadows the parts it replaced, so a compaction that
+dies before deleting them never double-counts rows. ``read()`` opens only the
+partitions inside the requested date range and decodes only the requested
+columns, in append order.
+
+``import_csv()`` loads the legacy data/user_recommendations.csv once and
+records that it did in ``_imported_csv.json``.
+
+Usage:
+    python -m utils.user_history [--import-csv] [--compact]
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from datetime import date, datetime
+
+logger = logging.getLogger(__name__)
+
+HISTORY_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'user_history')
+
+# (column, Arrow type name) in stored order; matches data_processor.USER_DATA_COLUMNS
+SCHEMA_FIELDS = [
+    ('savings_amount', 'float64'),
+    ('salary_above_3k', 'bool_'),
+    ('monthly_card_spend', 'float64'),
+    ('num_giro_payments', 'int32'),
+    ('has_insurance', 'bool_'),
+    ('has_investments', 'bool_'),
+    ('increased_balance', 'bool_'),
+    ('high_balance', 'bool_'),
+    ('recommended_product', 'int8'),
+    ('timestamp', 'timestamp'),
+]
+
+_DAY_DIR = re.compile(r'^day=(\d{4}-\d{2}-\d{2})$')
+# part-<ns>-<writer id>.parquet (one flushed batch) or part-<first ns>-<last ns>.parquet (compacted)
+_PART_FILE = re.compile(r'^part-(\d{20})-(\d{20}|[0-9a-f]{12})\.parquet$')
+_IMPORT_MARKER = '_imported_csv.json'
+
+
+def history_schema():
+    import pyarrow as pa
+
+    return pa.schema([
+        (name, pa.timestamp('us') if kind == 'timestamp' else getattr(pa, kind)())
+        for name, kind in SCHEMA_FIELDS
+    ])
+
+
+def _parse_bool(series):
+    """Booleans stored as bool, 0/1 or the strings "True"/"False" -> bool"""
+    import pandas as pd
+
+    if series.dtype == bool:
+        return series
+    if pd.api.types.is_numeric_dtype(series):
+        return series.fillna(0) != 0
+    return series.astype(str).str.strip().str.lower().isin(('true', '1', '1.0'))
+
+
+_PANDAS_TYPES = {'float64': 'float64', 'int32': 'int32', 'int8': 'int8'}
+
+
+def typed_history_frame(frame):
+    """Coerce whichever history columns ``frame`` has to their stored types (new DataFrame)"""
+    import pandas as pd
+
+    columns = {}
+    for name, kind in SCHEMA_FIELDS:
+        if name not in frame:
+            continue
+        if kind == 'bool_':
+            columns[name] = _parse_bool(frame[name])
+        elif kind == 'timestamp':
+            columns[name] = pd.to_datetime(frame[name], errors='coerce').dt.floor('us')
+        else:
+            values = pd.to_numeric(frame[name], errors='coerce')
+            columns[name] = values if values.isna().any() else values.astype(_PANDAS_TYPES[kind])
+    return pd.DataFrame(columns, index=frame.index)
+
+
+def _to_table(frame):
+    """DataFrame with the history columns -> Arrow table in the history schema"""
+    import pyarrow as pa
+
+    return pa.Table.from_pandas(typed_history_frame(frame), schema=history_schema(), preserve_index=False)
+
+
+def _day_in_range(day, start, end):
+    return (start is None or day >= start.date()) and (end is None or day <= end.date())
+
+
+class UserHistoryStore:
+    """Append-only, day-partitioned Parquet history (see the module docstring)"""
+
+    def __init__(self, root=HISTORY_DIR, fsync=True):
+        self.root = root
+        self.fsync = fsync
+        self._writer_id = uuid.uuid4().hex[:12]
+
+    def _day_dirs(self, start=None, end=None):
+        """Sorted (day, path) for partitions overlapping [start, end]"""
+        try:
+            names = sorted(os.listdir(self.root))
+        except FileNotFoundError:
+            return []
+        days = []
+        for name in names:
+            match = _DAY_DIR.match(name)
+            if not match:
+                continue
+            day = date.fromisoformat(match.group(1))
+            if _day_in_range(day, start, end):
+                days.append((day, os.path.join(self.root, name)))
+        return days
+
+    @staticmethod
+    def _parts(day_dir):
+        """Live part files of one partition in append order: [(first ns, last ns, path)].
+
+        Parts covered by a wider compacted file's range are dropped.
+        """
+        parts, compacted = [], []
+        for name in os.listdir(day_dir):
+            match = _PART_FILE.match(name)
+            if not match:
+                continue
+            first = int(match.group(1))
+            if len(match.group(2)) == 20:
+                compacted.append((first, int(match.group(2)), os.path.join(day_dir, name)))
+            else:
+                parts.append((first, first, os.path.join(day_dir, name)))
+        live = [part for part in parts + compacted
+                if not any(low <= part[0] and part[1] <= high and (low, high) != part[:2]
+                           for low, high, _ in compacted)]
+        return sorted(live)
+
+    def files(self, start=None, end=None):
+        """Part files for partitions overlapping [start, end], in append order"""
+        return [path for _, day_dir in self._day_dirs(start, end) for _, _, path in self._parts(day_dir)]
+
+    def _write_atomic(self, table, day_dir, name, fsync):
+        import pyarrow.parquet as pq
+
+        os.makedirs(day_dir, exist_ok=True)
+        # Leading '.' keeps the temp file out of listings until it is renamed
+        fd, tmp_path = tempfile.mkstemp(dir=day_dir, prefix='.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pq.write_table(table, f, compression='zstd')
+                if fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, os.path.join(day_dir, name))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def append(self, rows, fsync=None):
+        """Write records (dicts or a DataFrame with the history columns); returns rows written.
+
+        Each day's rows go to one new file; ``fsync`` overrides the store's policy.
+        """
+        import pandas as pd
+
+        frame = rows if isinstance(rows, pd.DataFrame) else pd.DataFrame(list(rows))
+        if len(frame) == 0:
+            return 0
+        table = _to_table(frame)
+        days = pd.to_datetime(table.column('timestamp').to_pandas()).dt.date
+        for day in days.dropna().unique():
+            mask = (days == day).to_numpy()
+            name = f"part-{time.time_ns():020d}-{self._writer_id}.parquet"
+            self._write_atomic(table.filter(mask), os.path.join(self.root, f'day={day.isoformat()}'), name,
+                               self.fsync if fsync is None else fsync)
+        dropped = int(days.isna().sum())
+        if dropped:
+            logger.warning(f"Skipped {dropped} user history rows without a valid timestamp")
+        return len(frame) - dropped
+
+    def count(self):
+        """Stored rows, from the Parquet footers only"""
+        import pyarrow.parquet as pq
+
+        return sum(pq.read_metadata(path).num_rows for path in self.files())
+
+    def read(self, columns=None, start=None, end=None, since_records=0):
+        """History as a DataFrame in append order.
+
+        Only partitions overlapping [``start``, ``end``] (datetimes, inclusive)
+        are opened and only ``columns`` (default: all) are decoded. Rows are
+        filtered to the exact range on the timestamp column. ``since_records``
+        skips the oldest records, using the file footers to skip whole files.
+        """
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        import pyarrow.parquet as pq
+
+        schema = history_schema()
+        columns = list(columns or schema.names)
+        files, skip = self._files_after(since_records)
+        paths = [path for day, path in files if _day_in_range(day, start, end)]
+        if not paths:
+            return schema.empty_table().select(columns).to_pandas()
+
+        row_filter = None
+        if start is not None:
+            row_filter = ds.field('timestamp') >= pa.scalar(start, pa.timestamp('us'))
+        if end is not None:
+            end_filter = ds.field('timestamp') <= pa.scalar(end, pa.timestamp('us'))
+            row_filter = end_filter if row_filter is None else row_filter & end_filter
+        tables = []
+        if skip and paths[0] == files[0][1]:
+            # The oldest kept file starts before since_records: drop its leading rows
+            first = pq.read_table(paths.pop(0), schema=schema).slice(skip)
+            if row_filter is not None:
+                first = first.filter(row_filter)
+            tables.append(first.select(columns))
+        if paths:
+            tables.append(ds.dataset(paths, schema=schema, format='parquet').to_table(columns=columns,
+                                                                                      filter=row_filter))
+        return pa.concat_tables(tables).to_pandas()
+
+    def _files_after(self, since_records):
+        """([(day, path)] from the file holding record ``since_records`` on, rows to skip in its first file)"""
+        import pyarrow.parquet as pq
+
+        files = [(day, path) for day, day_dir in self._day_dirs() for _, _, path in self._parts(day_dir)]
+        skip = since_records
+        while files and skip:
+            rows = pq.read_metadata(files[0][1]).num_rows
+            if rows > skip:
+                break
+            skip -= rows
+            files.pop(0)
+        return files, skip
+
+    def iter_chunks(self, columns=None, chunk_size=50000, since_records=0):
+        """Yield the history as DataFrames of about ``chunk_size`` rows, oldest first.
+
+        Reads one record batch at a time, so memory is bounded by the chunk
+        size rather than the history size.
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = history_schema()
+        columns = list(columns or schema.names)
+        files, skip = self._files_after(since_records)
+        pending, pending_rows = [], 0
+        for _, path in files:
+            for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size, columns=columns):
+                if skip:
+                    dropped = min(skip, batch.num_rows)
+                    batch, skip = batch.slice(dropped), skip - dropped
+                pending.append(batch)
+                pending_rows += batch.num_rows
+                if pending_rows >= chunk_size:
+                    yield pa.Table.from_batches(pending).to_pandas()
+                    pending, pending_rows = [], 0
+        if pending_rows:
+            yield pa.Table.from_batches(pending).to_pandas()
+
+    def compact(self, min_files=4, settle_seconds=60.0):
+        """Merge each partition's settled parts into one file; returns the number of files merged.
+
+        Only parts older than ``settle_seconds`` are merged, so a batch still
+        being renamed into place by another writer is never skipped over.
+        """
+        import pyarrow.dataset as ds
+
+        cutoff = time.time_ns() - int(settle_seconds * 1e9)
+        merged = 0
+        for _, day_dir in self._day_dirs():
+            parts = [part for part in self._parts(day_dir) if part[1] < cutoff]
+            if len(parts) < min_files:
+                continue
+            table = ds.dataset([path for _, _, path in parts], schema=history_schema(), format='parquet').to_table()
+            first, last = parts[0][0], max(high for _, high, _ in parts)
+            self._write_atomic(table, day_dir, f"part-{first:020d}-{last:020d}.parquet", self.fsync)
+            # The new file's range already shadows these; deleting them is cleanup
+            for _, _, path in parts:
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+            merged += len(parts)
+            logger.info(f"Compacted {len(parts)} files ({table.num_rows} rows) in {os.path.basename(day_dir)}")
+        return merged
+
+    def import_csv(self, csv_path):
+        """Import a legacy user data CSV once; returns rows imported (0 if already done)"""
+        import pandas as pd
+
+        marker = os.path.join(self.root, _IMPORT_MARKER)
+        if os.path.exists(marker) or not os.path.exists(csv_path):
+            return 0
+        frame = pd.read_csv(csv_path, dtype=str)
+        imported = self.append(frame) if len(frame) else 0
+        os.makedirs(self.root, exist_ok=True)
+        with open(marker, 'w') as f:
+            json.dump({'source': os.path.abspath(csv_path), 'rows': imported,
+                       'imported_at': datetime.now().isoformat()}, f)
+        logger.info(f"Imported {imported} rows from {csv_path} into {self.root}")
+        return imported
+
+
+class Compactor:
+    """Daemon thread that calls a store's ``compact()`` every ``interval`` seconds.
+
+    ``store`` may also be a function returning the store, called in the thread.
+    """
+
+    def __init__(self, store, interval=300.0):
+        self.store = store
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='user-history-compactor', daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                store = self.store() if callable(self.store) else self.store
+                store.compact()
+            except Exception:
+                logger.exception("Compacting user history failed")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+_store = None
+_compactor = None
+_store_lock = threading.Lock()
+
+
+def get_user_history_store():
+    """Process-wide store for data/user_history"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = UserHistoryStore()
+        return _store
+
+
+def _configured_store():
+    from .data_processor import get_user_store
+
+    return get_user_store()
+
+
+def start_compaction(store=None, interval=300.0):
+    """Start compacting ``store`` (default: the app's configured user history store) in the background.
+
+    Safe to call on every rerun; only the first call's store is compacted.
+    """
+    global _compactor
+    store = store or _configured_store
+    with _store_lock:
+        if _compactor is None:
+            _compactor = Compactor(store, interval)
+        return _compactor.start()
+
+
+def main(argv=None):
+    from .data_processor import USER_DATA_FILE
+
+    parser = argparse.ArgumentParser(description="Maintain the Parquet user recommendation history")
+    parser.add_argument('--import-csv', nargs='?', const=USER_DATA_FILE, metavar='CSV',
+                        help="Import the legacy user data CSV if it hasn't been imported yet")
+    parser.add_argument('--compact', action='store_true', help="Merge small files in every partition")
+    parser.add_argument('--settle-seconds', type=float, default=60.0,
+                        help="Only compact files older than this")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    store = get_user_history_store()
+    if args.import_csv:
+        store.import_csv(args.import_csv)
+    if args.compact:
+        store.compact(min_files=2, settle_seconds=args.settle_seconds)
+    days = store._day_dirs()
+    print(f"{store.count()} rows in {len(store.files())} files across {len(days)} day partitions")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())